@@ -17,19 +17,306 @@ Características principales:
 - Soporte CORS (Dominios que Tienen Permisos para Acceder a la API)
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-from pymongo import MongoClient, ASCENDING, DESCENDING, errors
-from bson import ObjectId, Regex
-from datetime import datetime, timedelta
+from pymongo import MongoClient, ASCENDING, DESCENDING, ReadPreference, ReturnDocument, errors
+from bson import ObjectId
+from datetime import datetime, timedelta, timezone
 import jwt
 from functools import wraps
-from werkzeug.security import generate_password_hash, check_password_hash
 from config import Config
+from cache import CacheRespuestas, CachePrincipales, CacheDocumentos
+from hashing import PoolHash, PoolSaturado, requiere_rehash
+from migraciones import (
+    inicializar, preparacion_vigente, reconciliar_estadisticas, estadisticas_reconciliadas, backfill_inscritos,
+)
+from metricas import crear_metricas, ObservadorMongo
+from limites import AlmacenDosNiveles
+from revocacion import RevocacionTokens
+from eventos import BusEventos, DESCONECTAR, evento_taller, formatear_sse, servidor_concurrente
+from serializacion import ProveedorJSON, codificaciones_disponibles, comprimir_respuesta, dumps_bytes, variantes_etag
+from busqueda import CAMPOS_TERMINOS_TALLER, terminos_taller, terminos_estudiante, filtro_prefijos
 import redis
 import hashlib
+import hmac
+import re
+import base64
+import json
+import queue
+import threading
+import time
+import uuid
+
+def serializar_taller(doc):
+    """Convierte documento de taller a formato JSON"""
+    if not doc:
+        return None
+    insc = doc.get("inscripciones", [])
+    cupo = int(doc.get("cupo", 0))
+    # Se prefieren los contadores desnormalizados; el arreglo solo es respaldo para documentos sin migrar
+    inscritos = doc["inscritos"] if "inscritos" in doc else len(insc)
+    if "cupos_disponibles" in doc:
+        cupos_disponibles = max(int(doc["cupos_disponibles"]), 0)
+    else:
+        cupos_disponibles = max(cupo - inscritos, 0) if cupo >= 0 else 0
+    # El proveedor JSON codifica ObjectId y datetime: no hace falta convertir campo por campo
+    return {
+        "_id": doc.get("_id"),
+        "nombre": doc.get("nombre"),
+        "descripcion": doc.get("descripcion"),
+        "fecha": doc.get("fecha"),
+        "hora": doc.get("hora"),
+        "lugar": doc.get("lugar"),
+        "categoria": doc.get("categoria"),
+        "tipo": doc.get("tipo"),
+        "instructor": doc.get("instructor", ""),
+        "rating": float(doc.get("rating", 0)) if doc.get("rating") is not None else 0,
+        "cupo": cupo,
+        "inscritos": inscritos,
+        "cupos_disponibles": cupos_disponibles,
+        "creado_en": doc.get("creado_en"),
+        "actualizado_en": doc.get("actualizado_en"),
+        "inscripciones": [
+            {
+                "estudiante_id": ins.get("estudiante_id"),
+                "nombre": ins.get("nombre"),
+                "email": ins.get("email"),
+                "registrado_en": ins.get("registrado_en"),
+            }
+            for ins in insc
+        ],
+    }
+
+
+# Consulta de listados (compartido con las rutas nativas de asgi.py)
+
+# Campos de la respuesta de talleres y los campos almacenados de los que dependen
+CAMPOS_TALLER = {
+    "_id": [], "nombre": ["nombre"], "descripcion": ["descripcion"], "fecha": ["fecha"],
+    "hora": ["hora"], "lugar": ["lugar"], "categoria": ["categoria"], "tipo": ["tipo"],
+    "instructor": ["instructor"], "rating": ["rating"], "cupo": ["cupo"],
+    "inscritos": ["inscritos"], "cupos_disponibles": ["cupo", "inscritos", "cupos_disponibles"],
+    "creado_en": ["creado_en"], "actualizado_en": ["actualizado_en"], "inscripciones": [],
+}
+CAMPOS_ESTUDIANTE = ("_id", "nombre", "email", "creado_en")
+
+# Orden de las búsquedas de texto completo: puntaje de relevancia y _id como desempate
+PUNTAJE_TEXTO = {"score": {"$meta": "textScore"}}
+ORDEN_RELEVANCIA = [("score", {"$meta": "textScore"}), ("_id", ASCENDING)]
+
+
+def generar_cache_key(prefix: str, *args):
+    """Genera clave única para cache"""
+    key_data = f"{prefix}:{':'.join(str(arg) for arg in args)}"
+    return hashlib.md5(key_data.encode()).hexdigest()
+
+
+def codificar_cursor(valores):
+    """Codifica los valores de ordenamiento del último elemento en un token opaco"""
+    crudo = json.dumps([str(v) if isinstance(v, ObjectId) else v for v in valores], separators=(",", ":"))
+    return base64.urlsafe_b64encode(crudo.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(token: str, n_claves: int, con_id: bool = True):
+    """Decodifica un token de cursor; devuelve None si es inválido"""
+    try:
+        relleno = "=" * (-len(token) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(token + relleno))
+        if not isinstance(valores, list) or len(valores) != n_claves:
+            return None
+        if con_id:
+            valores[-1] = ObjectId(valores[-1])
+        return valores
+    except Exception:
+        return None
+
+
+def filtro_keyset(claves, valores):
+    """
+    Construye el filtro que continúa la paginación después de `valores`
+
+    Args:
+        claves (list): Pares (campo, dirección) del ordenamiento, terminando en _id
+        valores (list): Valores de esos campos en el último elemento entregado
+    """
+    condiciones = []
+    for i, (campo, direccion) in enumerate(claves):
+        cond = {claves[j][0]: valores[j] for j in range(i)}
+        cond[campo] = {"$gt" if direccion == ASCENDING else "$lt": valores[i]}
+        condiciones.append(cond)
+    return {"$or": condiciones}
+
+
+def parsear_campos(param: str, permitidos):
+    """Convierte `fields=a,b` en la lista de campos permitidos solicitados (None si no se pidió)"""
+    if not param:
+        return None
+    campos = [c.strip() for c in param.split(",") if c.strip() in permitidos]
+    return campos or None
+
+
+def limite_pagina(limit, token_cursor, maximo):
+    """
+    Tamaño de página efectivo: nunca mayor que `maximo` (PAGINACION_MAX)
+
+    Sin `limit` ni `cursor` devuelve None (resultado completo), como antes de
+    la paginación, para que los clientes que no siguen X-Next-Cursor no pierdan filas.
+    """
+    if limit > 0:
+        return min(limit, maximo)
+    return maximo if token_cursor else None
+
+
+def filtro_pagina(filtro, claves, token_cursor):
+    """Agrega al filtro la continuación del cursor keyset (None si el cursor es inválido)"""
+    if not token_cursor:
+        return filtro
+    valores = decodificar_cursor(token_cursor, len(claves))
+    if valores is None:
+        return None
+    keyset = filtro_keyset(claves, valores)
+    return {"$and": [filtro, keyset]} if filtro else keyset
+
+
+def cortar_pagina(docs, limite, claves):
+    """
+    Descarta el documento extra leído para saber si hay más resultados
+
+    Returns:
+        tuple: (documentos de la página, siguiente_cursor o None)
+    """
+    if not limite or len(docs) <= limite:
+        return docs, None
+    docs = docs[:limite]
+    ultimo = docs[-1]
+    return docs, codificar_cursor([ultimo.get(campo) for campo, _ in claves])
+
+
+def desplazamiento_relevancia(token_cursor):
+    """Desplazamiento guardado en un cursor de relevancia (0 sin cursor, None si es inválido)"""
+    if not token_cursor:
+        return 0
+    valores = decodificar_cursor(token_cursor, 2, con_id=False)
+    if not valores or valores[0] != "relevancia" or not isinstance(valores[1], int) or valores[1] < 0:
+        return None
+    return valores[1]
+
+
+def cortar_pagina_relevancia(docs, limite, desplazamiento):
+    """Como `cortar_pagina`, con un cursor que guarda el desplazamiento"""
+    if not limite or len(docs) <= limite:
+        return docs, None
+    return docs[:limite], codificar_cursor(["relevancia", desplazamiento + limite])
+
+
+def consulta_talleres(args, paginacion_max):
+    """
+    Interpreta los parámetros de GET /workshops
+
+    Args:
+        args: Parámetros de la query (`request.args` o un dict)
+        paginacion_max (int): Tamaño máximo de página
+
+    Returns:
+        dict: Filtro, orden, proyección, paginación y clave de cache de la consulta
+
+    Raises:
+        ValueError: Si `limit` no es un entero
+    """
+    q = (args.get("q") or "").strip()
+    prefijo = (args.get("modo") or "").strip().lower() == "prefijo"
+    categoria = (args.get("categoria") or "").strip()
+    fecha_desde = (args.get("fechaDesde") or "").strip()
+    fecha_hasta = (args.get("fechaHasta") or "").strip()
+    # Con búsqueda de texto completo se ordena por relevancia salvo que se pida otro campo
+    sort = args.get("sort") or ("relevancia" if q and not prefijo else "fecha")
+    order = args.get("order") or "asc"
+    limit = int(args.get("limit") or 0)
+    disponibles = (args.get("disponibles") or "").strip().lower() in ("1", "true", "si", "sí")
+    token_cursor = (args.get("cursor") or "").strip()
+    campos = parsear_campos(args.get("fields") or "", CAMPOS_TALLER)
+    if (args.get("vista") or "").strip().lower() in ("resumen", "summary"):
+        campos = [c for c in (campos or CAMPOS_TALLER) if c != "inscripciones"]
+
+    # Con limit o cursor las páginas nunca superan PAGINACION_MAX; sin ellos, resultado completo
+    limite = limite_pagina(limit, token_cursor, paginacion_max)
+
+    # Construcción del filtro de búsqueda MongoDB
+    filtro = {}
+    if q and prefijo:
+        # Autocompletado: prefijos anclados sobre el campo indexado `terminos`
+        filtro.update(filtro_prefijos(q))
+    elif q:
+        # Índice de texto completo (español): sin acentos ni mayúsculas y con stemming
+        filtro["$text"] = {"$search": q}
+    if categoria:
+        filtro["categoria"] = categoria
+    if disponibles:
+        filtro["cupos_disponibles"] = {"$gt": 0}
+    if fecha_desde or fecha_hasta:
+        # Las fechas se almacenan como strings YYYY-MM-DD, permitiendo comparaciones lexicográficas
+        rango = {}
+        if fecha_desde:
+            rango["$gte"] = fecha_desde
+        if fecha_hasta:
+            rango["$lte"] = fecha_hasta
+        filtro["fecha"] = rango
+
+    sort_map = {
+        "fecha": ("fecha", ASCENDING if order == "asc" else DESCENDING),
+        "rating": ("rating", DESCENDING if order == "desc" else ASCENDING),
+        "creado_en": ("creado_en", DESCENDING if order == "desc" else ASCENDING),
+    }
+    campo, direccion = sort_map.get(sort, ("fecha", ASCENDING))
+    dir_hora = ASCENDING if order == "asc" else DESCENDING
+    # _id desempata el ordenamiento para que el cursor sea estable
+    claves = [(campo, direccion), ("hora", dir_hora), ("_id", dir_hora)]
+
+    proyeccion = None
+    if campos:
+        # Solo se leen de MongoDB los campos solicitados y las claves del cursor
+        proyeccion = {c: 1 for campo_resp in campos for c in CAMPOS_TALLER[campo_resp]}
+        proyeccion.update({c: 1 for c, _ in claves})
+
+    return {
+        "relevancia": sort == "relevancia" and bool(q) and not prefijo,
+        "limit": limit,
+        "limite": limite,
+        "token_cursor": token_cursor,
+        "campos": campos,
+        "filtro": filtro,
+        "claves": claves,
+        "proyeccion": proyeccion,
+        "incluir_inscripciones": not campos or "inscripciones" in campos,
+        # Cache de lectura sobre la consulta normalizada
+        "clave_cache": generar_cache_key(
+            "workshops", q.lower(), prefijo, categoria, fecha_desde, fecha_hasta, sort, order, limite, disponibles,
+            token_cursor, ",".join(campos or []),
+        ),
+    }
+
+
+def formatear_taller(doc, campos):
+    """Serializa un taller con solo los campos pedidos (`campos` None: todos)"""
+    t = serializar_taller(doc)
+    return {k: t[k] for k in ["_id", *campos] if k in t} if campos else t
+
+
+def parsear_iso(valor):
+    """Convierte un timestamp ISO guardado (UTC sin zona) en datetime con zona, o None"""
+    try:
+        return datetime.fromisoformat(valor).replace(tzinfo=timezone.utc) if valor else None
+    except (TypeError, ValueError):
+        return None
+
+
+def validadores_taller(doc):
+    """ETag fuerte a partir del contador `version` del taller y su última modificación"""
+    modificado = parsear_iso(doc.get("modificado_en") or doc.get("actualizado_en") or doc.get("creado_en"))
+    return f"{doc['_id']}-{doc.get('version', 0)}", modificado
+
 
 def crear_app():
     """
@@ -38,58 +325,164 @@ def crear_app():
     Returns:
         Flask: Instancia configurada de la aplicación
     """
+    inicio_arranque = time.perf_counter()
     app = Flask(__name__)
     app.config.from_object(Config)
+    app.json = ProveedorJSON(app)
 
     # Configuración CORS
-    CORS(app, resources={r"/*": {"origins": app.config["CORS_ORIGINS"]}})
+    CORS(app, resources={r"/*": {"origins": app.config["CORS_ORIGINS"]}}, expose_headers=["X-Next-Cursor", "ETag"])
 
-    # Configuración de Rate Limiting
+    # Métricas del proceso (expuestas en /metrics)
+    metricas = crear_metricas()
+
+    # Conexión a Redis (el ping tiene un tiempo de conexión acotado para no retrasar el arranque)
     try:
-        redis_client = redis.from_url(app.config["REDIS_URL"])
+        redis_client = redis.from_url(app.config["REDIS_URL"], socket_connect_timeout=app.config["REDIS_TIMEOUT_CONEXION"])
         redis_client.ping()
         print("✅ Conexión a Redis exitosa")
-        
-        limiter = Limiter(
-            app=app,
-            key_func=get_remote_address,
-            storage_uri=app.config["RATELIMIT_STORAGE_URL"],
-            default_limits=[app.config["RATELIMIT_DEFAULT"]]
-        )
     except Exception as e:
         print(f"⚠️  Redis no disponible, usando rate limiting en memoria: {e}")
-        limiter = Limiter(
-            app=app,
-            key_func=get_remote_address,
-            default_limits=[app.config["RATELIMIT_DEFAULT"]]
-        )
+        redis_client = None
+
+    # Prefijo de las claves y canales de esta instancia en Redis (REDIS_PREFIJO, por defecto la base)
+    espacio_redis = f"{app.config['REDIS_PREFIJO']}:" if app.config["REDIS_PREFIJO"] else ""
+
+    def clave_limite():
+        """
+        Clave de rate limiting: el principal del JWT (rol y sub) si el token es
+        válido; si no, la dirección IP (login, registro y rutas públicas)
+        """
+        token = extraer_token_auth()
+        if token:
+            try:
+                payload = decodificar_token(token)
+                if payload.get("sub"):
+                    return f"{payload.get('rol')}:{payload['sub']}"
+            except jwt.InvalidTokenError:
+                pass
+        return get_remote_address()
+
+    # Configuración de Rate Limiting: contadores locales por proceso reconciliados
+    # con Redis en lotes (ver limites.py); sin Redis, límites por proceso
+    limiter = Limiter(
+        app=app,
+        key_func=clave_limite,
+        storage_uri=f"{AlmacenDosNiveles.STORAGE_SCHEME[0]}://",
+        storage_options={
+            "redis_client": redis_client,
+            "prefijo": f"{espacio_redis}limites:",
+            "intervalo": app.config["RATELIMIT_SINCRONIZACION_SEGUNDOS"],
+            "margen": app.config["RATELIMIT_MARGEN"],
+            "lote_minimo": app.config["RATELIMIT_LOTE_MINIMO"],
+            "metricas": metricas,
+        },
+        default_limits=[app.config["RATELIMIT_DEFAULT"]]
+    )
+
+    # Cache de respuestas del catálogo (Redis con respaldo LRU en memoria)
+    cache_talleres = CacheRespuestas(
+        redis_client,
+        prefijo="talleres",
+        ttl=app.config["CACHE_TTL"],
+        capacidad=app.config["CACHE_LRU_CAPACIDAD"],
+        metricas=metricas,
+        espacio=espacio_redis,
+    )
+
+    # Bus de eventos en vivo (SSE); Redis pub/sub reparte entre procesos
+    bus_eventos = BusEventos(redis_client, tam_cola=app.config["SSE_COLA_MAX"], espacio=espacio_redis)
+
+    # Pool de procesos para el hashing de contraseñas (registro, login e importación masiva);
+    # con la cola llena (común a todos los workers vía Redis), registro y login responden 503
+    pool_hash = PoolHash(
+        app.config["HASH_PROCESOS"],
+        max_cola=app.config["HASH_COLA_MAX"],
+        metricas=metricas,
+        redis_client=redis_client,
+        plazo_turno=app.config["HASH_PLAZO_TURNO_SEGUNDOS"],
+        espacio=espacio_redis,
+        procesos_masivos=app.config["HASH_PROCESOS_MASIVO"],
+    )
+
+    # Cache de principales autenticados (evita jwt.decode + find_one por petición)
+    cache_principales = CachePrincipales(
+        redis_client,
+        ttl=app.config["AUTH_CACHE_TTL"],
+        ttl_local=app.config["AUTH_CACHE_TTL_LOCAL"],
+        metricas=metricas,
+        espacio=espacio_redis,
+    )
+
+    # Tokens revocados (logout): filtro de Bloom local sincronizado desde Redis;
+    # solo una coincidencia en el filtro consulta Redis
+    revocacion = RevocacionTokens(
+        redis_client,
+        intervalo=app.config["REVOCACION_SINCRONIZACION_SEGUNDOS"],
+        capacidad=app.config["REVOCACION_CAPACIDAD"],
+        tasa_error=app.config["REVOCACION_TASA_ERROR"],
+        vida_maxima=int(timedelta(days=7).total_seconds()),
+        reconstruir=app.config["REVOCACION_RECONSTRUIR_SEGUNDOS"],
+        metricas=metricas,
+        espacio=espacio_redis,
+    )
+    revocacion.iniciar()
 
     # Configuración y conexión a MongoDB
+    # MongoClient conecta en segundo plano: el arranque no espera al servidor
+    # (la verificación y la preparación de la base corren en un hilo, ver /ready)
     try:
-        cliente = MongoClient(app.config["MONGO_URI"], serverSelectionTimeoutMS=5000)
-        cliente.admin.command('ping')
-        print("✅ Conexión a MongoDB exitosa")
+        opciones_mongo = {
+            "serverSelectionTimeoutMS": app.config["MONGO_SERVER_SELECTION_TIMEOUT_MS"],
+            "maxPoolSize": app.config["MONGO_MAX_POOL_SIZE"],
+            "minPoolSize": app.config["MONGO_MIN_POOL_SIZE"],
+            "maxIdleTimeMS": app.config["MONGO_MAX_IDLE_TIME_MS"],
+            "event_listeners": [ObservadorMongo(metricas)],
+        }
+        if app.config["MONGO_COMPRESSORS"]:
+            opciones_mongo["compressors"] = app.config["MONGO_COMPRESSORS"]
+        cliente = MongoClient(app.config["MONGO_URI"], **opciones_mongo)
 
         db = cliente[app.config["MONGO_DB_NAME"]]
         col_talleres = db["talleres"]
         col_estudiantes = db["estudiantes"]
-
-        # Creación de índices
-        col_talleres.create_index([("fecha", ASCENDING), ("hora", ASCENDING)])
-        col_talleres.create_index("categoria")
-        try:
-            col_estudiantes.create_index("email", unique=True)
-        except errors.OperationFailure:
-            pass
-        print("✅ Índices de base de datos creados exitosamente")
-
+        col_inscripciones = db["inscripciones"]
+        col_lista_espera = db["lista_espera"]
+        col_estadisticas = db["estadisticas"]
+        col_categorias = db["categorias"]
+
+        # Los endpoints públicos de catálogo leen con la preferencia configurada
+        # (secondaryPreferred por defecto); las escrituras y lecturas posteriores siguen en el primario
+        preferencias = {
+            "primary": ReadPreference.PRIMARY,
+            "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+            "secondary": ReadPreference.SECONDARY,
+            "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+            "nearest": ReadPreference.NEAREST,
+        }
+        lectura = preferencias.get(app.config["MONGO_LECTURA_CATALOGO"], ReadPreference.PRIMARY)
+        col_talleres_lectura = col_talleres.with_options(read_preference=lectura)
+        col_inscripciones_lectura = col_inscripciones.with_options(read_preference=lectura)
+        col_estadisticas_lectura = col_estadisticas.with_options(read_preference=lectura)
+        col_categorias_lectura = col_categorias.with_options(read_preference=lectura)
+
+        # Talleres individuales más consultados, en memoria de cada worker; se
+        # invalida sola vigilando la colección (change stream o sondeo)
+        cache_taller = CacheDocumentos(
+            col_talleres,
+            capacidad=app.config["CACHE_TALLER_CAPACIDAD"],
+            ttl=app.config["CACHE_TALLER_TTL"],
+            intervalo_sondeo=app.config["CACHE_TALLER_SONDEO_SEGUNDOS"],
+            nombre="taller",
+            metricas=metricas,
+        )
     except Exception as e:
-        print(f"❌ Error conectando a MongoDB: {e}")
-        print("💡 Asegúrate de que MongoDB esté ejecutándose:")
-        print("   - Inicia Docker Desktop")
-        print("   - Ejecuta: docker-compose up -d")
-        print("   - O ejecuta: docker run -d -p 27017:27017 --name mongodb mongo:latest")
-        raise SystemExit("Falló la conexión a MongoDB. Por favor inicia MongoDB e intenta nuevamente.")
+        # Solo una configuración inválida (URI, opciones) falla aquí; un servidor caído se reporta en /ready
+        print(f"❌ Configuración de MongoDB inválida: {e}")
+        raise SystemExit("Falló la configuración de MongoDB. Revisa MONGO_URI y las opciones del cliente.")
+
+    # Tiempo máximo de servidor para consultas de lectura (acota la latencia de cola)
+    MAX_TIME_MS = app.config["MONGO_MAX_TIME_MS"] or None
 
     # Funciones utilitarias
     def oid(id_str: str):
@@ -111,54 +504,320 @@ def crear_app():
         except IndexError:
             return None
 
-    def generar_cache_key(prefix: str, *args):
-        """Genera clave única para cache"""
-        key_data = f"{prefix}:{':'.join(str(arg) for arg in args)}"
-        return hashlib.md5(key_data.encode()).hexdigest()
+    def decodificar_token(token):
+        """
+        Decodifica un JWT una sola vez por petición
+
+        El rate limiting (una llamada por límite evaluado) y los decoradores de
+        autenticación comparten el resultado guardado en `flask.g`, incluido el
+        error de validación, que se vuelve a lanzar.
+        """
+        previo = g.get("jwt_decodificado")
+        if previo is None or previo[0] != token:
+            try:
+                previo = (token, jwt.decode(token, app.config["JWT_SECRET"], algorithms=["HS256"]), None)
+            except jwt.InvalidTokenError as e:
+                previo = (token, None, e)
+            g.jwt_decodificado = previo
+        if previo[2] is not None:
+            raise previo[2]
+        return previo[1]
+
+    def paginar(coleccion, filtro, claves, limite, token_cursor, proyeccion=None):
+        """
+        Ejecuta una consulta paginada por keyset (limite None: sin paginar)
+
+        Returns:
+            tuple: (documentos, siguiente_cursor) o (None, None) si el cursor es inválido
+        """
+        filtro = filtro_pagina(filtro, claves, token_cursor)
+        if filtro is None:
+            return None, None
+        docs = list(coleccion.find(filtro, proyeccion, sort=claves, limit=limite + 1 if limite else 0, max_time_ms=MAX_TIME_MS))
+        return cortar_pagina(docs, limite, claves)
+
+    def paginar_relevancia(coleccion, filtro, limite, token_cursor, proyeccion=None):
+        """
+        Pagina resultados de texto completo ordenados por puntaje de relevancia
+
+        El puntaje no puede usarse como clave de keyset, así que el cursor
+        guarda el desplazamiento; los resultados de búsqueda son acotados.
+        """
+        desplazamiento = desplazamiento_relevancia(token_cursor)
+        if desplazamiento is None:
+            return None, None
+        docs = list(coleccion.find(
+            filtro, {**(proyeccion or {}), **PUNTAJE_TEXTO}, sort=ORDEN_RELEVANCIA,
+            skip=desplazamiento, limit=limite + 1 if limite else 0, max_time_ms=MAX_TIME_MS,
+        ))
+        return cortar_pagina_relevancia(docs, limite, desplazamiento)
+
+    def quiere_ndjson():
+        """Indica si el cliente pidió respuesta en streaming (Accept NDJSON o ?stream=1)"""
+        if (request.args.get("stream") or "").strip().lower() in ("1", "true"):
+            return True
+        mejor = request.accept_mimetypes.best_match(["application/json", "application/x-ndjson"])
+        return mejor == "application/x-ndjson"
+
+    def transmitir_ndjson(cursor, serializar, preparar=None):
+        """
+        Responde en NDJSON a medida que llegan los lotes del cursor
+
+        La memoria queda acotada al tamaño de lote (STREAM_BATCH_SIZE) sin
+        importar cuántos documentos tenga el resultado.
+
+        Args:
+            cursor: Cursor de pymongo sin materializar
+            serializar: Función documento -> dict
+            preparar: Función opcional que completa cada lote antes de serializar
+        """
+        lote = app.config["STREAM_BATCH_SIZE"]
+        cursor = cursor.batch_size(lote)
+
+        def emitir(docs):
+            if preparar:
+                preparar(docs)
+            return "".join(app.json.dumps(serializar(d)) + "\n" for d in docs)
+
+        def generar():
+            buffer = []
+            for doc in cursor:
+                buffer.append(doc)
+                if len(buffer) >= lote:
+                    yield emitir(buffer)
+                    buffer = []
+            if buffer:
+                yield emitir(buffer)
+
+        return app.response_class(stream_with_context(generar()), status=200, mimetype="application/x-ndjson")
 
     def ahora_iso():
         """Obtiene timestamp actual en formato ISO 8601"""
         return datetime.utcnow().isoformat()
 
-    def serializar_taller(doc):
-        """Convierte documento de taller a formato JSON"""
-        if not doc:
-            return None
-        insc = doc.get("inscripciones", [])
-        cupo = int(doc.get("cupo", 0))
-        cupos_disponibles = max(cupo - len(insc), 0) if cupo >= 0 else 0
-        return {
-            "_id": str(doc.get("_id")),
-            "nombre": doc.get("nombre"),
-            "descripcion": doc.get("descripcion"),
-            "fecha": doc.get("fecha"),
-            "hora": doc.get("hora"),
-            "lugar": doc.get("lugar"),
-            "categoria": doc.get("categoria"),
-            "tipo": doc.get("tipo"),
-            "instructor": doc.get("instructor", ""),
-            "rating": float(doc.get("rating", 0)) if doc.get("rating") is not None else 0,
-            "cupo": cupo,
-            "cupos_disponibles": cupos_disponibles,
-            "creado_en": doc.get("creado_en"),
-            "actualizado_en": doc.get("actualizado_en"),
-            "inscripciones": [
-                {
-                    "estudiante_id": ins.get("estudiante_id"),
-                    "nombre": ins.get("nombre"),
-                    "email": ins.get("email"),
-                    "registrado_en": ins.get("registrado_en"),
-                }
-                for ins in insc
-            ],
-        }
+    # GET condicional (ETag / Last-Modified)
+
+    def no_modificado(etag, modificado):
+        """
+        Evalúa las precondiciones del cliente (If-None-Match tiene prioridad sobre If-Modified-Since)
+
+        Returns:
+            bool: True si el cliente ya tiene la representación vigente
+        """
+        if request.if_none_match:
+            # El ETag de una respuesta comprimida lleva el sufijo de su codificación
+            return any(request.if_none_match.contains(e) for e in variantes_etag(etag))
+        if request.if_modified_since and modificado:
+            return modificado.replace(microsecond=0) <= request.if_modified_since
+        return False
+
+    def con_validadores(respuesta, etag, modificado):
+        """Añade ETag y Last-Modified; no-cache obliga al navegador a revalidar en cada uso"""
+        respuesta.set_etag(etag)
+        if modificado:
+            respuesta.last_modified = modificado
+        respuesta.headers["Cache-Control"] = "no-cache"
+        return respuesta
+
+    def respuesta_no_modificada(etag, modificado):
+        return con_validadores(app.response_class(status=304), etag, modificado)
+
+    def actualizar_estadisticas(categorias=None, **deltas):
+        """
+        Aplica incrementos a los contadores materializados de /stats y /categories
+
+        Args:
+            categorias (dict): Incremento por categoría, ej. {"tecnologia": 1}
+            **deltas: Incrementos de talleres, estudiantes o registros
+        """
+        try:
+            if deltas:
+                col_estadisticas.update_one({"_id": "global"}, {"$inc": deltas}, upsert=True)
+            for categoria, delta in (categorias or {}).items():
+                if categoria and delta:
+                    col_categorias.update_one({"_id": categoria}, {"$inc": {"n": delta}}, upsert=True)
+        except Exception as e:
+            # La reconciliación periódica corrige cualquier incremento perdido
+            print(f"⚠️  No se pudieron actualizar las estadísticas: {e}")
+
+    def invalidar_catalogo():
+        """
+        Registra un cambio en el catálogo: avanza la versión de la colección
+        (ETag de los listados) e invalida la cache de respuestas
+        """
+        try:
+            col_estadisticas.update_one(
+                {"_id": "global"},
+                {"$inc": {"version_catalogo": 1}, "$set": {"catalogo_modificado_en": ahora_iso()}},
+                upsert=True,
+            )
+        except Exception as e:
+            print(f"⚠️  No se pudo actualizar la versión del catálogo: {e}")
+        cache_talleres.invalidar()
+
+    def publicar_evento(evento):
+        """Publica un evento en vivo; un fallo nunca afecta a la escritura que lo originó"""
+        try:
+            bus_eventos.publicar(evento)
+        except Exception as e:
+            print(f"⚠️  No se pudo publicar el evento: {e}")
+
+    # Conexiones SSE abiertas en este proceso (cada una ocupa un hilo del servidor WSGI)
+    conexiones_sse = threading.BoundedSemaphore(app.config["SSE_CONEXIONES_MAX"])
+
+    def transmitir_eventos(taller_id=None, inicial=None):
+        """
+        Respuesta Server-Sent Events con los eventos del bus (de un taller o de todo el catálogo)
+
+        Cada conexión ocupa un hilo mientras está abierta: con muchos clientes
+        conviene el modo ASGI, que atiende estos streams sobre el event loop.
+        Bajo un servidor sin hilos (gunicorn sync) una conexión bloquearía el
+        worker entero, por lo que se responde 503; con hilos se admiten como
+        máximo SSE_CONEXIONES_MAX por proceso para dejar hilos libres a la API.
+        """
+        if not servidor_concurrente(request.environ) or not conexiones_sse.acquire(blocking=False):
+            respuesta = jsonify({"mensaje": "Eventos en vivo no disponibles en este momento, intenta más tarde"})
+            respuesta.headers["Retry-After"] = str(app.config["SSE_REINTENTAR_SEGUNDOS"])
+            return respuesta, 503
+        cola = bus_eventos.suscribir()
+        latido = app.config["SSE_LATIDO_SEGUNDOS"]
+
+        def generar():
+            try:
+                yield b"retry: 3000\n\n"
+                if inicial:
+                    yield formatear_sse(inicial)
+                while True:
+                    try:
+                        evento = cola.get(timeout=latido)
+                    except queue.Empty:
+                        # Comentario SSE: mantiene viva la conexión y detecta clientes caídos
+                        yield b": ping\n\n"
+                        continue
+                    if evento is DESCONECTAR:
+                        return
+                    if taller_id is None or evento.get("taller_id") == taller_id:
+                        yield formatear_sse(evento)
+            finally:
+                bus_eventos.desuscribir(cola)
+
+        respuesta = app.response_class(generar(), status=200, mimetype="text/event-stream")
+        respuesta.headers["Cache-Control"] = "no-cache"
+        respuesta.headers["X-Accel-Buffering"] = "no"
+        # close() se llama aunque el generador nunca haya arrancado
+        respuesta.call_on_close(conexiones_sse.release)
+        return respuesta
+
+    def reconciliar_periodicamente():
+        """Hilo de fondo que recalcula las estadísticas y contadores materializados cada cierto intervalo"""
+        intervalo = app.config["ESTADISTICAS_RECONCILIAR_SEGUNDOS"]
+        while True:
+            time.sleep(intervalo)
+            try:
+                # Con Redis, un solo worker reconcilia por intervalo
+                if redis_client is not None and not redis_client.set(f"{espacio_redis}estadisticas:reconciliar", 1, nx=True, ex=intervalo):
+                    continue
+                reconciliar_estadisticas(db)
+                # También los contadores por taller (inscritos, cupos y lista de espera)
+                if backfill_inscritos(db):
+                    invalidar_catalogo()
+            except Exception as e:
+                print(f"⚠️  Falló la reconciliación de estadísticas: {e}")
+
+    if app.config["ESTADISTICAS_RECONCILIAR_SEGUNDOS"] > 0:
+        threading.Thread(target=reconciliar_periodicamente, name="reconciliar-estadisticas", daemon=True).start()
+
+    def promover_lista_espera(_id):
+        """
+        Asigna los cupos libres de un taller a su lista de espera, en orden de llegada
+
+        Cada promoción toma atómicamente la cabeza de la cola y luego reserva el
+        cupo; si ya no hay cupo, el estudiante vuelve a la cola con su mismo orden.
+
+        Returns:
+            list: IDs de los estudiantes promovidos
+        """
+        promovidos = []
+        while True:
+            candidato = col_lista_espera.find_one_and_delete({"taller_id": _id}, sort=[("orden", ASCENDING)])
+            if not candidato:
+                break
+            actualizado = col_talleres.find_one_and_update(
+                {"_id": _id, "cupos_disponibles": {"$gt": 0}},
+                {"$inc": {"inscritos": 1, "cupos_disponibles": -1, "en_espera": -1, "version": 1}, "$set": {"modificado_en": ahora_iso()}},
+                projection={"fecha": 1, "hora": 1},
+            )
+            if not actualizado:
+                try:
+                    col_lista_espera.insert_one(candidato)
+                except errors.DuplicateKeyError:
+                    # El estudiante volvió a unirse mientras tanto (esa entrada ya se contó):
+                    # la del candidato se pierde y deja de contar
+                    col_talleres.update_one({"_id": _id}, {"$inc": {"en_espera": -1}})
+                break
+            try:
+                col_inscripciones.insert_one({
+                    "taller_id": _id,
+                    "estudiante_id": candidato["estudiante_id"],
+                    "nombre": candidato.get("nombre"),
+                    "email": candidato.get("email"),
+                    "registrado_en": ahora_iso(),
+                    "fecha": actualizado.get("fecha"),
+                    "hora": actualizado.get("hora"),
+                })
+            except errors.DuplicateKeyError:
+                # Ya estaba inscrito: se libera el cupo y se sigue con el siguiente
+                col_talleres.update_one(
+                    {"_id": _id},
+                    {"$inc": {"inscritos": -1, "cupos_disponibles": 1, "version": 1}, "$set": {"modificado_en": ahora_iso()}},
+                )
+                continue
+            promovidos.append(candidato["estudiante_id"])
+        if promovidos:
+            actualizar_estadisticas(registros=len(promovidos))
+            invalidar_catalogo()
+        return promovidos
+
+    def posicion_lista_espera(_id, est_id):
+        """Devuelve (posición 1-based o None, total en espera) de un estudiante en la cola de un taller"""
+        entrada = col_lista_espera.find_one({"taller_id": _id, "estudiante_id": est_id}, {"orden": 1})
+        total = col_lista_espera.count_documents({"taller_id": _id})
+        if not entrada:
+            return None, total
+        return col_lista_espera.count_documents({"taller_id": _id, "orden": {"$lt": entrada["orden"]}}) + 1, total
+
+    def adjuntar_inscripciones(docs, coleccion=None):
+        """
+        Completa el campo `inscripciones` de los talleres con una sola consulta
+        a la colección de inscripciones
+
+        Args:
+            docs (list): Documentos de talleres
+            coleccion: Colección a consultar (por defecto la del primario)
+
+        Returns:
+            list: Los mismos documentos con `inscripciones` asignado
+        """
+        docs = [d for d in docs if d]
+        if not docs:
+            return docs
+        por_taller = {d["_id"]: [] for d in docs}
+        for ins in (coleccion or col_inscripciones).find(
+            {"taller_id": {"$in": list(por_taller)}},
+            sort=[("registrado_en", ASCENDING)],
+            max_time_ms=MAX_TIME_MS,
+        ):
+            por_taller[ins["taller_id"]].append(ins)
+        for d in docs:
+            d["inscripciones"] = por_taller[d["_id"]]
+        return docs
 
     def serializar_estudiante(doc):
         """Convierte documento de estudiante a formato JSON"""
         if not doc:
             return None
         return {
-            "_id": str(doc.get("_id")),
+            "_id": doc.get("_id"),
             "nombre": doc.get("nombre"),
             "email": doc.get("email"),
             "creado_en": doc.get("creado_en"),
@@ -175,9 +834,11 @@ def crear_app():
                 return jsonify({"mensaje": "Token de autorización requerido"}), 401
             
             try:
-                payload = jwt.decode(token, app.config["JWT_SECRET"], algorithms=["HS256"])
+                payload = decodificar_token(token)
                 if payload.get("rol") != "admin":
                     return jsonify({"mensaje": "Permisos de administrador requeridos"}), 403
+                if revocacion.revocado(payload.get("jti")):
+                    return jsonify({"mensaje": "Sesión cerrada"}), 401
                 request.usuario = payload
             except jwt.ExpiredSignatureError:
                 return jsonify({"mensaje": "Sesión expirada"}), 401
@@ -196,11 +857,21 @@ def crear_app():
             token = extraer_token_auth()
             if not token:
                 return jsonify({"mensaje": "Token de autorización requerido"}), 401
-            
+
+            # Un token ya verificado se resuelve sin decodificar ni consultar MongoDB
+            principal = cache_principales.obtener(token)
+            if principal is not None:
+                if revocacion.revocado(principal.get("_jti")):
+                    return jsonify({"mensaje": "Sesión cerrada"}), 401
+                request.usuario = {k: v for k, v in principal.items() if k not in ("_exp", "_jti")}
+                return f(*args, **kwargs)
+
             try:
-                payload = jwt.decode(token, app.config["JWT_SECRET"], algorithms=["HS256"])
+                payload = decodificar_token(token)
                 if payload.get("rol") != "estudiante":
                     return jsonify({"mensaje": "Permisos de estudiante requeridos"}), 403
+                if revocacion.revocado(payload.get("jti")):
+                    return jsonify({"mensaje": "Sesión cerrada"}), 401
                 
                 est_id = payload.get("sub")
                 if not est_id:
@@ -210,7 +881,7 @@ def crear_app():
                 if not _id:
                     return jsonify({"mensaje": "Token inválido - ID de estudiante malformado"}), 401
                 
-                est = col_estudiantes.find_one({"_id": _id})
+                est = col_estudiantes.find_one({"_id": _id}, {"email": 1, "nombre": 1})
                 if not est:
                     return jsonify({"mensaje": "Estudiante no encontrado"}), 401
                 
@@ -220,6 +891,7 @@ def crear_app():
                     "nombre": est.get("nombre", ""),
                     "rol": "estudiante",
                 }
+                cache_principales.guardar(token, {**request.usuario, "_jti": payload.get("jti")}, expira=payload.get("exp"))
             except jwt.ExpiredSignatureError:
                 return jsonify({"mensaje": "Sesión expirada"}), 401
             except jwt.InvalidTokenError:
@@ -229,46 +901,105 @@ def crear_app():
             return f(*args, **kwargs)
         return envoltura
 
-    # Datos de ejemplo para desarrollo
-    try:
-        if col_talleres.count_documents({}) == 0:
-            ahora = datetime.utcnow()
-            ejemplos = [
-                {
-                    "nombre": "Introducción a Python",
-                    "descripcion": "Fundamentos de Python.",
-                    "fecha": (ahora.date().isoformat()),
-                    "hora": (ahora.strftime("%H:%M")),
-                    "lugar": "Aula 101",
-                    "categoria": "tecnologia",
-                    "tipo": "curso técnico",
-                    "instructor": "Ana Pérez",
-                    "rating": 4.8,
-                    "cupo": 30,
-                    "creado_en": ahora_iso(),
-                    "actualizado_en": None,
-                    "inscripciones": [],
-                },
-                {
-                    "nombre": "Habilidades Blandas",
-                    "descripcion": "Comunicación y equipo.",
-                    "fecha": (ahora.date().isoformat()),
-                    "hora": (ahora.strftime("%H:%M")),
-                    "lugar": "Sala Taller 2",
-                    "categoria": "habilidades-blandas",
-                    "tipo": "capacitacion",
-                    "instructor": "Luis Gómez",
-                    "rating": 4.6,
-                    "cupo": 25,
-                    "creado_en": ahora_iso(),
-                    "actualizado_en": None,
-                    "inscripciones": [],
-                },
-            ]
-            col_talleres.insert_many(ejemplos)
-            print("✅ Talleres de ejemplo insertados")
-    except Exception as e:
-        print(f"⚠️  Advertencia: No se pudieron insertar los datos de ejemplo: {e}")
+    # Estado del arranque (expuesto en /ready)
+    estado_inicio = {"mongo": False, "preparacion": "pendiente", "error": None, "arranque_ms": None}
+
+    def ejecutar_preparacion():
+        """Ejecuta `inicializar` en este worker y registra el resultado en el estado de arranque"""
+        estado_inicio["preparacion"] = "en_curso"
+        try:
+            resumen = inicializar(db)
+            for advertencia in resumen["advertencias"]:
+                print(f"⚠️  {advertencia}")
+            if resumen["ejemplos"]:
+                print("✅ Talleres de ejemplo insertados")
+            print("✅ Base de datos preparada (índices y estadísticas)")
+            estado_inicio["preparacion"] = "completa"
+        except Exception as e:
+            print(f"⚠️  Advertencia: No se pudo preparar la base de datos: {e}")
+            estado_inicio["error"] = str(e)
+            estado_inicio["preparacion"] = "fallida"
+
+    def preparar_con_candado(candado):
+        """Prepara la base renovando el candado mientras dura y liberándolo al terminar"""
+        fin = threading.Event()
+
+        def renovar():
+            while not fin.wait(candado.timeout / 3):
+                try:
+                    candado.reacquire()
+                except Exception:
+                    return
+
+        threading.Thread(target=renovar, name="candado-preparacion", daemon=True).start()
+        try:
+            ejecutar_preparacion()
+        finally:
+            fin.set()
+            try:
+                candado.release()
+            except Exception:
+                pass  # Ya venció: otro worker pudo tomarlo
+
+    def preparacion_vigente_segura():
+        try:
+            return preparacion_vigente(db)
+        except Exception:
+            return False
+
+    def preparar_en_segundo_plano():
+        """
+        Hilo de arranque: espera a MongoDB y prepara la base (índices, ejemplos, estadísticas)
+
+        Con Redis, un solo worker del despliegue (REDIS_PREFIJO) ejecuta la
+        preparación a la vez. Los demás quedan listos cuando la marca de `inicializar` indica
+        que la base está al nivel de esquema de este código; hasta entonces
+        esperan (503 en /ready) y toman el relevo si el candado queda libre,
+        por ejemplo porque el worker que preparaba murió. Con INICIO_PREPARAR=0
+        se omite y se espera que `python migraciones.py init` ya se haya ejecutado.
+        """
+        espera = 0.5
+        while True:
+            try:
+                cliente.admin.command("ping")
+                break
+            except Exception as e:
+                estado_inicio["error"] = str(e)
+                print(f"⚠️  MongoDB no disponible, reintentando: {e}")
+                time.sleep(espera)
+                espera = min(espera * 2, 10)
+        print("✅ Conexión a MongoDB exitosa")
+        estado_inicio["error"] = None
+        estado_inicio["mongo"] = True
+        if not app.config["INICIO_PREPARAR"]:
+            estado_inicio["preparacion"] = "omitida"
+            return
+        if redis_client is None:
+            # Sin Redis cada worker prepara por su cuenta (todos los pasos son idempotentes)
+            ejecutar_preparacion()
+            return
+        while True:
+            # Quien ya esperaba no repite la preparación que otro acaba de completar
+            if estado_inicio["preparacion"] == "esperando" and preparacion_vigente_segura():
+                estado_inicio["preparacion"] = "delegada"
+                return
+            try:
+                candado = redis_client.lock(
+                    f"{espacio_redis}inicio:preparar", timeout=app.config["INICIO_CANDADO_SEGUNDOS"], thread_local=False
+                )
+                tomado = candado.acquire(blocking=False)
+            except Exception:
+                ejecutar_preparacion()  # Redis no responde: se prepara sin coordinar
+                return
+            if tomado:
+                preparar_con_candado(candado)
+                return
+            if preparacion_vigente_segura():
+                # Otro worker la está ejecutando sobre una base que ya tiene el esquema que este código necesita
+                estado_inicio["preparacion"] = "delegada"
+                return
+            estado_inicio["preparacion"] = "esperando"
+            time.sleep(1)
 
     @app.get("/")
     @limiter.limit("30 per minute")
@@ -288,6 +1019,7 @@ def crear_app():
                 "workshops": "/workshops",
                 "auth": "/auth/login",
                 "refresh": "/auth/refresh",
+                "logout": "/auth/logout",
                 "stats": "/stats",
                 "categories": "/categories",
                 "openapi": "/openapi.json"
@@ -321,13 +1053,13 @@ def crear_app():
             refresh_exp = datetime.utcnow() + timedelta(days=7)
             
             token = jwt.encode(
-                {"sub": usuario, "rol": "admin", "exp": exp, "iat": datetime.utcnow()},
+                {"sub": usuario, "rol": "admin", "exp": exp, "iat": datetime.utcnow(), "jti": uuid.uuid4().hex},
                 app.config["JWT_SECRET"],
                 algorithm="HS256",
             )
             
             refresh_token = jwt.encode(
-                {"sub": usuario, "rol": "admin", "exp": refresh_exp, "iat": datetime.utcnow(), "type": "refresh"},
+                {"sub": usuario, "rol": "admin", "exp": refresh_exp, "iat": datetime.utcnow(), "jti": uuid.uuid4().hex, "type": "refresh"},
                 app.config["JWT_SECRET"],
                 algorithm="HS256",
             )
@@ -340,6 +1072,35 @@ def crear_app():
             }), 200
         return jsonify({"mensaje": "Credenciales inválidas"}), 401
 
+    EMAIL_REGEX = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
+    def validar_estudiante(datos):
+        """
+        Valida los datos de registro de un estudiante
+
+        Returns:
+            tuple: ((nombre, email, contrasena), None) o (None, dict de error)
+        """
+        if not isinstance(datos, dict):
+            return None, {"mensaje": "Cada estudiante debe ser un objeto JSON"}
+        nombre = datos.get("nombre") or ""
+        email = datos.get("email") or ""
+        contrasena = datos.get("contrasena") or ""
+        if not all(isinstance(v, str) for v in (nombre, email, contrasena)):
+            return None, {"mensaje": "Nombre, email y contraseña deben ser strings"}
+        nombre = nombre.strip()
+        email = email.strip().lower()
+
+        if not nombre or not email or not contrasena:
+            return None, {"mensaje": "Nombre, email y contraseña son requeridos"}
+        if len(contrasena) < 8:
+            return None, {"mensaje": "La contraseña debe tener al menos 8 caracteres"}
+
+        # Validación adicional de email
+        if not EMAIL_REGEX.match(email):
+            return None, {"mensaje": "Formato de email inválido"}
+        return (nombre, email, contrasena), None
+
     @app.post("/auth/estudiantes/registro")
     @limiter.limit("3 per minute")
     def registro_estudiante():
@@ -356,44 +1117,36 @@ def crear_app():
         """
         
         datos = request.get_json(silent=True) or {}
-        nombre = (datos.get("nombre") or "").strip()
-        email = (datos.get("email") or "").strip().lower()
-        contrasena = (datos.get("contrasena") or "")
-        
-        if not nombre or not email or not contrasena:
-            return jsonify({"mensaje": "Nombre, email y contraseña son requeridos"}), 400
-        if len(contrasena) < 8:
-            return jsonify({"mensaje": "La contraseña debe tener al menos 8 caracteres"}), 400
-
-        # Validación adicional de email
-        import re
-        email_regex = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        if not re.match(email_regex, email):
-            return jsonify({"mensaje": "Formato de email inválido"}), 400
+        valido, error = validar_estudiante(datos)
+        if error:
+            return jsonify(error), 400
+        nombre, email, contrasena = valido
 
         try:
             doc = {
                 "nombre": nombre,
                 "email": email,
-                "hash": generate_password_hash(contrasena),
+                "hash": pool_hash.generar(contrasena, app.config["PASSWORD_HASH_METODO"]),
                 "creado_en": ahora_iso(),
             }
+            doc["terminos"] = terminos_estudiante(doc)
             res = col_estudiantes.insert_one(doc)
             est = col_estudiantes.find_one({"_id": res.inserted_id})
         except errors.DuplicateKeyError:
             return jsonify({"mensaje": "El email ya está registrado"}), 409
+        actualizar_estadisticas(estudiantes=1)
 
         exp = datetime.utcnow() + timedelta(hours=8)
         refresh_exp = datetime.utcnow() + timedelta(days=7)
         
         token = jwt.encode(
-            {"sub": str(est["_id"]), "rol": "estudiante", "email": est["email"], "nombre": est.get("nombre", ""), "exp": exp, "iat": datetime.utcnow()},
+            {"sub": str(est["_id"]), "rol": "estudiante", "email": est["email"], "nombre": est.get("nombre", ""), "exp": exp, "iat": datetime.utcnow(), "jti": uuid.uuid4().hex},
             app.config["JWT_SECRET"],
             algorithm="HS256",
         )
         
         refresh_token = jwt.encode(
-            {"sub": str(est["_id"]), "rol": "estudiante", "email": est["email"], "nombre": est.get("nombre", ""), "exp": refresh_exp, "iat": datetime.utcnow(), "type": "refresh"},
+            {"sub": str(est["_id"]), "rol": "estudiante", "email": est["email"], "nombre": est.get("nombre", ""), "exp": refresh_exp, "iat": datetime.utcnow(), "jti": uuid.uuid4().hex, "type": "refresh"},
             app.config["JWT_SECRET"],
             algorithm="HS256",
         )
@@ -427,20 +1180,30 @@ def crear_app():
             return jsonify({"mensaje": "Email y contraseña son requeridos"}), 400
 
         est = col_estudiantes.find_one({"email": email})
-        if not est or not check_password_hash(est.get("hash", ""), contrasena):
+        if not est or not pool_hash.verificar(est.get("hash", ""), contrasena):
             return jsonify({"mensaje": "Credenciales inválidas"}), 401
 
+        metodo = app.config["PASSWORD_HASH_METODO"]
+        if requiere_rehash(est.get("hash"), metodo):
+            # El costo configurado cambió (o el hash viene de una importación masiva):
+            # se actualiza ahora que se conoce la contraseña
+            try:
+                nuevo_hash = pool_hash.generar(contrasena, metodo)
+                col_estudiantes.update_one({"_id": est["_id"], "hash": est.get("hash")}, {"$set": {"hash": nuevo_hash}})
+            except PoolSaturado:
+                pass  # Se reintenta en el próximo login
+
         exp = datetime.utcnow() + timedelta(hours=8)
         refresh_exp = datetime.utcnow() + timedelta(days=7)
         
         token = jwt.encode(
-            {"sub": str(est["_id"]), "rol": "estudiante", "email": est["email"], "nombre": est.get("nombre", ""), "exp": exp, "iat": datetime.utcnow()},
+            {"sub": str(est["_id"]), "rol": "estudiante", "email": est["email"], "nombre": est.get("nombre", ""), "exp": exp, "iat": datetime.utcnow(), "jti": uuid.uuid4().hex},
             app.config["JWT_SECRET"],
             algorithm="HS256",
         )
         
         refresh_token = jwt.encode(
-            {"sub": str(est["_id"]), "rol": "estudiante", "email": est["email"], "nombre": est.get("nombre", ""), "exp": refresh_exp, "iat": datetime.utcnow(), "type": "refresh"},
+            {"sub": str(est["_id"]), "rol": "estudiante", "email": est["email"], "nombre": est.get("nombre", ""), "exp": refresh_exp, "iat": datetime.utcnow(), "jti": uuid.uuid4().hex, "type": "refresh"},
             app.config["JWT_SECRET"],
             algorithm="HS256",
         )
@@ -488,6 +1251,11 @@ def crear_app():
             rol = payload.get("rol")
             if not rol:
                 return jsonify({"mensaje": "Token inválido"}), 401
+
+            # Cada refresh token sirve una sola vez: se revoca al emitir el par nuevo
+            if revocacion.revocado(payload.get("jti")):
+                return jsonify({"mensaje": "Refresh token revocado"}), 401
+            revocacion.revocar(payload.get("jti"), expira=payload.get("exp"))
             
             # Generar nuevos tokens
             exp = datetime.utcnow() + timedelta(hours=8)
@@ -495,13 +1263,13 @@ def crear_app():
             
             if rol == "admin":
                 new_token = jwt.encode(
-                    {"sub": payload["sub"], "rol": "admin", "exp": exp, "iat": datetime.utcnow()},
+                    {"sub": payload["sub"], "rol": "admin", "exp": exp, "iat": datetime.utcnow(), "jti": uuid.uuid4().hex},
                     app.config["JWT_SECRET"],
                     algorithm="HS256",
                 )
                 
                 new_refresh_token = jwt.encode(
-                    {"sub": payload["sub"], "rol": "admin", "exp": refresh_exp, "iat": datetime.utcnow(), "type": "refresh"},
+                    {"sub": payload["sub"], "rol": "admin", "exp": refresh_exp, "iat": datetime.utcnow(), "jti": uuid.uuid4().hex, "type": "refresh"},
                     app.config["JWT_SECRET"],
                     algorithm="HS256",
                 )
@@ -525,13 +1293,13 @@ def crear_app():
                     return jsonify({"mensaje": "Estudiante no encontrado"}), 401
                 
                 new_token = jwt.encode(
-                    {"sub": str(est["_id"]), "rol": "estudiante", "email": est["email"], "nombre": est.get("nombre", ""), "exp": exp, "iat": datetime.utcnow()},
+                    {"sub": str(est["_id"]), "rol": "estudiante", "email": est["email"], "nombre": est.get("nombre", ""), "exp": exp, "iat": datetime.utcnow(), "jti": uuid.uuid4().hex},
                     app.config["JWT_SECRET"],
                     algorithm="HS256",
                 )
                 
                 new_refresh_token = jwt.encode(
-                    {"sub": str(est["_id"]), "rol": "estudiante", "email": est["email"], "nombre": est.get("nombre", ""), "exp": refresh_exp, "iat": datetime.utcnow(), "type": "refresh"},
+                    {"sub": str(est["_id"]), "rol": "estudiante", "email": est["email"], "nombre": est.get("nombre", ""), "exp": refresh_exp, "iat": datetime.utcnow(), "jti": uuid.uuid4().hex, "type": "refresh"},
                     app.config["JWT_SECRET"],
                     algorithm="HS256",
                 )
@@ -554,6 +1322,78 @@ def crear_app():
         except Exception:
             return jsonify({"mensaje": "Error procesando refresh token"}), 401
 
+    def revocar_token(token, sub=None):
+        """
+        Revoca un token JWT firmado por la API (hasta su expiración)
+
+        Args:
+            token (str): Token a revocar
+            sub (str): Si se indica, el token solo se revoca si pertenece a ese principal
+
+        Returns:
+            bool: True si el token era válido y quedó revocado
+        """
+        try:
+            payload = decodificar_token(token)
+        except jwt.InvalidTokenError:
+            return False  # Expirado o inválido: ya no autoriza nada
+        if not payload.get("jti") or (sub is not None and payload.get("sub") != sub):
+            return False
+        revocacion.revocar(payload["jti"], expira=payload.get("exp"))
+        return True
+
+    @app.post("/auth/logout")
+    @limiter.limit("10 per minute")
+    def logout():
+        """
+        Cierra la sesión revocando el token de acceso actual
+
+        Body (opcional):
+            refresh_token (str): Refresh token de la misma sesión, que también se revoca
+
+        Returns:
+            JSON con mensaje de confirmación
+        """
+        token = extraer_token_auth()
+        if not token:
+            return jsonify({"mensaje": "Token de autorización requerido"}), 401
+        try:
+            payload = decodificar_token(token)
+        except jwt.ExpiredSignatureError:
+            return jsonify({"mensaje": "Sesión expirada"}), 401
+        except jwt.InvalidTokenError:
+            return jsonify({"mensaje": "Token inválido"}), 401
+        if revocacion.revocado(payload.get("jti")):
+            return jsonify({"mensaje": "Sesión cerrada"}), 401
+
+        revocar_token(token)
+        datos = request.get_json(silent=True) or {}
+        refresh = datos.get("refresh_token")
+        if isinstance(refresh, str) and refresh:
+            revocar_token(refresh, sub=payload.get("sub"))
+        return jsonify({"mensaje": "Sesión cerrada"}), 200
+
+    @app.post("/auth/revoke")
+    @requiere_admin
+    def revocar_tokens():
+        """
+        Revoca tokens de cualquier principal (administración)
+
+        Body:
+            tokens (list[str]): Tokens de acceso o refresh a revocar (o `token` con uno solo)
+
+        Returns:
+            JSON con la cantidad de tokens revocados
+        """
+        datos = request.get_json(silent=True) or {}
+        tokens = datos.get("tokens") if "tokens" in datos else [datos.get("token")]
+        if not isinstance(tokens, list) or not tokens or not all(isinstance(t, str) and t for t in tokens):
+            return jsonify({"mensaje": "Se requiere 'token' o una lista 'tokens'"}), 400
+        if len(tokens) > 100:
+            return jsonify({"mensaje": "Máximo 100 tokens por petición"}), 400
+        revocados = sum(1 for t in tokens if revocar_token(t))
+        return jsonify({"revocados": revocados, "ignorados": len(tokens) - revocados}), 200
+
     # Endpoints de Talleres
     @app.get("/workshops")
     @limiter.limit("60 per minute")
@@ -563,59 +1403,79 @@ def crear_app():
         
         Query Parameters:
             q (str): Búsqueda por texto en nombre, descripción, lugar, etc.
+            modo (str): "prefijo" para autocompletado por prefijo, sin acentos
             categoria (str): Filtrar por categoría específica
             fechaDesde (str): Fecha mínima en formato YYYY-MM-DD
             fechaHasta (str): Fecha máxima en formato YYYY-MM-DD
-            sort (str): Campo para ordenar (fecha, rating, creado_en)
+            sort (str): Campo para ordenar (relevancia, fecha, rating, creado_en)
             order (str): Dirección del ordenamiento (asc, desc)
             limit (int): Número máximo de resultados
+            disponibles (bool): Si es true, solo talleres con cupos disponibles
+            stream (bool): Si es 1 (o Accept: application/x-ndjson) responde en NDJSON sin paginar
             
         Returns:
             JSON con array de talleres que coinciden con los filtros
         """
-        # Extracción y validación de parámetros de consulta
-        q = (request.args.get("q") or "").strip()
-        categoria = (request.args.get("categoria") or "").strip()
-        fecha_desde = (request.args.get("fechaDesde") or "").strip()
-        fecha_hasta = (request.args.get("fechaHasta") or "").strip()
-        sort = request.args.get("sort") or "fecha"
-        order = request.args.get("order") or "asc"
-        limit = int(request.args.get("limit") or 0)
-
-        # Construcción del filtro de búsqueda MongoDB
-        filtro = {}
-        if q:
-            # Búsqueda de texto insensible a mayúsculas en múltiples campos
-            regex = Regex(q, "i")
-            filtro["$or"] = [
-                {"nombre": regex},
-                {"descripcion": regex},
-                {"lugar": regex},
-                {"tipo": regex},
-                {"instructor": regex},
-            ]
-        if categoria:
-            filtro["categoria"] = categoria
-        if fecha_desde or fecha_hasta:
-            # Las fechas se almacenan como strings YYYY-MM-DD, permitiendo comparaciones lexicográficas
-            rango = {}
-            if fecha_desde:
-                rango["$gte"] = fecha_desde
-            if fecha_hasta:
-                rango["$lte"] = fecha_hasta
-            filtro["fecha"] = rango
-
-        sort_map = {
-            "fecha": ("fecha", ASCENDING if order == "asc" else DESCENDING),
-            "rating": ("rating", DESCENDING if order == "desc" else ASCENDING),
-            "creado_en": ("creado_en", DESCENDING if order == "desc" else ASCENDING),
-        }
-        campo, direccion = sort_map.get(sort, ("fecha", ASCENDING))
-        cursor = col_talleres.find(filtro, sort=[(campo, direccion), ("hora", ASCENDING if order == "asc" else DESCENDING)])
-        if limit > 0:
-            cursor = cursor.limit(limit)
-        talleres = list(cursor)
-        return jsonify([serializar_taller(t) for t in talleres]), 200
+        try:
+            consulta = consulta_talleres(request.args, app.config["PAGINACION_MAX"])
+        except ValueError:
+            return jsonify({"mensaje": "limit debe ser un entero"}), 400
+        filtro, claves, proyeccion = consulta["filtro"], consulta["claves"], consulta["proyeccion"]
+        limit, limite, token_cursor = consulta["limit"], consulta["limite"], consulta["token_cursor"]
+        campos, relevancia, clave_cache = consulta["campos"], consulta["relevancia"], consulta["clave_cache"]
+        transmitir = quiere_ndjson()
+
+        etag = modificado = None
+        if not transmitir:
+            # La versión se lee antes que los datos: si una escritura ocurre entre ambas
+            # lecturas, el ETag queda atrasado y el cliente solo recibe un 200 adicional
+            marca = col_estadisticas_lectura.find_one(
+                {"_id": "global"}, {"version_catalogo": 1, "catalogo_modificado_en": 1}, max_time_ms=MAX_TIME_MS,
+            ) or {}
+            etag = f"c{marca.get('version_catalogo', 0)}-{clave_cache[:16]}"
+            modificado = parsear_iso(marca.get("catalogo_modificado_en"))
+            if no_modificado(etag, modificado):
+                return respuesta_no_modificada(etag, modificado)
+
+        generacion, cacheado = (None, None) if transmitir else cache_talleres.obtener(clave_cache)
+        if cacheado is not None:
+            # Formato en cache: "<siguiente_cursor>\n<cuerpo JSON>"
+            siguiente, cuerpo = cacheado.split("\n", 1)
+            respuesta = app.response_class(cuerpo, status=200, mimetype="application/json")
+            if siguiente:
+                respuesta.headers["X-Next-Cursor"] = siguiente
+            return con_validadores(respuesta, etag, modificado)
+
+        def formatear(doc):
+            return formatear_taller(doc, campos)
+
+        if transmitir:
+            if relevancia:
+                cursor_db = col_talleres_lectura.find(filtro, {**(proyeccion or {}), **PUNTAJE_TEXTO}, sort=ORDEN_RELEVANCIA)
+            else:
+                cursor_db = col_talleres_lectura.find(filtro, proyeccion, sort=claves)
+            if limit > 0:
+                cursor_db = cursor_db.limit(limit)
+            preparar = (lambda docs: adjuntar_inscripciones(docs, col_inscripciones_lectura)) if consulta["incluir_inscripciones"] else None
+            return transmitir_ndjson(cursor_db, formatear, preparar)
+
+        # La respuesta paginada se guarda en la cache compartida: se lee del primario para no
+        # fijar en ella (ni en su ETag) un resultado anterior a una escritura por el retraso de una réplica
+        if relevancia:
+            talleres, siguiente = paginar_relevancia(col_talleres, filtro, limite, token_cursor, proyeccion)
+        else:
+            talleres, siguiente = paginar(col_talleres, filtro, claves, limite, token_cursor, proyeccion)
+        if talleres is None:
+            return jsonify({"mensaje": "Cursor inválido"}), 400
+        if consulta["incluir_inscripciones"]:
+            adjuntar_inscripciones(talleres)
+        resultado = [formatear(t) for t in talleres]
+        cuerpo = app.json.dumps(resultado)
+        cache_talleres.guardar(clave_cache, f"{siguiente or ''}\n{cuerpo}", generacion)
+        respuesta = app.response_class(cuerpo, status=200, mimetype="application/json")
+        if siguiente:
+            respuesta.headers["X-Next-Cursor"] = siguiente
+        return con_validadores(respuesta, etag, modificado)
 
     @app.get("/workshops/<id_taller>")
     @limiter.limit("30 per minute")
@@ -623,26 +1483,63 @@ def crear_app():
         _id = oid(id_taller)
         if not _id:
             return jsonify({"mensaje": "ID inválido"}), 400
-        doc = col_talleres.find_one({"_id": _id})
+        cacheado = cache_taller.obtener(_id)
+        if cacheado is not None:
+            _, (cuerpo, etag, modificado) = cacheado
+            if no_modificado(etag, modificado):
+                return respuesta_no_modificada(etag, modificado)
+            return con_validadores(app.response_class(cuerpo, status=200, mimetype="application/json"), etag, modificado)
+        if request.if_none_match or request.if_modified_since:
+            # Revalidación: solo se leen los campos de versión, sin inscripciones ni serialización
+            marca = col_talleres_lectura.find_one(
+                {"_id": _id}, {"version": 1, "modificado_en": 1, "creado_en": 1}, max_time_ms=MAX_TIME_MS,
+            )
+            if not marca:
+                return jsonify({"mensaje": "Taller no encontrado"}), 404
+            etag, modificado = validadores_taller(marca)
+            if no_modificado(etag, modificado):
+                return respuesta_no_modificada(etag, modificado)
+        # Lo que se cachea se lee del primario: una secundaria atrasada dejaría en
+        # memoria una versión que ya no recibirá eventos de cambio
+        marca = cache_taller.marca()
+        doc = col_talleres.find_one({"_id": _id}, max_time_ms=MAX_TIME_MS)
         if not doc:
             return jsonify({"mensaje": "Taller no encontrado"}), 404
-        return jsonify(serializar_taller(doc)), 200
+        adjuntar_inscripciones([doc])
+        etag, modificado = validadores_taller(doc)
+        cuerpo = dumps_bytes(serializar_taller(doc)) + b"\n"
+        cache_taller.guardar(_id, doc.get("version"), (cuerpo, etag, modificado), marca)
+        return con_validadores(app.response_class(cuerpo, status=200, mimetype="application/json"), etag, modificado)
 
-    @app.post("/workshops")
-    @requiere_admin
-    def crear_taller():
-        datos = request.get_json(silent=True) or {}
+    CAMPOS_TEXTO_TALLER = ["nombre", "descripcion", "fecha", "hora", "lugar", "categoria", "tipo", "instructor"]
+    CAMPOS_EXPORTACION = ["nombre", "descripcion", "fecha", "hora", "lugar", "categoria", "tipo", "instructor", "rating", "cupo"]
+
+    def validar_taller(datos):
+        """
+        Valida y normaliza los datos de un taller nuevo
+
+        Args:
+            datos (dict): Cuerpo recibido
+
+        Returns:
+            tuple: (documento listo para insertar, None) o (None, dict de error)
+        """
+        if not isinstance(datos, dict):
+            return None, {"mensaje": "Cada taller debe ser un objeto JSON"}
         requeridos = ["nombre", "descripcion", "fecha", "hora", "lugar", "categoria", "tipo", "cupo"]
         faltantes = [c for c in requeridos if datos.get(c) in [None, ""]]
         if faltantes:
-            return jsonify({"mensaje": "Campos faltantes", "campos": faltantes}), 400
+            return None, {"mensaje": "Campos faltantes", "campos": faltantes}
+        invalidos = [c for c in CAMPOS_TEXTO_TALLER if datos.get(c) is not None and not isinstance(datos[c], str)]
+        if invalidos:
+            return None, {"mensaje": "Los campos de texto deben ser strings", "campos": invalidos}
 
         try:
             cupo = int(datos["cupo"])
             if cupo < 0:
                 raise ValueError()
         except Exception:
-            return jsonify({"mensaje": "Cupo debe ser un entero no negativo"}), 400
+            return None, {"mensaje": "Cupo debe ser un entero no negativo"}
 
         rating = datos.get("rating")
         if rating is not None:
@@ -651,7 +1548,7 @@ def crear_app():
                 if rating < 0 or rating > 5:
                     raise ValueError()
             except Exception:
-                return jsonify({"mensaje": "Rating debe ser un número entre 0 y 5"}), 400
+                return None, {"mensaje": "Rating debe ser un número entre 0 y 5"}
 
         nuevo = {
             "nombre": datos["nombre"].strip(),
@@ -664,13 +1561,168 @@ def crear_app():
             "instructor": (datos.get("instructor") or "").strip(),
             "rating": rating if rating is not None else 0,
             "cupo": cupo,
+            "inscritos": 0,
+            "cupos_disponibles": cupo,
             "creado_en": ahora_iso(),
             "actualizado_en": None,
-            "inscripciones": [],
+            "version": 1,
         }
-        res = col_talleres.insert_one(nuevo)
-        creado = col_talleres.find_one({"_id": res.inserted_id})
-        return jsonify(serializar_taller(creado)), 201
+        nuevo["modificado_en"] = nuevo["creado_en"]
+        nuevo["terminos"] = terminos_taller(nuevo)
+        return nuevo, None
+
+    @app.post("/workshops")
+    @requiere_admin
+    def crear_taller():
+        datos = request.get_json(silent=True) or {}
+        nuevo, error = validar_taller(datos)
+        if error:
+            return jsonify(error), 400
+        col_talleres.insert_one(nuevo)
+        actualizar_estadisticas({nuevo["categoria"]: 1}, talleres=1)
+        invalidar_catalogo()
+        publicar_evento(evento_taller("creado", nuevo))
+        # insert_one asigna _id al documento; no hace falta releerlo
+        nuevo["inscripciones"] = []
+        return jsonify(serializar_taller(nuevo)), 201
+
+    @app.post("/workshops/bulk")
+    @requiere_admin
+    def importar_talleres():
+        """
+        Importación masiva de talleres
+
+        Body:
+            Arreglo JSON de talleres o NDJSON (Content-Type: application/x-ndjson),
+            validados con las mismas reglas que POST /workshops
+
+        Query Parameters:
+            ordered (bool): Si es true, se detiene en el primer error (por defecto false)
+            batch (int): Tamaño de lote de insert_many (máximo BULK_BATCH_MAX)
+
+        Returns:
+            JSON con total de filas, insertados y lista de errores por fila
+        """
+        ordenado = (request.args.get("ordered") or "").strip().lower() in ("1", "true")
+        try:
+            tam_lote = int(request.args.get("batch") or app.config["BULK_BATCH_SIZE"])
+        except ValueError:
+            return jsonify({"mensaje": "batch debe ser un entero"}), 400
+        tam_lote = max(1, min(tam_lote, app.config["BULK_BATCH_MAX"]))
+
+        if request.mimetype == "application/x-ndjson":
+            def filas():
+                # Se lee línea a línea para no cargar el cuerpo completo en memoria
+                for linea in request.stream:
+                    linea = linea.strip()
+                    if not linea:
+                        continue
+                    try:
+                        yield json.loads(linea)
+                    except ValueError:
+                        yield None
+            filas_entrada = filas()
+        else:
+            datos = request.get_json(silent=True)
+            if not isinstance(datos, list):
+                return jsonify({"mensaje": "Se esperaba un arreglo JSON o NDJSON"}), 400
+            filas_entrada = datos
+
+        total = 0
+        insertados = 0
+        errores = []
+        categorias = {}
+        lote = []
+
+        def insertar(lote):
+            """Inserta un lote y devuelve (documentos insertados, errores por fila)"""
+            try:
+                col_talleres.insert_many([doc for _, doc in lote], ordered=ordenado)
+                return [doc for _, doc in lote], []
+            except errors.BulkWriteError as e:
+                fallidos = {w["index"]: w.get("errmsg", "Error de escritura") for w in e.details.get("writeErrors", [])}
+                if ordenado:
+                    # En modo ordenado MongoDB no intenta las filas posteriores al primer fallo
+                    primero = min(fallidos) if fallidos else len(lote)
+                    ok = [doc for _, doc in lote[:primero]]
+                else:
+                    ok = [doc for i, (_, doc) in enumerate(lote) if i not in fallidos]
+                return ok, [{"indice": lote[i][0], "mensaje": msg} for i, msg in sorted(fallidos.items())]
+
+        detenido = False
+        for indice, fila in enumerate(filas_entrada):
+            total += 1
+            if fila is None:
+                errores.append({"indice": indice, "mensaje": "JSON inválido"})
+            else:
+                doc, error = validar_taller(fila)
+                if error:
+                    errores.append({"indice": indice, **error})
+                else:
+                    lote.append((indice, doc))
+            if ordenado and errores:
+                detenido = True
+            if len(lote) >= tam_lote or (detenido and lote):
+                ok, fallos = insertar(lote)
+                lote = []
+                insertados += len(ok)
+                errores.extend(fallos)
+                for doc in ok:
+                    categorias[doc["categoria"]] = categorias.get(doc["categoria"], 0) + 1
+                if ordenado and fallos:
+                    detenido = True
+            if detenido:
+                break
+        if lote:
+            ok, fallos = insertar(lote)
+            insertados += len(ok)
+            errores.extend(fallos)
+            for doc in ok:
+                categorias[doc["categoria"]] = categorias.get(doc["categoria"], 0) + 1
+
+        if insertados:
+            actualizar_estadisticas(categorias, talleres=insertados)
+            invalidar_catalogo()
+            publicar_evento({"tipo": "importacion", "insertados": insertados})
+        errores.sort(key=lambda e: e["indice"])
+        return jsonify({
+            "total": total,
+            "insertados": insertados,
+            "errores": errores,
+            "detenido": detenido,
+        }), 200
+
+    @app.get("/workshops/export")
+    @requiere_admin
+    def exportar_talleres():
+        """
+        Exporta el catálogo completo en NDJSON, en el formato que acepta /workshops/bulk
+
+        La respuesta se transmite por lotes, por lo que la memoria no crece con el catálogo.
+        """
+        proyeccion = {c: 1 for c in CAMPOS_EXPORTACION}
+        cursor_db = col_talleres.find({}, proyeccion, sort=[("fecha", ASCENDING), ("hora", ASCENDING), ("_id", ASCENDING)])
+        respuesta = transmitir_ndjson(cursor_db, lambda t: {"_id": t["_id"], **{c: t.get(c) for c in CAMPOS_EXPORTACION}})
+        respuesta.headers["Content-Disposition"] = "attachment; filename=talleres.ndjson"
+        return respuesta
+
+    @app.get("/workshops/events")
+    @limiter.limit("20 per minute")
+    def suscribir_catalogo():
+        """Stream SSE de todo el catálogo: cupos, ediciones, altas y bajas de talleres"""
+        return transmitir_eventos()
+
+    @app.get("/workshops/<id_taller>/events")
+    @limiter.limit("20 per minute")
+    def suscribir_taller(id_taller):
+        """Stream SSE de un taller; el primer evento (`estado`) trae sus contadores actuales"""
+        _id = oid(id_taller)
+        if not _id:
+            return jsonify({"mensaje": "ID inválido"}), 400
+        doc = col_talleres.find_one({"_id": _id}, {"cupo": 1, "inscritos": 1, "cupos_disponibles": 1, "en_espera": 1, "version": 1})
+        if not doc:
+            return jsonify({"mensaje": "Taller no encontrado"}), 404
+        return transmitir_eventos(id_taller, evento_taller("estado", doc))
 
     @app.put("/workshops/<id_taller>")
     @requiere_admin
@@ -681,8 +1733,8 @@ def crear_app():
         datos = request.get_json(silent=True) or {}
         permitidos = ["nombre", "descripcion", "fecha", "hora", "lugar", "categoria", "tipo", "cupo", "instructor", "rating"]
         cambios = {}
-        # Necesitamos doc para validaciones de cupo
-        doc = col_talleres.find_one({"_id": _id}, {"inscripciones": 1})
+        # Necesitamos los contadores para validaciones de cupo y los textos para recalcular `terminos`
+        doc = col_talleres.find_one({"_id": _id}, {"cupo": 1, "inscritos": 1, **{c: 1 for c in CAMPOS_TERMINOS_TALLER}})
         for k, v in datos.items():
             if k in permitidos:
                 if k == "cupo":
@@ -690,7 +1742,7 @@ def crear_app():
                         nv = int(v)
                         if nv < 0:
                             raise ValueError()
-                        ins_len = len(doc.get("inscripciones", [])) if doc else 0
+                        ins_len = int(doc.get("inscritos", 0)) if doc else 0
                         if nv < ins_len:
                             return jsonify({"mensaje": f"No puedes establecer un cupo menor a los inscritos actuales ({ins_len})"}), 400
                         cambios["cupo"] = nv
@@ -708,11 +1760,36 @@ def crear_app():
                     cambios[k] = v.strip()
         if not cambios:
             return jsonify({"mensaje": "Nada para actualizar"}), 400
+        if doc and any(c in cambios for c in CAMPOS_TERMINOS_TALLER):
+            cambios["terminos"] = terminos_taller({**doc, **cambios})
         cambios["actualizado_en"] = ahora_iso()
-        res = col_talleres.update_one({"_id": _id}, {"$set": cambios})
+        cambios["modificado_en"] = cambios["actualizado_en"]
+        filtro = {"_id": _id}
+        actualizacion = {"$set": cambios, "$inc": {"version": 1}}
+        if "cupo" in cambios and doc:
+            # cupos_disponibles se ajusta por la diferencia de cupo; el filtro evita carreras
+            # con otra edición de cupo o con inscripciones que superen el nuevo valor
+            cupo_actual = int(doc.get("cupo", 0))
+            filtro.update({"cupo": cupo_actual, "inscritos": {"$lte": cambios["cupo"]}})
+            actualizacion["$inc"]["cupos_disponibles"] = cambios["cupo"] - cupo_actual
+        res = col_talleres.update_one(filtro, actualizacion)
         if res.matched_count == 0:
+            if doc and "cupo" in cambios:
+                return jsonify({"mensaje": "El taller cambió mientras se editaba, intenta nuevamente"}), 409
             return jsonify({"mensaje": "Taller no encontrado"}), 404
+        if "fecha" in cambios or "hora" in cambios:
+            # Las inscripciones replican fecha/hora para servir consultas por estudiante
+            replica = {k: cambios[k] for k in ("fecha", "hora") if k in cambios}
+            col_inscripciones.update_many({"taller_id": _id}, {"$set": replica})
+        if doc and "categoria" in cambios and cambios["categoria"] != doc.get("categoria"):
+            actualizar_estadisticas({doc.get("categoria"): -1, cambios["categoria"]: 1})
+        invalidar_catalogo()
+        if doc and cambios.get("cupo", 0) > int(doc.get("cupo", 0)):
+            # Los cupos nuevos se asignan primero a la lista de espera
+            promover_lista_espera(_id)
         actualizado = col_talleres.find_one({"_id": _id})
+        publicar_evento(evento_taller("actualizado", actualizado))
+        adjuntar_inscripciones([actualizado])
         return jsonify(serializar_taller(actualizado)), 200
 
     @app.delete("/workshops/<id_taller>")
@@ -721,9 +1798,14 @@ def crear_app():
         _id = oid(id_taller)
         if not _id:
             return jsonify({"mensaje": "ID inválido"}), 400
-        res = col_talleres.delete_one({"_id": _id})
-        if res.deleted_count == 0:
+        eliminado = col_talleres.find_one_and_delete({"_id": _id}, projection={"categoria": 1})
+        if not eliminado:
             return jsonify({"mensaje": "Taller no encontrado"}), 404
+        res_insc = col_inscripciones.delete_many({"taller_id": _id})
+        col_lista_espera.delete_many({"taller_id": _id})
+        actualizar_estadisticas({eliminado.get("categoria"): -1}, talleres=-1, registros=-res_insc.deleted_count)
+        invalidar_catalogo()
+        publicar_evento({"tipo": "eliminado", "taller_id": id_taller})
         return jsonify({"mensaje": "Taller eliminado"}), 200
 
     @app.post("/workshops/<id_taller>/register")
@@ -734,31 +1816,54 @@ def crear_app():
         if not _id:
             return jsonify({"mensaje": "ID inválido"}), 400
 
-        doc = col_talleres.find_one({"_id": _id})
-        if not doc:
-            return jsonify({"mensaje": "Taller no encontrado"}), 404
-
-        cupo = int(doc.get("cupo", 0))
-        inscripciones = doc.get("inscripciones", [])
-        if cupo >= 0 and len(inscripciones) >= cupo:
-            return jsonify({"mensaje": "Cupo lleno"}), 409
-
         est_id = request.usuario["id"]
         email = request.usuario["email"]
         nombre = request.usuario["nombre"]
 
-        existe = col_talleres.find_one({"_id": _id, "inscripciones.estudiante_id": est_id})
-        if existe:
+        # Un reintento de quien ya está inscrito se resuelve con una lectura cubierta por el índice
+        # único (taller_id, estudiante_id), sin reservar y liberar un cupo del taller (dos escrituras,
+        # dos cambios de versión y un cupo que parece ocupado mientras tanto)
+        if col_inscripciones.find_one({"taller_id": _id, "estudiante_id": est_id}, {"_id": 1}):
             return jsonify({"mensaje": "Ya estás inscrito en este taller"}), 409
 
+        # Reserva atómica del cupo: un solo viaje a MongoDB y sin sobrecupo entre peticiones concurrentes
+        # Con estudiantes en lista de espera los cupos que se liberan son para ellos
+        actualizado = col_talleres.find_one_and_update(
+            {"_id": _id, "cupos_disponibles": {"$gt": 0}, "en_espera": {"$not": {"$gt": 0}}},
+            {"$inc": {"inscritos": 1, "cupos_disponibles": -1, "version": 1}, "$set": {"modificado_en": ahora_iso()}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if not actualizado:
+            # Solo en la ruta de rechazo se consulta el motivo
+            if not col_talleres.find_one({"_id": _id}, {"_id": 1}):
+                return jsonify({"mensaje": "Taller no encontrado"}), 404
+            if col_inscripciones.find_one({"taller_id": _id, "estudiante_id": est_id}, {"_id": 1}):
+                return jsonify({"mensaje": "Ya estás inscrito en este taller"}), 409
+            return jsonify({"mensaje": "Cupo lleno", "lista_espera": f"/workshops/{id_taller}/waitlist"}), 409
+
         inscripcion = {
+            "taller_id": _id,
             "estudiante_id": est_id,
             "nombre": nombre,
             "email": email,
             "registrado_en": ahora_iso(),
+            "fecha": actualizado.get("fecha"),
+            "hora": actualizado.get("hora"),
         }
-        col_talleres.update_one({"_id": _id}, {"$push": {"inscripciones": inscripcion}})
-        actualizado = col_talleres.find_one({"_id": _id})
+        try:
+            col_inscripciones.insert_one(inscripcion)
+        except errors.DuplicateKeyError:
+            # Carrera entre dos peticiones del mismo estudiante: el índice único detectó la
+            # inscripción de la otra y se libera el cupo reservado
+            col_talleres.update_one(
+                {"_id": _id},
+                {"$inc": {"inscritos": -1, "cupos_disponibles": 1, "version": 1}, "$set": {"modificado_en": ahora_iso()}},
+            )
+            return jsonify({"mensaje": "Ya estás inscrito en este taller"}), 409
+        actualizar_estadisticas(registros=1)
+        invalidar_catalogo()
+        publicar_evento(evento_taller("cupos", actualizado))
+        adjuntar_inscripciones([actualizado])
         return jsonify(serializar_taller(actualizado)), 201
 
     @app.delete("/workshops/<id_taller>/register")
@@ -769,33 +1874,271 @@ def crear_app():
         if not _id:
             return jsonify({"mensaje": "ID inválido"}), 400
         est_id = request.usuario["id"]
-        res = col_talleres.update_one(
-            {"_id": _id},
-            {"$pull": {"inscripciones": {"estudiante_id": est_id}}},
-        )
-        if res.matched_count == 0:
+        res = col_inscripciones.delete_one({"taller_id": _id, "estudiante_id": est_id})
+        if res.deleted_count:
+            actualizado = col_talleres.find_one_and_update(
+                {"_id": _id},
+                {"$inc": {"inscritos": -1, "cupos_disponibles": 1, "version": 1}, "$set": {"modificado_en": ahora_iso()}},
+                return_document=ReturnDocument.AFTER,
+            )
+            actualizar_estadisticas(registros=-1)
+            invalidar_catalogo()
+            if actualizado and actualizado.get("en_espera", 0) > 0 and promover_lista_espera(_id):
+                actualizado = col_talleres.find_one({"_id": _id})
+            if actualizado:
+                publicar_evento(evento_taller("cupos", actualizado))
+        else:
+            # El estudiante no estaba inscrito: se responde con el estado actual
+            actualizado = col_talleres.find_one({"_id": _id})
+        if not actualizado:
             return jsonify({"mensaje": "Taller no encontrado"}), 404
-        actualizado = col_talleres.find_one({"_id": _id})
+        adjuntar_inscripciones([actualizado])
         return jsonify(serializar_taller(actualizado)), 200
 
+    # ---------- Lista de espera ----------
+    @app.post("/workshops/<id_taller>/waitlist")
+    @limiter.limit("10 per minute")
+    @requiere_estudiante
+    def unirse_lista_espera(id_taller):
+        """
+        Agrega al estudiante al final de la lista de espera de un taller
+
+        Si al unirse hay cupos libres, la promoción es inmediata y responde 201
+        con el taller; si no, responde 202 con la posición en la cola.
+        """
+        _id = oid(id_taller)
+        if not _id:
+            return jsonify({"mensaje": "ID inválido"}), 400
+        est_id = request.usuario["id"]
+        if col_inscripciones.find_one({"taller_id": _id, "estudiante_id": est_id}, {"_id": 1}):
+            return jsonify({"mensaje": "Ya estás inscrito en este taller"}), 409
+
+        posicion, total = posicion_lista_espera(_id, est_id)
+        if posicion is None:
+            # El contador del taller asigna el orden FIFO de forma atómica
+            taller = col_talleres.find_one_and_update(
+                {"_id": _id},
+                {"$inc": {"espera_seq": 1, "en_espera": 1}},
+                projection={"espera_seq": 1},
+                return_document=ReturnDocument.AFTER,
+            )
+            if not taller:
+                return jsonify({"mensaje": "Taller no encontrado"}), 404
+            try:
+                col_lista_espera.insert_one({
+                    "taller_id": _id,
+                    "estudiante_id": est_id,
+                    "nombre": request.usuario["nombre"],
+                    "email": request.usuario["email"],
+                    "orden": taller["espera_seq"],
+                    "unido_en": ahora_iso(),
+                })
+            except errors.DuplicateKeyError:
+                # Otra petición del mismo estudiante llegó primero
+                col_talleres.update_one({"_id": _id}, {"$inc": {"en_espera": -1}})
+            except Exception:
+                # La entrada no se guardó: se devuelve el lugar contado (si el proceso muere
+                # aquí, la reconciliación periódica corrige el contador)
+                col_talleres.update_one({"_id": _id}, {"$inc": {"en_espera": -1}})
+                raise
+            if est_id in promover_lista_espera(_id):
+                actualizado = col_talleres.find_one({"_id": _id})
+                publicar_evento(evento_taller("cupos", actualizado))
+                adjuntar_inscripciones([actualizado])
+                return jsonify(serializar_taller(actualizado)), 201
+            posicion, total = posicion_lista_espera(_id, est_id)
+            if posicion is None and col_inscripciones.find_one({"taller_id": _id, "estudiante_id": est_id}, {"_id": 1}):
+                # Promovido por otra petición concurrente
+                return jsonify({"mensaje": "Ya estás inscrito en este taller"}), 409
+        return jsonify({"taller_id": id_taller, "posicion": posicion, "en_espera": total}), 202
+
+    @app.get("/workshops/<id_taller>/waitlist/me")
+    @limiter.limit("30 per minute")
+    @requiere_estudiante
+    def posicion_espera(id_taller):
+        """Posición del estudiante en la lista de espera (1 = siguiente en ser promovido)"""
+        _id = oid(id_taller)
+        if not _id:
+            return jsonify({"mensaje": "ID inválido"}), 400
+        est_id = request.usuario["id"]
+        posicion, total = posicion_lista_espera(_id, est_id)
+        if posicion is None:
+            if col_inscripciones.find_one({"taller_id": _id, "estudiante_id": est_id}, {"_id": 1}):
+                return jsonify({"taller_id": id_taller, "inscrito": True, "posicion": None, "en_espera": total}), 200
+            return jsonify({"mensaje": "No estás en la lista de espera de este taller"}), 404
+        return jsonify({"taller_id": id_taller, "inscrito": False, "posicion": posicion, "en_espera": total}), 200
+
+    @app.delete("/workshops/<id_taller>/waitlist")
+    @limiter.limit("10 per minute")
+    @requiere_estudiante
+    def salir_lista_espera(id_taller):
+        _id = oid(id_taller)
+        if not _id:
+            return jsonify({"mensaje": "ID inválido"}), 400
+        res = col_lista_espera.delete_one({"taller_id": _id, "estudiante_id": request.usuario["id"]})
+        if not res.deleted_count:
+            return jsonify({"mensaje": "No estás en la lista de espera de este taller"}), 404
+        col_talleres.update_one({"_id": _id}, {"$inc": {"en_espera": -1}})
+        return jsonify({"mensaje": "Saliste de la lista de espera"}), 200
+
     @app.get("/registrations/me")
     @requiere_estudiante
     def mis_inscripciones():
+        """
+        Talleres del estudiante autenticado, ordenados por fecha y hora
+
+        Se recorre el índice (estudiante_id, fecha, hora) de inscripciones, que
+        ya entrega el orden final, y cada taller incluye solo la inscripción del
+        propio estudiante, no las del resto de los inscritos.
+
+        Query Parameters:
+            upcoming (bool): Si es true, solo talleres desde hoy en adelante
+            stream (bool): Si es 1 (o Accept: application/x-ndjson) responde en NDJSON
+        """
         est_id = request.usuario["id"]
-        talleres = list(col_talleres.find({"inscripciones.estudiante_id": est_id}, sort=[("fecha", ASCENDING), ("hora", ASCENDING)]))
-        return jsonify([serializar_taller(t) for t in talleres]), 200
+        filtro = {"estudiante_id": est_id}
+        if (request.args.get("upcoming") or "").strip().lower() in ("1", "true", "si", "sí"):
+            filtro["fecha"] = {"$gte": datetime.utcnow().date().isoformat()}
+        cursor_db = col_inscripciones.find(
+            filtro,
+            {"taller_id": 1, "estudiante_id": 1, "nombre": 1, "email": 1, "registrado_en": 1},
+            sort=[("fecha", ASCENDING), ("hora", ASCENDING)],
+            max_time_ms=MAX_TIME_MS,
+        )
+
+        def adjuntar_talleres(inscripciones):
+            # Un solo $in por lote; se omiten inscripciones cuyo taller ya no existe
+            talleres = {
+                t["_id"]: t
+                for t in col_talleres.find(
+                    {"_id": {"$in": [ins["taller_id"] for ins in inscripciones]}},
+                    {"inscripciones": 0},
+                )
+            }
+            for ins in inscripciones:
+                ins["taller"] = talleres.get(ins["taller_id"])
+            inscripciones[:] = [ins for ins in inscripciones if ins["taller"]]
+            return inscripciones
+
+        def serializar_propia(ins):
+            taller = ins["taller"]
+            taller["inscripciones"] = [ins]
+            return serializar_taller(taller)
+
+        if quiere_ndjson():
+            return transmitir_ndjson(cursor_db, serializar_propia, adjuntar_talleres)
+        inscripciones = adjuntar_talleres(list(cursor_db))
+        return jsonify([serializar_propia(ins) for ins in inscripciones]), 200
 
     # ---------- Estudiantes (Admin) ----------
     @app.get("/students")
     @requiere_admin
     def listar_estudiantes():
+        """
+        Lista estudiantes (más recientes primero) con paginación por cursor
+
+        Query Parameters:
+            q (str): Búsqueda por prefijo en nombre o email, sin acentos
+            limit (int): Tamaño de página (máximo PAGINACION_MAX); sin limit ni cursor, todos
+            cursor (str): Token X-Next-Cursor de la página anterior
+            fields (str): Campos a incluir separados por coma
+            stream (bool): Si es 1 (o Accept: application/x-ndjson) exporta todo en NDJSON
+        """
         q = (request.args.get("q") or "").strip()
-        filtro = {}
-        if q:
-            regex = Regex(q, "i")
-            filtro["$or"] = [{"nombre": regex}, {"email": regex}]
-        estudiantes = list(col_estudiantes.find(filtro, sort=[("creado_en", DESCENDING)]))
-        return jsonify([serializar_estudiante(e) for e in estudiantes]), 200
+        try:
+            limit = int(request.args.get("limit") or 0)
+        except ValueError:
+            return jsonify({"mensaje": "limit debe ser un entero"}), 400
+        token_cursor = (request.args.get("cursor") or "").strip()
+        campos = parsear_campos(request.args.get("fields") or "", CAMPOS_ESTUDIANTE)
+        limite = limite_pagina(limit, token_cursor, app.config["PAGINACION_MAX"])
+
+        filtro = filtro_prefijos(q) if q else {}
+        claves = [("creado_en", DESCENDING), ("_id", DESCENDING)]
+        proyeccion = {c: 1 for c in (campos or CAMPOS_ESTUDIANTE)}
+        proyeccion["creado_en"] = 1
+
+        def formatear(doc):
+            e = serializar_estudiante(doc)
+            return {k: e[k] for k in ["_id", *campos]} if campos else e
+
+        if quiere_ndjson():
+            cursor_db = col_estudiantes.find(filtro, proyeccion, sort=claves)
+            if limit > 0:
+                cursor_db = cursor_db.limit(limit)
+            return transmitir_ndjson(cursor_db, formatear)
+
+        estudiantes, siguiente = paginar(col_estudiantes, filtro, claves, limite, token_cursor, proyeccion)
+        if estudiantes is None:
+            return jsonify({"mensaje": "Cursor inválido"}), 400
+        respuesta = jsonify([formatear(e) for e in estudiantes])
+        if siguiente:
+            respuesta.headers["X-Next-Cursor"] = siguiente
+        return respuesta, 200
+
+    @app.post("/students/bulk")
+    @requiere_admin
+    def importar_estudiantes():
+        """
+        Alta masiva de estudiantes (cohortes)
+
+        Body:
+            Arreglo JSON de objetos {nombre, email, contrasena}
+
+        Query Parameters:
+            batch (int): Tamaño de lote de insert_many (máximo BULK_BATCH_MAX)
+
+        Returns:
+            JSON con total de filas, insertados y lista de errores por fila
+            (incluye emails duplicados detectados por el índice único)
+        """
+        datos = request.get_json(silent=True)
+        if not isinstance(datos, list):
+            return jsonify({"mensaje": "Se esperaba un arreglo JSON"}), 400
+        try:
+            tam_lote = int(request.args.get("batch") or app.config["BULK_BATCH_SIZE"])
+        except ValueError:
+            return jsonify({"mensaje": "batch debe ser un entero"}), 400
+        tam_lote = max(1, min(tam_lote, app.config["BULK_BATCH_MAX"]))
+
+        errores = []
+        validos = []
+        for indice, fila in enumerate(datos):
+            valido, error = validar_estudiante(fila)
+            if error:
+                errores.append({"indice": indice, **error})
+            else:
+                validos.append((indice, valido))
+
+        # El hashing (CPU) se reparte entre procesos para no bloquear el worker
+        hashes = pool_hash.generar_muchos(
+            [contrasena for _, (_, _, contrasena) in validos],
+            app.config["PASSWORD_HASH_METODO_MASIVO"],
+        )
+
+        insertados = 0
+        for inicio in range(0, len(validos), tam_lote):
+            lote = []
+            for (indice, (nombre, email, _)), hash_ in zip(validos[inicio:inicio + tam_lote], hashes[inicio:inicio + tam_lote]):
+                doc = {"nombre": nombre, "email": email, "hash": hash_, "creado_en": ahora_iso()}
+                doc["terminos"] = terminos_estudiante(doc)
+                lote.append((indice, doc))
+            try:
+                res = col_estudiantes.insert_many([doc for _, doc in lote], ordered=False)
+                insertados += len(res.inserted_ids)
+            except errors.BulkWriteError as e:
+                insertados += e.details.get("nInserted", 0)
+                for w in e.details.get("writeErrors", []):
+                    if w.get("code") == 11000:
+                        mensaje = "El email ya está registrado"
+                    else:
+                        mensaje = w.get("errmsg", "Error de escritura")
+                    errores.append({"indice": lote[w["index"]][0], "email": lote[w["index"]][1]["email"], "mensaje": mensaje})
+
+        if insertados:
+            actualizar_estadisticas(estudiantes=insertados)
+        errores.sort(key=lambda e: e["indice"])
+        return jsonify({"total": len(datos), "insertados": insertados, "errores": errores}), 200
 
     @app.get("/students/<id_est>")
     @requiere_admin
@@ -829,7 +2172,11 @@ def crear_app():
             cambios["email"] = nuevo_email
         if not cambios:
             return jsonify({"mensaje": "Nada para actualizar"}), 400
+        actual = col_estudiantes.find_one({"_id": _id}, {"nombre": 1, "email": 1})
+        if actual:
+            cambios["terminos"] = terminos_estudiante({**actual, **cambios})
         col_estudiantes.update_one({"_id": _id}, {"$set": cambios})
+        cache_principales.invalidar_estudiante(str(_id))
         est = col_estudiantes.find_one({"_id": _id})
         return jsonify(serializar_estudiante(est)), 200
 
@@ -839,30 +2186,62 @@ def crear_app():
         _id = oid(id_est)
         if not _id:
             return jsonify({"mensaje": "ID inválido"}), 400
-        # Eliminar sus inscripciones de talleres
-        col_talleres.update_many({}, {"$pull": {"inscripciones": {"estudiante_id": str(_id)}}})
+        # Eliminar sus inscripciones y liberar los cupos de los talleres afectados
+        ids_talleres = [
+            ins["taller_id"]
+            for ins in col_inscripciones.find({"estudiante_id": str(_id)}, {"taller_id": 1})
+        ]
+        if ids_talleres:
+            res_insc = col_inscripciones.delete_many({"estudiante_id": str(_id), "taller_id": {"$in": ids_talleres}})
+            actualizar_estadisticas(registros=-res_insc.deleted_count)
+            col_talleres.update_many(
+                {"_id": {"$in": ids_talleres}},
+                {"$inc": {"inscritos": -1, "cupos_disponibles": 1, "version": 1}, "$set": {"modificado_en": ahora_iso()}},
+            )
+            invalidar_catalogo()
+        # Sale también de las listas de espera en las que estuviera
+        ids_espera = [e["taller_id"] for e in col_lista_espera.find({"estudiante_id": str(_id)}, {"taller_id": 1})]
+        if ids_espera:
+            col_lista_espera.delete_many({"estudiante_id": str(_id)})
+            col_talleres.update_many({"_id": {"$in": ids_espera}}, {"$inc": {"en_espera": -1}})
+        # Los cupos liberados pasan a las listas de espera
+        for id_taller in ids_talleres:
+            promover_lista_espera(id_taller)
+        if ids_talleres:
+            proyeccion_evento = {"cupo": 1, "inscritos": 1, "cupos_disponibles": 1, "en_espera": 1, "version": 1}
+            for taller in col_talleres.find({"_id": {"$in": ids_talleres}}, proyeccion_evento):
+                publicar_evento(evento_taller("cupos", taller))
         res = col_estudiantes.delete_one({"_id": _id})
+        cache_principales.invalidar_estudiante(str(_id))
         if res.deleted_count == 0:
             return jsonify({"mensaje": "Estudiante no encontrado"}), 404
+        actualizar_estadisticas(estudiantes=-1)
         return jsonify({"mensaje": "Estudiante eliminado"}), 200
 
     # ---------- Utilidades públicas ----------
     @app.get("/stats")
     @limiter.limit("20 per minute")
     def stats():
-        total_talleres = col_talleres.count_documents({})
-        total_estudiantes = col_estudiantes.count_documents({})
-        total_registros = col_talleres.aggregate([{"$project": {"n": {"$size": {"$ifNull": ["$inscripciones", []]}}}}, {"$group": {"_id": None, "suma": {"$sum": "$n"}}}])
-        registros = 0
-        for x in total_registros:
-            registros = x.get("suma", 0)
-        return jsonify({"talleres": total_talleres, "estudiantes": total_estudiantes, "registros": registros}), 200
+        # Lectura O(1) de los contadores materializados; se reconstruyen si nunca se reconciliaron
+        # (un `$inc` anterior a la preparación de la base deja un documento parcial)
+        doc = col_estadisticas_lectura.find_one({"_id": "global"}, max_time_ms=MAX_TIME_MS)
+        if not doc or "reconciliado_en" not in doc:
+            doc = reconciliar_estadisticas(db)
+        return jsonify({
+            "talleres": max(int(doc.get("talleres", 0)), 0),
+            "estudiantes": max(int(doc.get("estudiantes", 0)), 0),
+            "registros": max(int(doc.get("registros", 0)), 0),
+        }), 200
 
     @app.get("/categories")
     @limiter.limit("30 per minute")
     def categories():
-        cats = col_talleres.distinct("categoria")
-        return jsonify(sorted([c for c in cats if c])), 200
+        if not estadisticas_reconciliadas(db, col_estadisticas_lectura):
+            reconciliar_estadisticas(db)
+            cats = [c["_id"] for c in col_categorias.find({"n": {"$gt": 0}}, sort=[("_id", ASCENDING)])]
+        else:
+            cats = [c["_id"] for c in col_categorias_lectura.find({"n": {"$gt": 0}}, sort=[("_id", ASCENDING)], max_time_ms=MAX_TIME_MS)]
+        return jsonify([c for c in cats if c]), 200
 
     @app.get("/openapi.json")
     def openapi():
@@ -873,33 +2252,81 @@ def crear_app():
                 "/workshops": {"get": {}, "post": {}},
                 "/workshops/{id}": {"get": {}, "put": {}, "delete": {}},
                 "/workshops/{id}/register": {"post": {}, "delete": {}},
+                "/workshops/{id}/waitlist": {"post": {}, "delete": {}},
+                "/workshops/{id}/waitlist/me": {"get": {}},
+                "/workshops/{id}/events": {"get": {}},
+                "/workshops/events": {"get": {}},
                 "/auth/login": {"post": {}},
                 "/auth/estudiantes/registro": {"post": {}},
                 "/auth/estudiantes/login": {"post": {}},
                 "/auth/estudiantes/me": {"get": {}},
+                "/auth/refresh": {"post": {}},
+                "/auth/logout": {"post": {}},
+                "/auth/revoke": {"post": {}},
                 "/registrations/me": {"get": {}},
                 "/students": {"get": {}},
                 "/students/{id}": {"get": {}, "put": {}, "delete": {}},
                 "/stats": {"get": {}},
                 "/categories": {"get": {}},
                 "/health": {"get": {}},
+                "/ready": {"get": {}},
+                "/metrics": {"get": {}},
             },
         }
         return jsonify(base), 200
 
+    @app.get("/ready")
+    @limiter.exempt
+    def ready():
+        """
+        Readiness: 200 cuando el worker puede atender tráfico, 503 mientras se calienta
+
+        Una preparación fallida u omitida no bloquea: la API funciona sin los
+        índices, solo más lenta, y el detalle queda en la respuesta. Un worker
+        que delegó la preparación espera a que la base tenga el esquema vigente.
+        """
+        listo = estado_inicio["mongo"] and estado_inicio["preparacion"] not in ("pendiente", "en_curso", "esperando")
+        cuerpo = {
+            "listo": listo,
+            "mongo": estado_inicio["mongo"],
+            "redis": redis_client is not None,
+            "preparacion": estado_inicio["preparacion"],
+            "arranque_ms": estado_inicio["arranque_ms"],
+        }
+        if estado_inicio["error"]:
+            cuerpo["error"] = estado_inicio["error"]
+        return jsonify(cuerpo), 200 if listo else 503
+
+    @app.get("/metrics")
+    @limiter.exempt
+    def metrics():
+        token_metricas = app.config["METRICAS_TOKEN"]
+        if token_metricas and not hmac.compare_digest(extraer_token_auth() or "", token_metricas):
+            return jsonify({"mensaje": "Token de métricas inválido"}), 401
+        return app.response_class(metricas.exportar(), status=200, mimetype="text/plain; version=0.0.4")
+
     # Salud
     @app.get("/health")
     @limiter.limit("60 per minute")
     def health():
         return jsonify({"ok": True, "timestamp": ahora_iso()}), 200
 
+    # Compresión negociada de respuestas (solo codificaciones con paquete instalado)
+    CODIFICACIONES = codificaciones_disponibles(app.config["COMPRESION_CODIFICACIONES"])
+
+    # Medición de latencia (se registra primero para cubrir también las respuestas cortadas por otros hooks)
+    @app.before_request
+    def iniciar_medicion():
+        request.inicio = time.perf_counter()
+
     # Middleware de seguridad
     @app.before_request
     def security_headers():
         """Añade headers de seguridad a todas las respuestas"""
         # Validar Content-Type para requests POST/PUT
         if request.method in ['POST', 'PUT', 'PATCH']:
-            if not request.is_json and request.content_length and request.content_length > 0:
+            es_ndjson = request.mimetype == "application/x-ndjson"
+            if not request.is_json and not es_ndjson and request.content_length and request.content_length > 0:
                 return jsonify({"mensaje": "Content-Type debe ser application/json"}), 400
 
     @app.after_request
@@ -909,6 +2336,20 @@ def crear_app():
         response.headers['X-Frame-Options'] = 'DENY'
         response.headers['X-XSS-Protection'] = '1; mode=block'
         response.headers['Referrer-Policy'] = 'strict-origin-when-cross-origin'
+        if request.method not in ("GET", "HEAD", "OPTIONS") and "id_taller" in (request.view_args or {}):
+            # El worker que escribió un taller lo desaloja al instante; el resto espera al vigilante
+            _id = oid(request.view_args["id_taller"])
+            if _id:
+                cache_taller.desalojar(_id)
+        comprimir_respuesta(response, request.accept_encodings, CODIFICACIONES, app.config["COMPRESION_MINIMO"])
+        inicio = getattr(request, "inicio", None)
+        if inicio is not None:
+            ruta = request.url_rule.rule if request.url_rule else "sin_ruta"
+            metricas.observar(
+                "http_peticion_duracion_segundos",
+                (ruta, request.method, str(response.status_code)),
+                time.perf_counter() - inicio,
+            )
         return response
 
     # Errores
@@ -932,13 +2373,43 @@ def crear_app():
     def _400(_):
         return jsonify({"mensaje": "Petición malformada"}), 400
 
+    @app.errorhandler(PoolSaturado)
+    def _hash_saturado(_):
+        respuesta = jsonify({"mensaje": "Servicio ocupado, intenta nuevamente en unos segundos"})
+        respuesta.headers["Retry-After"] = str(app.config["HASH_REINTENTAR_SEGUNDOS"])
+        return respuesta, 503
+
+    @app.errorhandler(errors.ExecutionTimeout)
+    def _timeout_mongo(_):
+        return jsonify({"mensaje": "La consulta excedió el tiempo máximo, intenta nuevamente"}), 503
+
     @app.errorhandler(500)
     def _500(_):
         return jsonify({"mensaje": "Error interno del servidor"}), 500
 
+    # Componentes en memoria del proceso que también usan las rutas nativas de asgi.py
+    app.extensions["skillsforge"] = {
+        "cache_talleres": cache_talleres,
+        "cache_taller": cache_taller,
+        "bus_eventos": bus_eventos,
+        "revocacion": revocacion,
+        "espacio_redis": espacio_redis,
+        "limiter": limiter,
+    }
+
+    threading.Thread(target=preparar_en_segundo_plano, name="preparar-base", daemon=True).start()
+
+    # Presupuesto de arranque: el worker debe quedar listo para recibir tráfico en milisegundos
+    estado_inicio["arranque_ms"] = round((time.perf_counter() - inicio_arranque) * 1000, 1)
+    if estado_inicio["arranque_ms"] > app.config["INICIO_PRESUPUESTO_MS"]:
+        print(f"⚠️  El arranque tomó {estado_inicio['arranque_ms']} ms (presupuesto: {app.config['INICIO_PRESUPUESTO_MS']} ms)")
+
     return app
 
-app = crear_app()
+# Los procesos del pool de hashing (forkserver/spawn) vuelven a importar el script principal
+# como `__mp_main__`: con `python app.py` no deben crear otra instancia de la aplicación
+if __name__ != "__mp_main__":
+    app = crear_app()
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5001)
@@ -0,0 +1,630 @@
+"""
+SkillsForge - Punto de Entrada ASGI
+===================================
+
+Modo de servicio asíncrono alternativo a gunicorn + Flask síncrono:
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 2
+
+Todas las rutas de `crear_app` siguen disponibles a través de un puente
+WSGI -> ASGI que las ejecuta en un pool de hilos (ASGI_HILOS). Las lecturas
+públicas más frecuentes se atienden de forma nativa sobre el event loop con
+Motor (MongoDB no bloqueante) y redis.asyncio, de modo que un proceso puede
+mantener miles de peticiones en vuelo sin ocupar un hilo por cada una.
+
+Rutas nativas: GET /health, GET /stats, GET /categories, GET /workshops
+(listado paginado en JSON, con la misma cache compartida en Redis y el mismo
+ETag que Flask), GET /workshops/<id>, POST /workshops/<id>/register y los
+streams SSE GET /workshops/events y GET /workshops/<id>/events (con Redis),
+que así no ocupan un hilo por cliente conectado. Lo que una ruta nativa no
+resuelve (NDJSON, errores de autenticación, cuerpos no JSON) pasa a Flask.
+La app síncrona (`app:app`) sigue siendo el modo por defecto.
+"""
+
+import asyncio
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import parse_qsl
+
+from asgiref.wsgi import WsgiToAsgi
+from bson import ObjectId
+import jwt
+from limits import parse as parsear_limite
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, ReadPreference, ReturnDocument, errors
+import redis.asyncio as redis_async
+from werkzeug.http import http_date, parse_accept_header
+
+from app import (
+    app as app_wsgi, serializar_taller, consulta_talleres, formatear_taller, filtro_pagina, cortar_pagina,
+    desplazamiento_relevancia, cortar_pagina_relevancia, validadores_taller, PUNTAJE_TEXTO, ORDEN_RELEVANCIA,
+)
+from config import Config
+from eventos import CANAL_EVENTOS, DESCONECTAR, evento_taller, formatear_sse
+from serializacion import COMPRESORES, codificaciones_disponibles, dumps_bytes, negociar_codificacion
+
+HEADERS_SEGURIDAD = [
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"x-xss-protection", b"1; mode=block"),
+    (b"referrer-policy", b"strict-origin-when-cross-origin"),
+]
+
+class LimitadorAsync:
+    """
+    Límites de Flask-Limiter para las rutas nativas
+
+    Usa el almacenamiento del limitador de Flask (AlmacenDosNiveles, ver
+    limites.py) con sus mismas claves, `LIMITER/<clave>/<endpoint>/<cantidad>/...`:
+    una ruta consume el mismo cupo la atienda Flask o el servidor ASGI. Los
+    golpes se registran en memoria; la confirmación en Redis que se hace cerca
+    del límite corre fuera del event loop.
+    """
+
+    def __init__(self, limiter):
+        self.almacen = limiter.storage
+        self._limites = {}
+
+    async def permitir(self, endpoint, clave, limite):
+        item = self._limites.get(limite)
+        if item is None:
+            item = self._limites[limite] = parsear_limite(limite)
+        llave = item.key_for(clave, endpoint)
+        conteo, inmediata = self.almacen.registrar(llave, item.get_expiry())
+        if inmediata:
+            conteo = await asyncio.get_running_loop().run_in_executor(None, self.almacen.confirmar, llave)
+        return conteo <= item.amount
+
+
+class BusEventosAsync:
+    """
+    Reparto de eventos del canal Redis a los streams SSE nativos
+
+    Igual que el bus síncrono: una suscripción por proceso y una cola acotada
+    por cliente; los clientes lentos se desconectan.
+    """
+
+    def __init__(self, redis_client, tam_cola=100, espacio=""):
+        self.redis = redis_client
+        self.tam_cola = tam_cola
+        self.canal = espacio + CANAL_EVENTOS
+        self._suscriptores = set()
+        self._tarea = None
+
+    def suscribir(self):
+        cola = asyncio.Queue(maxsize=self.tam_cola)
+        self._suscriptores.add(cola)
+        if self._tarea is None:
+            self._tarea = asyncio.get_running_loop().create_task(self._escuchar())
+        return cola
+
+    def desuscribir(self, cola):
+        self._suscriptores.discard(cola)
+
+    def _repartir(self, evento):
+        for cola in list(self._suscriptores):
+            try:
+                cola.put_nowait(evento)
+            except asyncio.QueueFull:
+                self.desuscribir(cola)
+                cola.get_nowait()
+                cola.put_nowait(DESCONECTAR)
+
+    async def _escuchar(self):
+        espera = 1
+        while True:
+            try:
+                pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(self.canal)
+                espera = 1
+                async for mensaje in pubsub.listen():
+                    if mensaje.get("type") == "message":
+                        self._repartir(json.loads(mensaje["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️  Suscripción a eventos interrumpida, reintentando: {e}")
+                await asyncio.sleep(espera)
+                espera = min(espera * 2, 30)
+
+    def detener(self):
+        if self._tarea is not None:
+            self._tarea.cancel()
+
+
+class AppASGI:
+    """Aplicación ASGI que combina rutas nativas asíncronas con el puente a Flask"""
+
+    def __init__(self, flask_app, config=Config):
+        self.config = config
+        self.puente = WsgiToAsgi(flask_app)
+        # Caches en memoria, bus de eventos y filtro de revocación del proceso (compartidos con Flask)
+        self.componentes = flask_app.extensions["skillsforge"]
+        self.mongo = None
+        self.db = None
+        self.db_primario = None
+        self.redis = None
+        self.limitador = LimitadorAsync(self.componentes["limiter"])
+        self.bus = None
+        self.max_time_ms = config.MONGO_MAX_TIME_MS or None
+        self.codificaciones = codificaciones_disponibles(config.COMPRESION_CODIFICACIONES)
+        self.patron_eventos = re.compile(r"^/workshops/(?:([0-9a-fA-F]{24})/)?events$")
+        # El nombre de cada handler es el endpoint de la ruta Flask equivalente (clave del límite)
+        self.rutas = [
+            ("GET", re.compile(r"^/health$"), self.health, "60 per minute"),
+            ("GET", re.compile(r"^/stats$"), self.stats, "20 per minute"),
+            ("GET", re.compile(r"^/categories$"), self.categories, "30 per minute"),
+            ("GET", re.compile(r"^/workshops$"), self.listar_talleres, "60 per minute"),
+            ("GET", re.compile(r"^/workshops/([0-9a-fA-F]{24})$"), self.obtener_taller, "30 per minute"),
+            ("POST", re.compile(r"^/workshops/([0-9a-fA-F]{24})/register$"), self.registrar_estudiante, "10 per minute"),
+        ]
+
+    async def iniciar(self):
+        """Crea los clientes no bloqueantes y el pool de hilos del puente WSGI"""
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=self.config.ASGI_HILOS, thread_name_prefix="wsgi")
+        )
+        opciones = {
+            "serverSelectionTimeoutMS": self.config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            "maxPoolSize": self.config.MONGO_MAX_POOL_SIZE,
+            "minPoolSize": self.config.MONGO_MIN_POOL_SIZE,
+            "maxIdleTimeMS": self.config.MONGO_MAX_IDLE_TIME_MS,
+            # Las rutas nativas son lecturas de catálogo: usan la preferencia de lectura del catálogo
+            "readPreference": self.config.MONGO_LECTURA_CATALOGO,
+        }
+        if self.config.MONGO_COMPRESSORS:
+            opciones["compressors"] = self.config.MONGO_COMPRESSORS
+        self.mongo = AsyncIOMotorClient(self.config.MONGO_URI, **opciones)
+        self.db = self.mongo[self.config.MONGO_DB_NAME]
+        # Lo que se cachea y lo que se escribe va al primario (igual que en Flask)
+        self.db_primario = self.mongo.get_database(self.config.MONGO_DB_NAME, read_preference=ReadPreference.PRIMARY)
+        try:
+            self.redis = redis_async.from_url(self.config.REDIS_URL)
+            await self.redis.ping()
+        except Exception as e:
+            print(f"⚠️  Redis asíncrono no disponible, sin cache compartida ni eventos nativos: {e}")
+            self.redis = None
+        if self.redis is not None:
+            self.bus = BusEventosAsync(self.redis, self.config.SSE_COLA_MAX, self.componentes["espacio_redis"])
+
+    async def detener(self):
+        if self.bus is not None:
+            self.bus.detener()
+        if self.redis is not None:
+            await self.redis.close()
+        if self.mongo is not None:
+            self.mongo.close()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        if scope["type"] == "http" and self.db is not None and not _es_condicional(scope):
+            coincidencia = self.patron_eventos.match(scope["path"])
+            if coincidencia and scope["method"] == "GET" and self.bus is not None:
+                return await self._eventos(scope, receive, send, coincidencia.group(1))
+            for metodo, patron, handler, limite in self.rutas:
+                coincidencia = patron.match(scope["path"]) if scope["method"] == metodo else None
+                if coincidencia:
+                    return await self._atender(scope, receive, send, handler, limite, coincidencia.groups())
+        # Cualquier otra ruta (y métodos de escritura) pasa por la app Flask
+        await self.puente(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            mensaje = await receive()
+            if mensaje["type"] == "lifespan.startup":
+                await self.iniciar()
+                await send({"type": "lifespan.startup.complete"})
+            elif mensaje["type"] == "lifespan.shutdown":
+                await self.detener()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def _payload_jwt(self, scope):
+        """Payload del token Bearer válido de la petición o None (se decodifica una vez por petición)"""
+        if "jwt_payload" not in scope:
+            payload = None
+            token = _header(scope, b"authorization")
+            if token.startswith("Bearer ") and token[7:].strip():
+                try:
+                    payload = jwt.decode(token[7:].strip(), self.config.JWT_SECRET, algorithms=["HS256"])
+                except jwt.InvalidTokenError:
+                    payload = None
+            scope["jwt_payload"] = payload
+        return scope["jwt_payload"]
+
+    def _clave_limite(self, scope):
+        """Misma clave que Flask: el principal del JWT (rol y sub) o, si no hay token válido, la IP"""
+        payload = self._payload_jwt(scope)
+        if payload and payload.get("sub"):
+            return f"{payload.get('rol')}:{payload['sub']}"
+        return (scope.get("client") or ("desconocido", 0))[0]
+
+    async def _atender(self, scope, receive, send, handler, limite, args):
+        if not await self.limitador.permitir(handler.__name__, self._clave_limite(scope), limite):
+            return await self._responder(scope, send, 429, {
+                "mensaje": "Demasiadas peticiones",
+                "descripcion": "Has excedido el límite de peticiones permitidas",
+                "reintentar_en": limite,
+            })
+        try:
+            estado, cuerpo, *extra = await handler(scope, *args)
+        except Exception:
+            estado, cuerpo, extra = 500, {"mensaje": "Error interno del servidor"}, []
+        if estado is None:
+            # El handler nativo no puede resolverla: se delega a Flask (el cuerpo aún no se leyó)
+            return await self.puente(scope, receive, send)
+        await self._responder(scope, send, estado, cuerpo, *extra)
+
+    async def _responder(self, scope, send, estado, cuerpo, headers_extra=()):
+        """Responde JSON (`cuerpo` ya serializado si es bytes) con la misma compresión que Flask"""
+        datos = cuerpo if isinstance(cuerpo, bytes) else dumps_bytes(cuerpo)
+        headers = [*HEADERS_SEGURIDAD, *self._headers_cors(scope)]
+        if self.codificaciones:
+            headers.append((b"vary", b"Accept-Encoding"))
+            codificacion = None
+            if len(datos) >= self.config.COMPRESION_MINIMO and 200 <= estado < 300:
+                aceptadas = parse_accept_header(_header(scope, b"accept-encoding"))
+                codificacion = negociar_codificacion(aceptadas, self.codificaciones)
+            comprimido = COMPRESORES[codificacion](datos) if codificacion else None
+            if comprimido is not None and len(comprimido) < len(datos):
+                datos = comprimido
+                headers.append((b"content-encoding", codificacion.encode()))
+                # El ETag fuerte de una representación comprimida lleva el sufijo de su codificación
+                headers_extra = [
+                    (n, v[:-1] + b"+" + codificacion.encode() + b'"' if n == b"etag" and v.startswith(b'"') else v)
+                    for n, v in headers_extra
+                ]
+        headers += [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(datos)).encode()),
+            *headers_extra,
+        ]
+        await send({"type": "http.response.start", "status": estado, "headers": headers})
+        await send({"type": "http.response.body", "body": datos})
+
+    async def _eventos(self, scope, receive, send, id_taller):
+        """Stream SSE nativo: mismo formato que la ruta Flask, sin ocupar un hilo por cliente"""
+        endpoint = "suscribir_taller" if id_taller else "suscribir_catalogo"
+        if not await self.limitador.permitir(endpoint, self._clave_limite(scope), "20 per minute"):
+            return await self._responder(scope, send, 429, {
+                "mensaje": "Demasiadas peticiones",
+                "descripcion": "Has excedido el límite de peticiones permitidas",
+                "reintentar_en": "20 per minute",
+            })
+        inicial = None
+        if id_taller:
+            doc = await self.db["talleres"].find_one(
+                {"_id": ObjectId(id_taller)},
+                {"cupo": 1, "inscritos": 1, "cupos_disponibles": 1, "en_espera": 1, "version": 1},
+                max_time_ms=self.max_time_ms,
+            )
+            if not doc:
+                return await self._responder(scope, send, 404, {"mensaje": "Taller no encontrado"})
+            inicial = evento_taller("estado", doc)
+
+        cola = self.bus.suscribir()
+        desconexion = asyncio.ensure_future(_esperar_desconexion(receive))
+        try:
+            await send({"type": "http.response.start", "status": 200, "headers": [
+                (b"content-type", b"text/event-stream"),
+                (b"cache-control", b"no-cache"),
+                (b"x-accel-buffering", b"no"),
+                *HEADERS_SEGURIDAD,
+                *self._headers_cors(scope),
+            ]})
+            await send({"type": "http.response.body", "body": b"retry: 3000\n\n", "more_body": True})
+            if inicial:
+                await send({"type": "http.response.body", "body": formatear_sse(inicial), "more_body": True})
+            while not desconexion.done():
+                obtener = asyncio.ensure_future(cola.get())
+                listos, _ = await asyncio.wait(
+                    {obtener, desconexion}, timeout=self.config.SSE_LATIDO_SEGUNDOS, return_when=asyncio.FIRST_COMPLETED,
+                )
+                if obtener not in listos:
+                    obtener.cancel()
+                    if not desconexion.done():
+                        await send({"type": "http.response.body", "body": b": ping\n\n", "more_body": True})
+                    continue
+                evento = obtener.result()
+                if evento is DESCONECTAR:
+                    break
+                if id_taller is None or evento.get("taller_id") == id_taller:
+                    await send({"type": "http.response.body", "body": formatear_sse(evento), "more_body": True})
+            if not desconexion.done():
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            self.bus.desuscribir(cola)
+            desconexion.cancel()
+
+    def _headers_cors(self, scope):
+        """Replica la política de Flask-CORS para las rutas nativas"""
+        origen = dict(scope.get("headers") or []).get(b"origin")
+        if not origen:
+            return []
+        permitidos = self.config.CORS_ORIGINS
+        expuestos = (b"access-control-expose-headers", b"X-Next-Cursor, ETag")
+        if permitidos == "*":
+            return [(b"access-control-allow-origin", b"*"), expuestos]
+        if origen.decode() in [o.strip() for o in permitidos.split(",")]:
+            return [(b"access-control-allow-origin", origen), (b"vary", b"Origin"), expuestos]
+        return []
+
+    # Rutas nativas
+
+    async def health(self, scope):
+        return 200, {"ok": True, "timestamp": datetime.utcnow().isoformat()}
+
+    async def stats(self, scope):
+        doc = await self.db["estadisticas"].find_one({"_id": "global"}, max_time_ms=self.max_time_ms)
+        if not doc or "reconciliado_en" not in doc:
+            # Contadores sin reconciliar: Flask los reconstruye
+            return None, None
+        return 200, {
+            "talleres": max(int(doc.get("talleres", 0)), 0),
+            "estudiantes": max(int(doc.get("estudiantes", 0)), 0),
+            "registros": max(int(doc.get("registros", 0)), 0),
+        }
+
+    async def categories(self, scope):
+        marca = await self.db["estadisticas"].find_one(
+            {"_id": "global", "reconciliado_en": {"$exists": True}}, {"_id": 1}, max_time_ms=self.max_time_ms,
+        )
+        if not marca:
+            return None, None
+        cursor = self.db["categorias"].find({"n": {"$gt": 0}}, sort=[("_id", ASCENDING)], max_time_ms=self.max_time_ms)
+        cats = [c["_id"] async for c in cursor]
+        if not cats:
+            return None, None
+        return 200, [c for c in cats if c]
+
+    async def obtener_taller(self, scope, id_taller):
+        """
+        Detalle de un taller con la misma cache por documento que la ruta Flask
+
+        Sirve y llena `cache_taller` (cuerpo, ETag y Last-Modified idénticos);
+        las revalidaciones condicionales (304) las resuelve Flask.
+        """
+        _id = ObjectId(id_taller)
+        cache_taller = self.componentes["cache_taller"]
+        cacheado = cache_taller.obtener(_id)
+        if cacheado is None:
+            # Lo que se cachea se lee del primario, igual que en Flask; la marca se toma antes de leer
+            marca = cache_taller.marca()
+            doc = await self.db_primario["talleres"].find_one({"_id": _id}, max_time_ms=self.max_time_ms)
+            if not doc:
+                return 404, {"mensaje": "Taller no encontrado"}
+            await self._adjuntar_inscripciones([doc])
+            etag, modificado = validadores_taller(doc)
+            cuerpo = dumps_bytes(serializar_taller(doc)) + b"\n"
+            cache_taller.guardar(_id, doc.get("version"), (cuerpo, etag, modificado), marca)
+        else:
+            _, (cuerpo, etag, modificado) = cacheado
+        headers = [(b"etag", f'"{etag}"'.encode()), (b"cache-control", b"no-cache")]
+        if modificado:
+            headers.append((b"last-modified", http_date(modificado).encode()))
+        return 200, cuerpo, headers
+
+    async def _adjuntar_inscripciones(self, docs):
+        """Completa `inscripciones` de los talleres con una sola consulta al primario"""
+        por_taller = {d["_id"]: [] for d in docs}
+        if not por_taller:
+            return docs
+        cursor = self.db_primario["inscripciones"].find(
+            {"taller_id": {"$in": list(por_taller)}}, sort=[("registrado_en", ASCENDING)], max_time_ms=self.max_time_ms,
+        )
+        async for ins in cursor:
+            por_taller[ins["taller_id"]].append(ins)
+        for d in docs:
+            d["inscripciones"] = por_taller[d["_id"]]
+        return docs
+
+    async def listar_talleres(self, scope):
+        """
+        Listado paginado en JSON: mismos parámetros, cuerpo, cursor y ETag que la ruta Flask
+
+        Comparte con Flask la cache de respuestas en Redis (misma clave y generación).
+        NDJSON y los parámetros inválidos se delegan a Flask.
+        """
+        args = {}
+        for clave, valor in parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True):
+            args.setdefault(clave, valor)
+        if (args.get("stream") or "").strip().lower() in ("1", "true") or "application/x-ndjson" in _header(scope, b"accept"):
+            return None, None
+        try:
+            consulta = consulta_talleres(args, self.config.PAGINACION_MAX)
+        except ValueError:
+            return None, None
+        clave_cache = consulta["clave_cache"]
+
+        # La versión se lee antes que los datos (ver la ruta Flask)
+        marca = await self.db["estadisticas"].find_one(
+            {"_id": "global"}, {"version_catalogo": 1, "catalogo_modificado_en": 1}, max_time_ms=self.max_time_ms,
+        ) or {}
+        headers = [
+            (b"etag", f'"c{marca.get("version_catalogo", 0)}-{clave_cache[:16]}"'.encode()),
+            (b"cache-control", b"no-cache"),
+        ]
+        try:
+            modificado = datetime.fromisoformat(marca.get("catalogo_modificado_en") or "").replace(tzinfo=timezone.utc)
+            headers.append((b"last-modified", http_date(modificado).encode()))
+        except ValueError:
+            pass
+
+        cache = self.componentes["cache_talleres"]
+        generacion = cacheado = None
+        if self.redis is not None:
+            try:
+                generacion = int(await self.redis.get(cache.clave_generacion) or 0)
+                cacheado = await self.redis.get(cache.clave_en(clave_cache, generacion))
+            except Exception:
+                generacion = None
+        if cacheado is not None:
+            # Formato en cache: "<siguiente_cursor>\n<cuerpo JSON>"
+            siguiente, cuerpo = cacheado.split(b"\n", 1)
+            if siguiente:
+                headers.append((b"x-next-cursor", siguiente))
+            return 200, cuerpo, headers
+
+        # Se lee del primario: la respuesta queda en la cache compartida
+        talleres = self.db_primario["talleres"]
+        filtro, proyeccion, limite = consulta["filtro"], consulta["proyeccion"], consulta["limite"]
+        if consulta["relevancia"]:
+            desplazamiento = desplazamiento_relevancia(consulta["token_cursor"])
+            if desplazamiento is None:
+                return 400, {"mensaje": "Cursor inválido"}
+            docs = await talleres.find(
+                filtro, {**(proyeccion or {}), **PUNTAJE_TEXTO}, sort=ORDEN_RELEVANCIA,
+                skip=desplazamiento, limit=limite + 1 if limite else 0, max_time_ms=self.max_time_ms,
+            ).to_list(None)
+            docs, siguiente = cortar_pagina_relevancia(docs, limite, desplazamiento)
+        else:
+            claves = consulta["claves"]
+            filtro = filtro_pagina(filtro, claves, consulta["token_cursor"])
+            if filtro is None:
+                return 400, {"mensaje": "Cursor inválido"}
+            docs = await talleres.find(
+                filtro, proyeccion, sort=claves, limit=limite + 1 if limite else 0, max_time_ms=self.max_time_ms,
+            ).to_list(None)
+            docs, siguiente = cortar_pagina(docs, limite, claves)
+        if consulta["incluir_inscripciones"]:
+            await self._adjuntar_inscripciones(docs)
+        cuerpo = dumps_bytes([formatear_taller(d, consulta["campos"]) for d in docs])
+        if generacion is not None:
+            try:
+                await self.redis.set(
+                    cache.clave_en(clave_cache, generacion), (siguiente or "").encode() + b"\n" + cuerpo, ex=cache.ttl,
+                )
+            except Exception:
+                pass
+        if siguiente:
+            headers.append((b"x-next-cursor", siguiente.encode()))
+        return 200, cuerpo, headers
+
+    async def _principal_estudiante(self, scope):
+        """
+        Estudiante autenticado de la petición, o None si Flask debe resolverla
+
+        Solo el caso exitoso se atiende aquí: sin token, con un token inválido,
+        expirado o de otro rol, o si el filtro de revocación no lo descarta, la
+        petición pasa a Flask, que responde el error exacto (o hace la consulta exacta).
+        """
+        payload = self._payload_jwt(scope)
+        if not payload or payload.get("rol") != "estudiante" or not payload.get("sub"):
+            return None
+        if self.componentes["revocacion"].quizas_revocado(payload.get("jti")):
+            return None
+        try:
+            _id = ObjectId(payload["sub"])
+        except Exception:
+            return None
+        est = await self.db_primario["estudiantes"].find_one({"_id": _id}, {"email": 1, "nombre": 1})
+        if not est:
+            return None
+        return {"id": str(est["_id"]), "email": est["email"], "nombre": est.get("nombre", "")}
+
+    async def registrar_estudiante(self, scope, id_taller):
+        """Inscripción: misma reserva atómica del cupo y mismos efectos que la ruta Flask"""
+        tipo = _header(scope, b"content-type")
+        if int(_header(scope, b"content-length") or 0) > 0 and not tipo.startswith("application/json"):
+            return None, None
+        usuario = await self._principal_estudiante(scope)
+        if usuario is None:
+            return None, None
+
+        _id = ObjectId(id_taller)
+        col_talleres = self.db_primario["talleres"]
+        col_inscripciones = self.db_primario["inscripciones"]
+        # Quien ya está inscrito no reserva ni libera un cupo (índice único como respaldo ante carreras)
+        if await col_inscripciones.find_one({"taller_id": _id, "estudiante_id": usuario["id"]}, {"_id": 1}):
+            return 409, {"mensaje": "Ya estás inscrito en este taller"}
+        ahora = datetime.utcnow().isoformat()
+        actualizado = await col_talleres.find_one_and_update(
+            {"_id": _id, "cupos_disponibles": {"$gt": 0}, "en_espera": {"$not": {"$gt": 0}}},
+            {"$inc": {"inscritos": 1, "cupos_disponibles": -1, "version": 1}, "$set": {"modificado_en": ahora}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if not actualizado:
+            if not await col_talleres.find_one({"_id": _id}, {"_id": 1}):
+                return 404, {"mensaje": "Taller no encontrado"}
+            if await col_inscripciones.find_one({"taller_id": _id, "estudiante_id": usuario["id"]}, {"_id": 1}):
+                return 409, {"mensaje": "Ya estás inscrito en este taller"}
+            return 409, {"mensaje": "Cupo lleno", "lista_espera": f"/workshops/{id_taller}/waitlist"}
+
+        try:
+            await col_inscripciones.insert_one({
+                "taller_id": _id,
+                "estudiante_id": usuario["id"],
+                "nombre": usuario["nombre"],
+                "email": usuario["email"],
+                "registrado_en": ahora,
+                "fecha": actualizado.get("fecha"),
+                "hora": actualizado.get("hora"),
+            })
+        except errors.DuplicateKeyError:
+            await col_talleres.update_one(
+                {"_id": _id},
+                {"$inc": {"inscritos": -1, "cupos_disponibles": 1, "version": 1}, "$set": {"modificado_en": ahora}},
+            )
+            return 409, {"mensaje": "Ya estás inscrito en este taller"}
+        await self._registrar_cambio(_id, registros=1)
+        await self._publicar_evento(evento_taller("cupos", actualizado))
+        await self._adjuntar_inscripciones([actualizado])
+        return 201, serializar_taller(actualizado)
+
+    async def _registrar_cambio(self, _id, **deltas):
+        """
+        Efectos de una escritura sobre un taller: contadores de /stats, versión del
+        catálogo (ETag de los listados), cache de respuestas y cache del taller
+        """
+        estadisticas = self.db_primario["estadisticas"]
+        try:
+            await estadisticas.update_one(
+                {"_id": "global"},
+                {"$inc": {**deltas, "version_catalogo": 1}, "$set": {"catalogo_modificado_en": datetime.utcnow().isoformat()}},
+                upsert=True,
+            )
+        except Exception as e:
+            print(f"⚠️  No se pudieron actualizar las estadísticas: {e}")
+        cache = self.componentes["cache_talleres"]
+        if self.redis is not None:
+            try:
+                await self.redis.incr(cache.clave_generacion)
+            except Exception:
+                pass
+        cache.invalidar_local()
+        # El worker que escribió desaloja el taller al instante; el resto espera al vigilante
+        self.componentes["cache_taller"].desalojar(_id)
+
+    async def _publicar_evento(self, evento):
+        """Publica un evento en vivo; un fallo nunca afecta a la escritura que lo originó"""
+        try:
+            if self.redis is not None:
+                await self.redis.publish(self.componentes["espacio_redis"] + CANAL_EVENTOS, dumps_bytes(evento))
+            else:
+                self.componentes["bus_eventos"].publicar(evento)
+        except Exception as e:
+            print(f"⚠️  No se pudo publicar el evento: {e}")
+
+
+def _header(scope, nombre):
+    """Valor de un header de la petición como str ('' si no está)"""
+    for clave, valor in scope.get("headers") or []:
+        if clave == nombre:
+            return valor.decode("latin-1")
+    return ""
+
+
+def _es_condicional(scope):
+    """Las peticiones con If-None-Match/If-Modified-Since se resuelven en Flask (respuestas 304)"""
+    return any(nombre in (b"if-none-match", b"if-modified-since") for nombre, _ in scope.get("headers") or [])
+
+
+async def _esperar_desconexion(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+app = AppASGI(app_wsgi)
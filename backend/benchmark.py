@@ -0,0 +1,424 @@
+"""
+SkillsForge - Benchmark de la API
+=================================
+
+Siembra un catálogo reproducible y mide latencia (p50/p95/p99) y
+throughput (RPS) de cargas de trabajo mixtas. El resultado se imprime en JSON
+para comparar ejecuciones y detectar regresiones:
+
+    # En proceso, con el cliente de pruebas de Flask y mongomock
+    python benchmark.py --mongomock
+
+    # En proceso contra un mongod local
+    python benchmark.py --talleres 2000 --estudiantes 5000
+
+    # Contra un servidor real (comparte MONGO_URI y JWT_SECRET; MONGO_DB_NAME=talleresdb_benchmark)
+    python benchmark.py --url http://localhost:5000 --concurrencia 16
+
+Escenarios:
+    catalogo     Navegación del catálogo: listados, filtros, búsqueda y detalle
+    login        Ráfaga de logins de estudiantes (dominada por el hashing)
+    inscripcion  Ráfaga de inscripciones sobre un único taller popular
+
+La base de datos indicada con --db (por defecto `<MONGO_DB_NAME>_benchmark`)
+se vacía y se vuelve a sembrar en cada ejecución. Para no borrar datos
+reales, la base configurada de la aplicación se rechaza salvo con --forzar.
+Las claves de Redis usan esa misma base como prefijo (REDIS_PREFIJO), de modo
+que la cache, los límites y los candados de la aplicación no se tocan. En
+modo HTTP el servidor debe arrancarse con MONGO_DB_NAME apuntando a esa base.
+En modo local se desactivan los límites de peticiones; en modo HTTP se
+aplican los del servidor y aparecen como respuestas 429 en el conteo de estados.
+"""
+
+import argparse
+import contextlib
+import http.client
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from urllib.parse import urlsplit
+
+ESCENARIOS = ("catalogo", "login", "inscripcion")
+SUFIJO_BASE = "_benchmark"
+
+CATEGORIAS = ["tecnologia", "emprendimiento", "habilidades-blandas", "idiomas", "arte", "salud"]
+TIPOS = ["curso técnico", "capacitacion", "charla", "taller práctico"]
+TEMAS = [
+    "Python", "Datos", "Liderazgo", "Comunicación", "Finanzas", "Marketing", "Diseño",
+    "Inglés", "Fotografía", "Redes", "Seguridad", "Nutrición", "Oratoria", "Excel",
+]
+NIVELES = ["Introducción a", "Fundamentos de", "Taller de", "Avanzado de", "Práctica de"]
+NOMBRES = ["Ana", "Luis", "María", "José", "Carla", "Pedro", "Lucía", "Diego", "Sofía", "Tomás"]
+APELLIDOS = ["Pérez", "Gómez", "Rojas", "Muñoz", "Díaz", "Soto", "Vargas", "Castro", "Núñez", "Reyes"]
+
+# Fecha fija para que el catálogo sembrado sea idéntico entre ejecuciones
+FECHA_BASE = date(2030, 1, 1)
+CONTRASENA = "benchmark123"
+
+
+def generar_talleres(rng, n, cupo_popular):
+    """
+    Genera n talleres deterministas; el primero es el taller popular de la ráfaga de inscripciones
+
+    Returns:
+        list: Documentos listos para insertar (con `_id` determinista)
+    """
+    from bson import ObjectId
+    from busqueda import terminos_taller
+
+    talleres = []
+    for i in range(n):
+        cupo = cupo_popular if i == 0 else rng.randint(10, 60)
+        doc = {
+            "_id": ObjectId(rng.randbytes(12)),
+            "nombre": f"{rng.choice(NIVELES)} {rng.choice(TEMAS)} {i}",
+            "descripcion": f"Taller de {rng.choice(TEMAS).lower()} para la comunidad.",
+            "fecha": (FECHA_BASE + timedelta(days=rng.randint(0, 180))).isoformat(),
+            "hora": f"{rng.randint(8, 20):02d}:{rng.choice(['00', '30'])}",
+            "lugar": f"Aula {rng.randint(100, 130)}",
+            "categoria": rng.choice(CATEGORIAS),
+            "tipo": rng.choice(TIPOS),
+            "instructor": f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)}",
+            "rating": round(rng.uniform(3, 5), 1),
+            "cupo": cupo,
+            "inscritos": 0,
+            "cupos_disponibles": cupo,
+            "creado_en": (datetime.combine(FECHA_BASE, datetime.min.time()) - timedelta(minutes=n - i)).isoformat(),
+            "actualizado_en": None,
+            "version": 1,
+        }
+        doc["modificado_en"] = doc["creado_en"]
+        doc["terminos"] = terminos_taller(doc)
+        talleres.append(doc)
+    return talleres
+
+
+def generar_estudiantes(rng, n, hash_contrasena):
+    """Genera n estudiantes deterministas que comparten la contraseña de benchmark"""
+    from bson import ObjectId
+    from busqueda import terminos_estudiante
+
+    estudiantes = []
+    for i in range(n):
+        doc = {
+            "_id": ObjectId(rng.randbytes(12)),
+            "nombre": f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)}",
+            "email": f"bench{i}@benchmark.local",
+            "hash": hash_contrasena,
+            "creado_en": (datetime.combine(FECHA_BASE, datetime.min.time()) - timedelta(seconds=n - i)).isoformat(),
+        }
+        doc["terminos"] = terminos_estudiante(doc)
+        estudiantes.append(doc)
+    return estudiantes
+
+
+def sembrar(db, talleres, estudiantes, redis_url, espacio):
+    """Vacía la base de benchmark, inserta los datos e invalida la cache del catálogo (en el espacio de Redis dado)"""
+    from cache import CacheRespuestas
+    from migraciones import reconciliar_estadisticas
+
+    for nombre in ("talleres", "estudiantes", "inscripciones", "lista_espera", "estadisticas", "categorias"):
+        db[nombre].delete_many({})
+    for inicio in range(0, len(talleres), 1000):
+        db["talleres"].insert_many(talleres[inicio:inicio + 1000])
+    for inicio in range(0, len(estudiantes), 1000):
+        db["estudiantes"].insert_many(estudiantes[inicio:inicio + 1000])
+    reconciliar_estadisticas(db)
+
+    try:
+        import redis
+        cliente = redis.from_url(redis_url)
+        cliente.ping()
+    except Exception:
+        cliente = None
+    # Las respuestas cacheadas de una ejecución anterior no deben servirse sobre datos nuevos
+    CacheRespuestas(cliente, prefijo="talleres", espacio=espacio).invalidar()
+
+
+def token_estudiante(est, secreto):
+    """Emite un token con el mismo formato que /auth/estudiantes/login, sin pagar el hashing"""
+    import jwt
+
+    ahora = datetime.utcnow()
+    return jwt.encode(
+        {
+            "sub": str(est["_id"]), "rol": "estudiante", "email": est["email"],
+            "nombre": est["nombre"], "exp": ahora + timedelta(hours=8), "iat": ahora,
+        },
+        secreto,
+        algorithm="HS256",
+    )
+
+
+def plan_catalogo(rng, talleres, n, busqueda_texto):
+    """Mezcla de lecturas del catálogo como las que hace el frontend"""
+    from busqueda import normalizar_texto
+
+    plan = []
+    for _ in range(n):
+        taller = rng.choice(talleres)
+        tirada = rng.random()
+        if tirada < 0.30:
+            ruta = "/workshops?limit=20"
+        elif tirada < 0.45:
+            ruta = f"/workshops?limit=20&categoria={rng.choice(CATEGORIAS)}"
+        elif tirada < 0.60:
+            palabra = normalizar_texto(taller["nombre"].split()[-2])
+            if busqueda_texto and rng.random() < 0.5:
+                ruta = f"/workshops?limit=20&q={palabra}"
+            else:
+                ruta = f"/workshops?limit=20&modo=prefijo&q={palabra[:3]}"
+        elif tirada < 0.70:
+            desde = FECHA_BASE + timedelta(days=rng.randint(0, 150))
+            ruta = f"/workshops?limit=20&fechaDesde={desde.isoformat()}&fechaHasta={(desde + timedelta(days=30)).isoformat()}"
+        elif tirada < 0.80:
+            ruta = "/workshops?limit=20&disponibles=1&sort=fecha"
+        elif tirada < 0.90:
+            ruta = f"/workshops/{taller['_id']}"
+        elif tirada < 0.95:
+            ruta = "/categories"
+        else:
+            ruta = "/stats"
+        plan.append(("GET", ruta, None, {}))
+    return plan
+
+
+def plan_login(rng, estudiantes, n):
+    """Logins con credenciales válidas de estudiantes al azar"""
+    return [
+        ("POST", "/auth/estudiantes/login", {"email": rng.choice(estudiantes)["email"], "contrasena": CONTRASENA}, {})
+        for _ in range(n)
+    ]
+
+
+def plan_inscripcion(rng, estudiantes, taller_popular, n, secreto):
+    """Inscripciones de estudiantes distintos sobre el mismo taller (se agota el cupo a mitad de la ráfaga)"""
+    elegidos = rng.sample(estudiantes, min(n, len(estudiantes)))
+    ruta = f"/workshops/{taller_popular['_id']}/register"
+    return [
+        ("POST", ruta, None, {"Authorization": f"Bearer {token_estudiante(est, secreto)}"})
+        for est in elegidos
+    ]
+
+
+class ClienteLocal:
+    """Ejecuta peticiones con el cliente de pruebas de Flask (un cliente por hilo)"""
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def __call__(self, metodo, ruta, cuerpo, headers):
+        cliente = getattr(self._local, "cliente", None)
+        if cliente is None:
+            cliente = self._local.cliente = self.app.test_client()
+        respuesta = cliente.open(ruta, method=metodo, json=cuerpo, headers=headers)
+        respuesta.get_data()
+        return respuesta.status_code
+
+
+def esperar_listo(cliente, limite=30.0):
+    """Espera a que GET /ready deje de responder 503 (el worker terminó de calentarse)"""
+    fin = time.monotonic() + limite
+    while time.monotonic() < fin:
+        try:
+            if cliente("GET", "/ready", None, {}) != 503:
+                return True
+        except OSError:
+            pass
+        time.sleep(0.1)
+    return False
+
+
+class ClienteHTTP:
+    """Ejecuta peticiones contra un servidor real con conexiones keep-alive por hilo"""
+
+    def __init__(self, url):
+        partes = urlsplit(url)
+        self.clase = http.client.HTTPSConnection if partes.scheme == "https" else http.client.HTTPConnection
+        self.host = partes.netloc
+        self.base = partes.path.rstrip("/")
+        self._local = threading.local()
+
+    def __call__(self, metodo, ruta, cuerpo, headers):
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is None:
+            conexion = self._local.conexion = self.clase(self.host, timeout=30)
+        datos = None
+        headers = dict(headers)
+        if cuerpo is not None:
+            datos = json.dumps(cuerpo).encode()
+            headers["Content-Type"] = "application/json"
+        try:
+            conexion.request(metodo, self.base + ruta, body=datos, headers=headers)
+            respuesta = conexion.getresponse()
+            respuesta.read()
+            return respuesta.status
+        except (http.client.HTTPException, OSError):
+            conexion.close()
+            self._local.conexion = None
+            return 0
+
+
+def percentil(ordenadas, p):
+    """Percentil por rango más cercano sobre una lista ordenada"""
+    if not ordenadas:
+        return 0.0
+    indice = max(0, min(len(ordenadas) - 1, int(round(p / 100 * len(ordenadas))) - 1))
+    return ordenadas[indice]
+
+
+def ejecutar(cliente, plan, concurrencia):
+    """
+    Ejecuta un plan de peticiones con la concurrencia indicada
+
+    Returns:
+        dict: Peticiones, duración, RPS, percentiles en milisegundos y conteo por estado
+    """
+    def medir(peticion):
+        inicio = time.perf_counter()
+        estado = cliente(*peticion)
+        return time.perf_counter() - inicio, estado
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as executor:
+        resultados = list(executor.map(medir, plan))
+    duracion = time.perf_counter() - inicio
+
+    latencias = sorted(r[0] * 1000 for r in resultados)
+    estados = {}
+    for _, estado in resultados:
+        estados[str(estado)] = estados.get(str(estado), 0) + 1
+    return {
+        "peticiones": len(plan),
+        "duracion_s": round(duracion, 3),
+        "rps": round(len(plan) / duracion, 1) if duracion else 0.0,
+        "p50_ms": round(percentil(latencias, 50), 3),
+        "p95_ms": round(percentil(latencias, 95), 3),
+        "p99_ms": round(percentil(latencias, 99), 3),
+        "max_ms": round(latencias[-1], 3) if latencias else 0.0,
+        "estados": dict(sorted(estados.items())),
+    }
+
+
+def base_por_defecto():
+    """Base dedicada al benchmark derivada de MONGO_DB_NAME (nunca la base de la aplicación)"""
+    nombre = os.getenv("MONGO_DB_NAME", "talleresdb")
+    return nombre if nombre.endswith(SUFIJO_BASE) else nombre + SUFIJO_BASE
+
+
+def parsear_argumentos(argv):
+    parser = argparse.ArgumentParser(description="Benchmark reproducible de la API de talleres")
+    parser.add_argument("--url", help="URL de un servidor en ejecución (modo HTTP); sin ella se usa el cliente de pruebas de Flask")
+    parser.add_argument("--mongomock", action="store_true", help="Modo local sobre mongomock en lugar de MongoDB")
+    parser.add_argument("--db", default=base_por_defecto(), help="Base de datos a sembrar (se vacía)")
+    parser.add_argument("--forzar", action="store_true", help="Permite usar la base configurada de la aplicación (MONGO_DB_NAME)")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--talleres", type=int, default=500)
+    parser.add_argument("--estudiantes", type=int, default=1000)
+    parser.add_argument("--cupo-popular", type=int, default=50, help="Cupo del taller de la ráfaga de inscripciones")
+    parser.add_argument("--escenarios", default=",".join(ESCENARIOS))
+    parser.add_argument("--peticiones", type=int, default=500, help="Peticiones por escenario (login usa una décima parte)")
+    parser.add_argument("--concurrencia", type=int, default=8)
+    parser.add_argument("--calentamiento", type=int, default=20, help="Peticiones de catálogo no medidas antes de empezar")
+    parser.add_argument("--sin-sembrar", action="store_true", help="Reutiliza los datos de una siembra anterior con los mismos parámetros")
+    parser.add_argument("--salida", help="Archivo donde escribir el JSON (por defecto stdout)")
+    args = parser.parse_args(argv)
+    args.escenarios = [e.strip() for e in args.escenarios.split(",") if e.strip()]
+    desconocidos = [e for e in args.escenarios if e not in ESCENARIOS]
+    if desconocidos:
+        parser.error(f"escenarios desconocidos: {', '.join(desconocidos)}")
+    if args.url and args.mongomock:
+        parser.error("--mongomock solo aplica al modo local")
+    base_app = os.getenv("MONGO_DB_NAME", "talleresdb")
+    if not args.mongomock and not args.forzar and args.db == base_app and not args.db.endswith(SUFIJO_BASE):
+        parser.error(f"--db {args.db} es la base configurada de la aplicación y se vaciaría; usa otra base o --forzar")
+    return args
+
+
+def main(argv):
+    """Punto de entrada de la línea de comandos"""
+    args = parsear_argumentos(argv)
+    # Config lee el entorno al importarse: la base de benchmark se fija antes. Las claves de
+    # Redis (cache, límites, candados) van a un espacio propio para no tocar las de la aplicación
+    os.environ["MONGO_DB_NAME"] = args.db
+    os.environ["REDIS_PREFIJO"] = args.db
+
+    import pymongo
+    if args.mongomock:
+        try:
+            import mongomock
+        except ImportError:
+            print("❌ --mongomock requiere el paquete mongomock (pip install mongomock)", file=sys.stderr)
+            return 1
+        # La app y la siembra deben compartir el mismo almacenamiento en memoria
+        compartido = mongomock.MongoClient()
+        pymongo.MongoClient = lambda *a, **k: compartido
+
+    from config import Config
+    from hashing import generar_hash
+
+    rng = random.Random(args.semilla)
+    talleres = generar_talleres(rng, max(args.talleres, 1), args.cupo_popular)
+    # Un único hash compartido: la siembra no paga el costo de hashing por estudiante
+    hash_contrasena = generar_hash(CONTRASENA, Config.PASSWORD_HASH_METODO)
+    estudiantes = generar_estudiantes(rng, max(args.estudiantes, 1), hash_contrasena)
+
+    if not args.sin_sembrar:
+        cliente_db = pymongo.MongoClient(Config.MONGO_URI, serverSelectionTimeoutMS=5000)
+        sembrar(cliente_db[Config.MONGO_DB_NAME], talleres, estudiantes, Config.REDIS_URL, f"{Config.REDIS_PREFIJO}:")
+
+    if args.url:
+        cliente = ClienteHTTP(args.url)
+    else:
+        # Los mensajes de arranque de la app van a stderr para no mezclarse con el JSON
+        with contextlib.redirect_stdout(sys.stderr):
+            from app import app
+        for limitador in app.extensions.get("limiter", ()):
+            limitador.enabled = False
+        cliente = ClienteLocal(app)
+
+    # Los mensajes del arranque en segundo plano también van a stderr
+    with contextlib.redirect_stdout(sys.stderr):
+        listo = esperar_listo(cliente)
+    if not listo:
+        print("❌ La API no quedó lista a tiempo (GET /ready)", file=sys.stderr)
+        return 1
+
+    busqueda_texto = not args.mongomock  # mongomock no implementa $text
+    planes = {
+        "catalogo": lambda: plan_catalogo(rng, talleres, args.peticiones, busqueda_texto),
+        "login": lambda: plan_login(rng, estudiantes, max(args.peticiones // 10, 1)),
+        "inscripcion": lambda: plan_inscripcion(rng, estudiantes, talleres[0], args.peticiones, Config.JWT_SECRET),
+    }
+
+    if args.calentamiento:
+        ejecutar(cliente, plan_catalogo(random.Random(args.semilla), talleres, args.calentamiento, busqueda_texto), args.concurrencia)
+
+    reporte = {
+        "modo": "http" if args.url else ("mongomock" if args.mongomock else "local"),
+        "semilla": args.semilla,
+        "talleres": len(talleres),
+        "estudiantes": len(estudiantes),
+        "concurrencia": args.concurrencia,
+        "escenarios": {},
+    }
+    for nombre in args.escenarios:
+        reporte["escenarios"][nombre] = ejecutar(cliente, planes[nombre](), args.concurrencia)
+
+    salida = json.dumps(reporte, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(salida + "\n")
+    else:
+        print(salida)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,78 @@
+"""
+SkillsForge - Utilidades de Búsqueda
+====================================
+
+Normalización de texto para las búsquedas del catálogo y de estudiantes.
+Los documentos guardan un campo indexado `terminos` con sus palabras en
+minúsculas y sin acentos, lo que permite búsquedas por prefijo ancladas
+(que sí usan índice) sin pasar la entrada del usuario al motor de regex.
+"""
+
+import re
+import unicodedata
+
+# Campos de texto indexados del taller y su peso en el índice de texto completo
+PESOS_TALLER = {
+    "nombre": 10,
+    "instructor": 5,
+    "tipo": 3,
+    "lugar": 2,
+    "descripcion": 1,
+}
+
+# Campos del taller que alimentan `terminos` (la descripción queda fuera para acotar el índice)
+CAMPOS_TERMINOS_TALLER = ("nombre", "instructor", "tipo", "lugar", "categoria")
+
+_PALABRA = re.compile(r"\w+")
+
+
+def normalizar_texto(texto):
+    """Convierte a minúsculas y elimina acentos/diacríticos"""
+    if not texto:
+        return ""
+    descompuesto = unicodedata.normalize("NFKD", str(texto))
+    return "".join(c for c in descompuesto if not unicodedata.combining(c)).lower()
+
+
+def terminos_taller(doc):
+    """Calcula la lista de términos normalizados de un taller"""
+    terminos = set()
+    for campo in CAMPOS_TERMINOS_TALLER:
+        terminos.update(_PALABRA.findall(normalizar_texto(doc.get(campo))))
+    return sorted(terminos)
+
+
+def terminos_estudiante(doc):
+    """
+    Calcula la lista de términos normalizados de un estudiante
+
+    Incluye las palabras del nombre, el email completo, su dominio (con y sin
+    "@") y las palabras del email, para que buscar "gmail" o "perez" siga
+    encontrando a "juan.perez@gmail.com" como con la búsqueda por subcadena.
+    """
+    terminos = set(_PALABRA.findall(normalizar_texto(doc.get("nombre"))))
+    email = normalizar_texto(doc.get("email"))
+    if email:
+        terminos.add(email)
+        terminos.update(_PALABRA.findall(email))
+        _, arroba, dominio = email.rpartition("@")
+        if arroba and dominio:
+            terminos.update((dominio, "@" + dominio))
+    return sorted(terminos)
+
+
+def filtro_prefijos(consulta, campo="terminos"):
+    """
+    Construye un filtro donde cada palabra de la consulta debe ser prefijo de algún término
+
+    Las expresiones quedan ancladas al inicio y escapadas, por lo que MongoDB
+    las resuelve con un recorrido acotado del índice.
+
+    Returns:
+        dict: Filtro MongoDB, vacío si la consulta no tiene palabras
+    """
+    palabras = normalizar_texto(consulta).split()
+    if not palabras:
+        return {}
+    condiciones = [{campo: {"$regex": "^" + re.escape(p)}} for p in palabras]
+    return condiciones[0] if len(condiciones) == 1 else {"$and": condiciones}
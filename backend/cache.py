@@ -0,0 +1,423 @@
+"""
+SkillsForge - Cache de Respuestas
+=================================
+
+Cache de lectura (read-through) para los endpoints de catálogo. Las entradas
+se guardan en Redis cuando está disponible y en un LRU en memoria del proceso
+cuando no lo está.
+
+La invalidación es por generación: cada escritura incrementa un contador y las
+claves incluyen la generación vigente, de modo que las entradas anteriores
+quedan huérfanas y expiran solas por TTL.
+
+También incluye la cache de principales autenticados, que evita decodificar
+el JWT y consultar MongoDB en cada petición de estudiante, y la cache de
+documentos individuales, invalidada por los cambios de la propia colección.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from pymongo import errors
+
+
+class CacheLRU:
+    """Cache LRU en memoria con expiración por TTL, segura entre hilos"""
+
+    def __init__(self, capacidad=1024):
+        self.capacidad = capacidad
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        """Devuelve el valor asociado a la clave o None si no existe o expiró"""
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+            valor, expira = entrada
+            if expira is not None and expira < time.monotonic():
+                del self._datos[clave]
+                return None
+            self._datos.move_to_end(clave)
+            return valor
+
+    def guardar(self, clave, valor, ttl=None):
+        """Guarda un valor, desalojando la entrada menos usada si se excede la capacidad"""
+        expira = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._datos[clave] = (valor, expira)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.capacidad:
+                self._datos.popitem(last=False)
+
+    def eliminar(self, clave):
+        """Elimina una clave si existe"""
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def incrementar(self, clave):
+        """Incrementa un contador entero sin expiración y devuelve el nuevo valor"""
+        with self._lock:
+            valor, _ = self._datos.get(clave, (0, None))
+            valor += 1
+            self._datos[clave] = (valor, None)
+            self._datos.move_to_end(clave)
+            return valor
+
+    def eliminar_donde(self, predicado):
+        """Elimina las entradas cuyo valor cumple el predicado (recorrido completo, uso ocasional)"""
+        with self._lock:
+            claves = [k for k, (v, _) in self._datos.items() if predicado(v)]
+            for clave in claves:
+                del self._datos[clave]
+            return len(claves)
+
+    def limpiar(self):
+        """Vacía la cache"""
+        with self._lock:
+            self._datos.clear()
+
+    def claves(self):
+        """Copia de las claves presentes (sin alterar el orden de uso)"""
+        with self._lock:
+            return list(self._datos)
+
+
+class CacheRespuestas:
+    """
+    Cache de respuestas serializadas con invalidación por generación
+
+    Args:
+        redis_client: Cliente Redis o None para usar solo memoria
+        prefijo (str): Nombre de la cache (claves y etiqueta de métricas)
+        ttl (int): Segundos de vida de cada entrada
+        capacidad (int): Máximo de entradas del LRU local
+        metricas: Registro de métricas opcional (aciertos, fallos y errores de Redis)
+        espacio (str): Prefijo del despliegue para las claves en Redis (ver REDIS_PREFIJO)
+    """
+
+    def __init__(self, redis_client=None, prefijo="cache", ttl=60, capacidad=1024, metricas=None, espacio=""):
+        self.redis = redis_client
+        self.prefijo = prefijo
+        self.espacio = espacio
+        self.ttl = ttl
+        self.local = CacheLRU(capacidad)
+        self.metricas = metricas
+        self.clave_generacion = f"{espacio}{prefijo}:gen"
+
+    def _contar(self, resultado):
+        if self.metricas is not None:
+            self.metricas.incrementar("cache_consultas_total", (self.prefijo, resultado))
+
+    def _error_redis(self):
+        if self.metricas is not None:
+            self.metricas.incrementar("redis_errores_total", (self.prefijo,))
+
+    def _generacion(self):
+        """Obtiene la generación vigente (Redis o memoria local)"""
+        if self.redis is not None:
+            try:
+                gen = self.redis.get(self.clave_generacion)
+                return int(gen) if gen else 0
+            except Exception:
+                self._error_redis()
+        return self.local.obtener(self.clave_generacion) or 0
+
+    def clave_en(self, clave, generacion):
+        """Clave de una entrada en una generación dada"""
+        return f"{self.espacio}{self.prefijo}:{generacion}:{clave}"
+
+    def obtener(self, clave):
+        """
+        Busca el cuerpo cacheado para la clave en la generación vigente
+
+        Returns:
+            tuple: (generación leída, cuerpo o None); ante un fallo, la generación
+            se pasa a `guardar` para que el cuerpo calculado quede bajo ella
+        """
+        generacion = self._generacion()
+        clave_gen = self.clave_en(clave, generacion)
+        if self.redis is not None:
+            try:
+                valor = self.redis.get(clave_gen)
+                self._contar("redis" if valor is not None else "fallo")
+                return generacion, (valor.decode("utf-8") if isinstance(valor, bytes) else valor)
+            except Exception:
+                self._error_redis()
+        valor = self.local.obtener(clave_gen)
+        self._contar("local" if valor is not None else "fallo")
+        return generacion, valor
+
+    def guardar(self, clave, valor, generacion):
+        """
+        Guarda un cuerpo serializado bajo la generación leída en `obtener`
+
+        Si una escritura invalidó la cache mientras se calculaba el cuerpo, este
+        queda bajo una generación ya superada y nunca se sirve.
+        """
+        clave_gen = self.clave_en(clave, generacion)
+        if self.redis is not None:
+            try:
+                self.redis.set(clave_gen, valor, ex=self.ttl)
+                return
+            except Exception:
+                self._error_redis()
+        self.local.guardar(clave_gen, valor, self.ttl)
+
+    def invalidar(self):
+        """Avanza la generación para que ninguna entrada previa vuelva a servirse"""
+        if self.redis is not None:
+            try:
+                self.redis.incr(self.clave_generacion)
+            except Exception:
+                self._error_redis()
+        self.invalidar_local()
+
+    def invalidar_local(self):
+        """
+        Avanza solo la generación en memoria
+
+        La generación local cubre caídas intermitentes de Redis; la usa también
+        quien ya avanzó la de Redis por su cuenta (las rutas nativas de asgi.py).
+        """
+        self.local.incrementar(self.clave_generacion)
+
+
+class CachePrincipales:
+    """
+    Cache de principales autenticados indexada por hash del token
+
+    El nivel local usa un TTL corto para acotar la desactualización entre
+    procesos; el nivel Redis (opcional) se comparte entre workers y se
+    invalida explícitamente por estudiante.
+
+    Args:
+        redis_client: Cliente Redis o None para usar solo memoria
+        ttl (int): Segundos de vida en Redis
+        ttl_local (int): Segundos de vida en la memoria del proceso
+        capacidad (int): Máximo de principales en memoria
+        metricas: Registro de métricas opcional (aciertos, fallos y errores de Redis)
+        espacio (str): Prefijo del despliegue para las claves en Redis (ver REDIS_PREFIJO)
+    """
+
+    def __init__(self, redis_client=None, ttl=60, ttl_local=5, capacidad=10000, metricas=None, espacio=""):
+        self.redis = redis_client
+        self.espacio = espacio
+        self.ttl = ttl
+        self.ttl_local = ttl_local
+        self.local = CacheLRU(capacidad)
+        self.metricas = metricas
+
+    def _contar(self, resultado):
+        if self.metricas is not None:
+            self.metricas.incrementar("cache_consultas_total", ("principales", resultado))
+
+    def _error_redis(self):
+        if self.metricas is not None:
+            self.metricas.incrementar("redis_errores_total", ("principales",))
+
+    @staticmethod
+    def _hash(token):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def obtener(self, token):
+        """Devuelve el principal cacheado para el token o None"""
+        clave = self._hash(token)
+        principal = self.local.obtener(clave)
+        if principal is not None:
+            self._contar("local")
+            return principal
+        if self.redis is None:
+            self._contar("fallo")
+            return None
+        try:
+            crudo = self.redis.get(f"{self.espacio}auth:tok:{clave}")
+        except Exception:
+            self._error_redis()
+            crudo = None
+        if not crudo:
+            self._contar("fallo")
+            return None
+        self._contar("redis")
+        principal = json.loads(crudo)
+        self.local.guardar(clave, principal, self._ttl_para(principal, self.ttl_local))
+        return principal
+
+    def guardar(self, token, principal, expira=None):
+        """
+        Guarda el principal de un token ya verificado
+
+        Args:
+            expira (int): Timestamp `exp` del token; la entrada nunca lo sobrevive
+        """
+        principal = {**principal, "_exp": expira}
+        clave = self._hash(token)
+        self.local.guardar(clave, principal, self._ttl_para(principal, self.ttl_local))
+        if self.redis is None:
+            return
+        ttl = self._ttl_para(principal, self.ttl)
+        try:
+            pipe = self.redis.pipeline()
+            indice = f"{self.espacio}auth:est:{principal['id']}"
+            pipe.set(f"{self.espacio}auth:tok:{clave}", json.dumps(principal), ex=ttl)
+            pipe.sadd(indice, clave)
+            pipe.expire(indice, self.ttl)
+            pipe.execute()
+        except Exception:
+            self._error_redis()
+
+    def invalidar_estudiante(self, est_id):
+        """Descarta todos los principales cacheados de un estudiante"""
+        self.local.eliminar_donde(lambda p: p.get("id") == est_id)
+        if self.redis is None:
+            return
+        try:
+            indice = f"{self.espacio}auth:est:{est_id}"
+            claves = self.redis.smembers(indice)
+            pipe = self.redis.pipeline()
+            for clave in claves:
+                clave = clave.decode() if isinstance(clave, bytes) else clave
+                pipe.delete(f"{self.espacio}auth:tok:{clave}")
+            pipe.delete(indice)
+            pipe.execute()
+        except Exception:
+            self._error_redis()
+
+    @staticmethod
+    def _ttl_para(principal, ttl):
+        """Acota el TTL para que la entrada no sobreviva a la expiración del token"""
+        expira = principal.get("_exp")
+        if expira is None:
+            return ttl
+        return max(1, min(ttl, int(expira - time.time())))
+
+
+class CacheDocumentos:
+    """
+    Cache LRU en memoria de documentos serializados por _id
+
+    No requiere invalidaciones desde los handlers: un hilo de fondo vigila la
+    colección con un change stream y desaloja cada documento modificado o
+    eliminado. Si el servidor no admite change streams (standalone), sondea
+    las versiones de los documentos cacheados cada `intervalo_sondeo` segundos.
+
+    Args:
+        coleccion: Colección de pymongo vigilada (idealmente con lectura en el primario)
+        capacidad (int): Máximo de documentos en memoria
+        ttl (int): Vida máxima de cada entrada (red de seguridad ante eventos perdidos)
+        intervalo_sondeo (float): Segundos entre sondeos sin change streams
+        nombre (str): Nombre de la cache en las métricas
+        metricas: Registro de métricas opcional
+    """
+
+    def __init__(self, coleccion, capacidad=256, ttl=300, intervalo_sondeo=1.0, nombre="documentos", metricas=None):
+        self.coleccion = coleccion
+        self.ttl = ttl
+        self.intervalo_sondeo = intervalo_sondeo
+        self.nombre = nombre
+        self.metricas = metricas
+        self.local = CacheLRU(capacidad)
+        self.modo = None  # "change_stream" o "sondeo" una vez iniciada la vigilancia
+        self._desalojos = 0
+        self._lock = threading.Lock()
+        self._hilo = None
+
+    def _contar(self, resultado):
+        if self.metricas is not None:
+            self.metricas.incrementar("cache_consultas_total", (self.nombre, resultado))
+
+    def marca(self):
+        """Marca a tomar antes de leer de MongoDB; `guardar` la usa para descartar lecturas ya invalidadas"""
+        return self._desalojos
+
+    def obtener(self, _id):
+        """
+        Devuelve lo cacheado para `_id` o None
+
+        Returns:
+            tuple: (version, valor) guardados por `guardar`
+        """
+        entrada = self.local.obtener(_id)
+        self._contar("local" if entrada is not None else "fallo")
+        return entrada[1:] if entrada is not None else None
+
+    def guardar(self, _id, version, valor, marca):
+        """Guarda el valor de un documento leído después de `marca`"""
+        self._iniciar_vigilancia()
+        if marca != self._desalojos:
+            # Hubo un cambio mientras se leía: el documento pudo quedar viejo
+            return
+        self.local.guardar(_id, (_id, version, valor), self.ttl)
+
+    def desalojar(self, _id=None):
+        """Elimina un documento (o todos si `_id` es None)"""
+        self._desalojos += 1
+        if _id is None:
+            self.local.limpiar()
+        else:
+            self.local.eliminar(_id)
+
+    def _iniciar_vigilancia(self):
+        if self._hilo is not None:
+            return
+        with self._lock:
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._vigilar, name=f"cache-{self.nombre}", daemon=True)
+                self._hilo.start()
+
+    def _vigilar(self):
+        """Hilo de fondo: change stream con reconexión, o sondeo si no está disponible"""
+        espera = 1
+        token = None
+        while True:
+            try:
+                with self.coleccion.watch(resume_after=token) as stream:
+                    if self.modo is None or token is None:
+                        # Lo cacheado antes de abrir el stream no tiene eventos garantizados
+                        self.desalojar()
+                    self.modo = "change_stream"
+                    espera = 1
+                    for cambio in stream:
+                        token = stream.resume_token
+                        clave = cambio.get("documentKey", {}).get("_id")
+                        # invalidate, drop o rename no traen documento: se vacía todo
+                        self.desalojar(clave)
+            except (errors.OperationFailure, NotImplementedError) as e:
+                if self.modo != "change_stream":
+                    print(f"⚠️  Change streams no disponibles en {self.nombre}, usando sondeo: {e}")
+                    self.modo = "sondeo"
+                    return self._sondear()
+                # El token ya no es reanudable: se empieza de cero
+                print(f"⚠️  Change stream de {self.nombre} reiniciado: {e}")
+                token = None
+                self.desalojar()
+                time.sleep(espera)
+                espera = min(espera * 2, 30)
+            except Exception as e:
+                print(f"⚠️  Vigilancia de {self.nombre} interrumpida, reintentando: {e}")
+                self.desalojar()
+                time.sleep(espera)
+                espera = min(espera * 2, 30)
+
+    def _sondear(self):
+        """Desaloja los documentos cacheados cuya versión cambió o que ya no existen"""
+        while True:
+            time.sleep(self.intervalo_sondeo)
+            ids = self.local.claves()
+            if not ids:
+                continue
+            try:
+                actuales = {
+                    d["_id"]: d.get("version")
+                    for d in self.coleccion.find({"_id": {"$in": ids}}, {"version": 1})
+                }
+            except Exception as e:
+                print(f"⚠️  Falló el sondeo de {self.nombre}: {e}")
+                continue
+            ausente = object()
+            if self.local.eliminar_donde(lambda v: actuales.get(v[0], ausente) != v[1]):
+                self._desalojos += 1
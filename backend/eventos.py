@@ -0,0 +1,135 @@
+"""
+SkillsForge - Eventos en Vivo
+=============================
+
+Bus de eventos del catálogo para los streams Server-Sent Events
+(GET /workshops/events y GET /workshops/<id>/events).
+
+Los handlers de escritura publican cada cambio (cupos, edición, alta y baja
+de talleres) en un canal de Redis pub/sub. Cada proceso mantiene una sola
+suscripción a ese canal y reparte los eventos entre sus clientes conectados,
+de modo que el costo en Redis no crece con el número de clientes. Sin Redis,
+los eventos se entregan solo dentro del proceso que los publica.
+"""
+
+import json
+import queue
+import sys
+import threading
+import time
+
+from serializacion import dumps_bytes
+
+CANAL_EVENTOS = "talleres:eventos"
+
+# Marca que se encola cuando un cliente no consume a tiempo: su stream se cierra
+# y EventSource reconecta, recibiendo de nuevo el estado actual
+DESCONECTAR = object()
+
+
+def formatear_sse(evento):
+    """Codifica un evento como bloque SSE (`event:` + `data:`)"""
+    return b"event: " + evento.get("tipo", "mensaje").encode() + b"\ndata: " + dumps_bytes(evento) + b"\n\n"
+
+
+def evento_taller(tipo, doc):
+    """Construye el evento de un taller con sus contadores de capacidad"""
+    return {
+        "tipo": tipo,
+        "taller_id": str(doc["_id"]),
+        "cupo": doc.get("cupo"),
+        "inscritos": doc.get("inscritos"),
+        "cupos_disponibles": doc.get("cupos_disponibles"),
+        "en_espera": doc.get("en_espera", 0),
+        "version": doc.get("version", 0),
+    }
+
+
+def servidor_concurrente(environ):
+    """
+    Indica si el servidor WSGI atiende varias peticiones por proceso (hilos o gevent)
+
+    Un stream SSE bajo un worker sync de gunicorn ocuparía el proceso completo.
+    """
+    if environ.get("wsgi.multithread"):
+        return True
+    monkey = sys.modules.get("gevent.monkey")
+    return bool(monkey and monkey.is_module_patched("socket"))
+
+
+class BusEventos:
+    """
+    Publicación y reparto de eventos entre procesos vía Redis pub/sub
+
+    Args:
+        redis_client: Cliente Redis o None para reparto solo local
+        tam_cola (int): Eventos pendientes por cliente antes de desconectarlo
+        espacio (str): Prefijo del despliegue para el canal en Redis (ver REDIS_PREFIJO)
+    """
+
+    def __init__(self, redis_client=None, tam_cola=100, espacio=""):
+        self.redis = redis_client
+        self.tam_cola = tam_cola
+        self.canal = espacio + CANAL_EVENTOS
+        self._suscriptores = set()
+        self._lock = threading.Lock()
+        self._hilo = None
+
+    def publicar(self, evento):
+        """Publica un evento para todos los procesos (o solo este si no hay Redis)"""
+        if self.redis is not None:
+            try:
+                self.redis.publish(self.canal, dumps_bytes(evento))
+                return
+            except Exception:
+                pass
+        self._repartir(evento)
+
+    def suscribir(self):
+        """
+        Registra un cliente y devuelve su cola de eventos
+
+        La primera suscripción del proceso inicia el hilo que escucha Redis.
+        """
+        cola = queue.Queue(maxsize=self.tam_cola)
+        with self._lock:
+            self._suscriptores.add(cola)
+            if self.redis is not None and self._hilo is None:
+                self._hilo = threading.Thread(target=self._escuchar, name="bus-eventos", daemon=True)
+                self._hilo.start()
+        return cola
+
+    def desuscribir(self, cola):
+        with self._lock:
+            self._suscriptores.discard(cola)
+
+    def _repartir(self, evento):
+        with self._lock:
+            suscriptores = list(self._suscriptores)
+        for cola in suscriptores:
+            try:
+                cola.put_nowait(evento)
+            except queue.Full:
+                # Cliente lento: se descarta para no acumular memoria ni bloquear al resto
+                self.desuscribir(cola)
+                try:
+                    cola.get_nowait()
+                    cola.put_nowait(DESCONECTAR)
+                except (queue.Empty, queue.Full):
+                    pass
+
+    def _escuchar(self):
+        """Hilo de fondo: una suscripción a Redis por proceso, con reconexión"""
+        espera = 1
+        while True:
+            try:
+                pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.canal)
+                espera = 1
+                for mensaje in pubsub.listen():
+                    if mensaje.get("type") == "message":
+                        self._repartir(json.loads(mensaje["data"]))
+            except Exception as e:
+                print(f"⚠️  Suscripción a eventos interrumpida, reintentando: {e}")
+                time.sleep(espera)
+                espera = min(espera * 2, 30)
@@ -0,0 +1,248 @@
+"""
+SkillsForge - Hashing de Contraseñas
+====================================
+
+Cálculo de hashes de contraseñas fuera del hilo de la petición. El hashing
+es intensivo en CPU, por lo que los lotes grandes (importación de cohortes)
+se reparten entre procesos para no bloquear los workers de la API.
+
+El costo se configura con el método de Werkzeug, por ejemplo
+`scrypt:32768:8:1` o `pbkdf2:sha256:600000`.
+
+Las operaciones individuales (registro y login) pasan por el mismo pool con
+control de admisión: si hay demasiadas en cola se rechazan de inmediato con
+`PoolSaturado`, en lugar de acumular peticiones que ocupan los workers.
+
+Con Redis el límite es común a todos los workers: cada operación en curso
+ocupa un turno con vencimiento en un sorted set, de modo que un worker que
+muere no deja turnos tomados. El control solo ve las peticiones que el
+servidor deja entrar en paralelo; por eso el Dockerfile usa workers gthread
+(con workers sync cada proceso atiende una petición y el resto espera en el
+backlog de gunicorn, donde la cola nunca llega a llenarse).
+
+Las importaciones masivas usan un pool aparte y más chico: un lote de miles
+de contraseñas no se encola delante de los registros y logins ya admitidos.
+
+Los procesos se crean con forkserver (o spawn) y vuelven a importar el script
+principal: un script que use la app debe proteger su punto de entrada con
+`if __name__ == "__main__":` (gunicorn, uvicorn y los scripts del repo ya lo hacen).
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+CLAVE_EN_CURSO = "hash:en_curso"
+
+# Admisión atómica: purga turnos vencidos, rechaza con la cola llena o toma un turno.
+# Devuelve la profundidad tras admitir o -1 si se rechaza.
+_LUA_ADMITIR = """
+local t = redis.call('TIME')
+local ahora = tonumber(t[1]) + tonumber(t[2]) / 1000000
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ahora)
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[1]) then
+  return -1
+end
+redis.call('ZADD', KEYS[1], ahora + tonumber(ARGV[2]), ARGV[3])
+return redis.call('ZCARD', KEYS[1])
+"""
+
+
+def contexto_procesos():
+    """
+    Contexto de multiprocessing para los pools de hashing
+
+    forkserver (o spawn donde no existe): hacer fork de un worker que ya
+    tiene hilos de pymongo y Redis en marcha puede dejar locks tomados en el hijo.
+    """
+    metodo = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(metodo)
+
+
+class PoolSaturado(Exception):
+    """La cola del pool de hashing está llena: la petición debe reintentarse más tarde"""
+
+
+def generar_hash(contrasena, metodo):
+    """Genera el hash de una contraseña (función de módulo para poder enviarla a otro proceso)"""
+    return generate_password_hash(contrasena, method=metodo)
+
+
+def verificar_hash(hash_, contrasena):
+    """Verifica una contraseña contra su hash (función de módulo para poder enviarla a otro proceso)"""
+    return check_password_hash(hash_, contrasena)
+
+
+@lru_cache(maxsize=8)
+def prefijo_metodo(metodo):
+    """
+    Prefijo que Werkzeug escribe en los hashes de `metodo`, con sus parámetros completos
+
+    `scrypt` se guarda como `scrypt:32768:8:1`, por ejemplo; se obtiene generando
+    un hash una sola vez por método.
+    """
+    return generate_password_hash("", method=metodo).split("$", 1)[0]
+
+
+def requiere_rehash(hash_, metodo):
+    """Indica si un hash guardado se generó con un método o costo distinto de `metodo`"""
+    return not hash_ or hash_.split("$", 1)[0] != prefijo_metodo(metodo)
+
+
+class PoolHash:
+    """
+    Pool de procesos para hashing de contraseñas, creado bajo demanda
+
+    Args:
+        procesos (int): Número de procesos; 0 calcula en el proceso actual
+        procesos_masivos (int): Procesos del pool de importación masiva (por defecto la mitad)
+        max_cola (int): Operaciones individuales en curso o en cola antes de rechazar
+            (entre todos los workers si hay Redis)
+        metricas: Registro de métricas opcional (latencia, profundidad de cola y rechazos)
+        redis_client: Cliente Redis para compartir la admisión entre workers o None
+        plazo_turno (float): Segundos tras los que vence un turno no liberado
+        espacio (str): Prefijo del despliegue para la clave en Redis (ver REDIS_PREFIJO)
+    """
+
+    def __init__(self, procesos=None, max_cola=None, metricas=None, redis_client=None, plazo_turno=60, espacio="",
+                 procesos_masivos=None):
+        self.procesos = (os.cpu_count() or 1) if procesos is None else procesos
+        if procesos_masivos is None:
+            procesos_masivos = max(self.procesos // 2, 1) if self.procesos > 0 else 0
+        self.procesos_masivos = procesos_masivos
+        self.max_cola = max_cola if max_cola is not None else max(self.procesos, 1) * 4
+        self.metricas = metricas
+        self.redis = redis_client
+        self.plazo_turno = plazo_turno
+        self.clave = espacio + CLAVE_EN_CURSO
+        self._script_admitir = redis_client.register_script(_LUA_ADMITIR) if redis_client is not None else None
+        self._executors = {}  # "individual" / "masivo" -> ProcessPoolExecutor
+        self._en_curso = 0
+        self._lock = threading.Lock()
+
+    def _obtener_executor(self, tipo):
+        with self._lock:
+            executor = self._executors.get(tipo)
+            if executor is None:
+                procesos = self.procesos if tipo == "individual" else self.procesos_masivos
+                executor = ProcessPoolExecutor(max_workers=procesos, mp_context=contexto_procesos())
+                self._executors[tipo] = executor
+            return executor
+
+    def _descartar_executor(self, tipo, executor):
+        """Descarta un executor roto (un proceso hijo murió) para que el próximo uso cree otro"""
+        with self._lock:
+            if self._executors.get(tipo) is executor:
+                del self._executors[tipo]
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _en_pool(self, llamada, tipo="individual"):
+        """Ejecuta `llamada(executor)`; si el pool está roto lo recrea y reintenta una vez"""
+        executor = self._obtener_executor(tipo)
+        try:
+            return llamada(executor)
+        except BrokenProcessPool:
+            print("⚠️  Pool de hashing roto; se recrea y se reintenta la operación")
+            self._descartar_executor(tipo, executor)
+            return llamada(self._obtener_executor(tipo))
+
+    def _admitir(self, operacion):
+        """
+        Toma un turno de la cola (compartida si hay Redis)
+
+        Returns:
+            tuple: (profundidad tras admitir, turno en Redis o None si es local)
+
+        Raises:
+            PoolSaturado: Si ya hay `max_cola` operaciones en curso o en cola
+        """
+        if self._script_admitir is not None:
+            turno = uuid.uuid4().hex
+            try:
+                profundidad = self._script_admitir(
+                    keys=[self.clave], args=[self.max_cola, self.plazo_turno, turno]
+                )
+            except Exception:
+                profundidad = None  # Sin Redis se recurre a la cola del proceso
+            if profundidad is not None:
+                if profundidad < 0:
+                    self._rechazar(operacion)
+                return profundidad, turno
+        with self._lock:
+            if self._en_curso >= self.max_cola:
+                self._rechazar(operacion)
+            self._en_curso += 1
+            return self._en_curso, None
+
+    def _rechazar(self, operacion):
+        if self.metricas is not None:
+            self.metricas.incrementar("hash_rechazos_total", (operacion,))
+        raise PoolSaturado()
+
+    def _liberar(self, turno):
+        if turno is None:
+            with self._lock:
+                self._en_curso -= 1
+            return
+        try:
+            self.redis.zrem(self.clave, turno)
+        except Exception:
+            pass  # El turno vence solo tras `plazo_turno`
+
+    def _ejecutar(self, operacion, funcion, *args):
+        """
+        Ejecuta una operación individual en el pool, con control de admisión
+
+        Raises:
+            PoolSaturado: Si ya hay `max_cola` operaciones en curso o en cola
+        """
+        profundidad, turno = self._admitir(operacion)
+        inicio = time.perf_counter()
+        try:
+            if self.procesos <= 0:
+                return funcion(*args)
+            return self._en_pool(lambda executor: executor.submit(funcion, *args).result())
+        finally:
+            self._liberar(turno)
+            if self.metricas is not None:
+                self.metricas.observar("hash_cola_profundidad", (operacion,), profundidad)
+                self.metricas.observar("hash_duracion_segundos", (operacion,), time.perf_counter() - inicio)
+
+    def generar(self, contrasena, metodo):
+        """Genera el hash de una contraseña en el pool"""
+        return self._ejecutar("generar", generar_hash, contrasena, metodo)
+
+    def verificar(self, hash_, contrasena):
+        """Verifica una contraseña en el pool"""
+        return self._ejecutar("verificar", verificar_hash, hash_, contrasena)
+
+    def generar_muchos(self, contrasenas, metodo):
+        """
+        Calcula los hashes de una lista de contraseñas en paralelo, en el pool masivo
+
+        Returns:
+            list: Hashes en el mismo orden que las contraseñas
+        """
+        if not contrasenas:
+            return []
+        if self.procesos_masivos <= 0 or len(contrasenas) == 1:
+            return [generar_hash(c, metodo) for c in contrasenas]
+        tam = max(1, len(contrasenas) // (self.procesos_masivos * 4))
+        return self._en_pool(
+            lambda executor: list(executor.map(generar_hash, contrasenas, [metodo] * len(contrasenas), chunksize=tam)),
+            tipo="masivo",
+        )
+
+    def cerrar(self):
+        """Libera los procesos de los pools"""
+        with self._lock:
+            executors, self._executors = list(self._executors.values()), {}
+        for executor in executors:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,307 @@
+"""
+SkillsForge - Rate Limiting en Dos Niveles
+==========================================
+
+Almacenamiento para Flask-Limiter (esquema `dosniveles://`) que lleva los
+contadores de ventana fija en memoria del proceso y los reconcilia con Redis
+en lotes (un pipeline por intervalo), de modo que la mayoría de las
+peticiones no hace ningún viaje a Redis.
+
+El error queda acotado: cada proceso acumula sin enviar como máximo una
+fracción `margen` de lo que le queda a la ventana, así que el lote se achica
+a medida que se consume el límite y cerca de él cada golpe se confirma en
+Redis. El exceso posible es de unos (procesos × margen × restante), más lo
+que otros procesos registren dentro de un intervalo de sincronización.
+
+Con límites chicos (restante × margen < 1, p. ej. 10 por minuto con margen
+0.1) el lote es de 1 y cada golpe aceptado hace un viaje a Redis; el costo
+queda acotado por el propio límite (como mucho `cantidad` viajes por clave y
+ventana: los golpes rechazados no consultan Redis). `lote_minimo` permite
+acumular más golpes a cambio de un exceso de hasta procesos × (lote_minimo - 1)
+por ventana; el lote nunca supera lo que le resta a la ventana. Sin
+Redis, los límites se aplican por proceso y los golpes pendientes se envían
+al reconectar.
+
+Las ventanas vencidas se descartan en orden de vencimiento (un heap) a medida
+que llegan golpes, sin recorrer todas las claves en cada petición.
+
+Las rutas nativas de asgi.py usan este mismo almacenamiento y las mismas
+claves que Flask-Limiter (`registrar` y `confirmar`), así que una ruta cuenta
+igual la atienda Flask o el servidor ASGI.
+
+    Limiter(app, storage_uri="dosniveles://",
+            storage_options={"redis_client": cliente, "intervalo": 1.0, "margen": 0.1, "lote_minimo": 1})
+"""
+
+import heapq
+import itertools
+import threading
+import time
+
+from limits.storage import Storage
+from redis import RedisError
+
+# Suma los golpes pendientes (fija la expiración al crear la ventana) y devuelve
+# el conteo global y los milisegundos que le quedan; con 0 golpes solo lee
+SCRIPT_SINCRONIZAR = """
+local n = tonumber(ARGV[1])
+local c
+if n > 0 then
+    c = redis.call('INCRBY', KEYS[1], n)
+    if c == n then
+        redis.call('EXPIRE', KEYS[1], ARGV[2])
+    end
+else
+    c = tonumber(redis.call('GET', KEYS[1]) or '0')
+end
+return {c, redis.call('PTTL', KEYS[1])}
+"""
+
+# Claves por pipeline en cada sincronización de fondo
+TAM_LOTE_SINCRONIZACION = 500
+
+
+def limite_de_clave(clave):
+    """
+    Extrae la cantidad permitida de una clave de `limits`
+
+    Las claves terminan en `/<cantidad>/<múltiplo>/<granularidad>`, por ejemplo
+    `LIMITER/estudiante:abc/registrar/10/1/minute`.
+
+    Returns:
+        int: Cantidad permitida o None si la clave no tiene ese formato
+    """
+    partes = clave.rsplit("/", 3)
+    try:
+        return int(partes[-3])
+    except (IndexError, ValueError):
+        return None
+
+
+class _Ventana:
+    """Contador local de una clave en su ventana actual"""
+
+    __slots__ = ("expira", "segundos", "limite", "global_", "en_vuelo", "pendiente")
+
+    def __init__(self, expira, segundos, limite):
+        self.expira = expira
+        self.segundos = segundos
+        self.limite = limite
+        self.global_ = 0  # Último conteo confirmado por Redis (incluye a todos los procesos)
+        self.en_vuelo = 0  # Golpes enviados cuya respuesta aún no llega
+        self.pendiente = 0  # Golpes locales aún no enviados
+
+    def estimado(self):
+        return self.global_ + self.en_vuelo + self.pendiente
+
+    def agotada(self):
+        """Redis ya confirmó el límite: los golpes siguientes se rechazan sin consultarlo"""
+        return self.limite is not None and self.global_ >= self.limite
+
+    def lote(self, margen, minimo=1):
+        """
+        Golpes que pueden quedar sin enviar: una fracción de lo que resta de la ventana
+
+        Nunca menos de `minimo` ni más de lo que resta (con un límite de 10 y
+        margen 0.1 la fracción es 0 y, con `minimo` 1, cada golpe se confirma).
+        """
+        if self.limite is None:
+            # Sin límite conocido no hay margen: cada golpe se sincroniza
+            return 1
+        restante = self.limite - self.global_ - self.en_vuelo
+        return max(1, min(max(minimo, int(restante * margen)), restante))
+
+
+class AlmacenDosNiveles(Storage):
+    """
+    Almacenamiento de `limits` con contadores locales y reconciliación por lotes en Redis
+
+    Solo implementa lo que necesita la estrategia de ventana fija (la
+    predeterminada de Flask-Limiter).
+
+    Args:
+        redis_client: Cliente Redis o None para límites solo locales
+        intervalo (float): Segundos entre sincronizaciones de fondo
+        margen (float): Fracción de lo que resta de la ventana que un proceso puede acumular sin sincronizar
+        lote_minimo (int): Golpes que un proceso puede acumular aunque la fracción sea menor (1: exacto)
+        prefijo (str): Prefijo de las claves en Redis
+        metricas: Registro de métricas opcional
+    """
+
+    STORAGE_SCHEME = ["dosniveles"]
+
+    def __init__(self, uri=None, wrap_exceptions=False, redis_client=None, intervalo=1.0, margen=0.1,
+                 prefijo="limites:", metricas=None, lote_minimo=1, **opciones):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **opciones)
+        self.redis = redis_client
+        self.intervalo = float(intervalo)
+        self.margen = float(margen)
+        self.lote_minimo = max(1, int(lote_minimo))
+        self.prefijo = prefijo
+        self.metricas = metricas
+        self._ventanas = {}
+        self._vencimientos = []  # Heap de (expira, secuencia, clave, ventana)
+        self._secuencia = itertools.count()
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._script = redis_client.register_script(SCRIPT_SINCRONIZAR) if redis_client is not None else None
+
+    @property
+    def base_exceptions(self):
+        return RedisError
+
+    def _contar(self, modo):
+        if self.metricas is not None:
+            self.metricas.incrementar("limites_sincronizaciones_total", (modo,))
+
+    def _purgar(self, ahora):
+        """Descarta las ventanas vencidas, en orden de vencimiento (con el lock tomado)"""
+        while self._vencimientos and self._vencimientos[0][0] <= ahora:
+            _, _, clave, ventana = heapq.heappop(self._vencimientos)
+            if self._ventanas.get(clave) is not ventana:
+                continue  # Ya reemplazada por una ventana nueva, que tiene su propia entrada
+            if ventana.expira <= ahora:
+                del self._ventanas[clave]
+            else:
+                # Redis extendió la ventana: vuelve al heap con su nuevo vencimiento
+                heapq.heappush(self._vencimientos, (ventana.expira, next(self._secuencia), clave, ventana))
+
+    def registrar(self, key, expiry, amount=1):
+        """
+        Registra `amount` golpes solo en memoria
+
+        Returns:
+            tuple: (conteo estimado de la ventana, si hay que `confirmar` la clave en Redis ya)
+        """
+        ahora = time.time()
+        with self._lock:
+            self._purgar(ahora)
+            ventana = self._ventanas.get(key)
+            if ventana is None or ventana.expira <= ahora:
+                ventana = self._ventanas[key] = _Ventana(ahora + expiry, expiry, limite_de_clave(key))
+                heapq.heappush(self._vencimientos, (ventana.expira, next(self._secuencia), key, ventana))
+            ventana.pendiente += amount
+            inmediata = (
+                self.redis is not None
+                and not ventana.agotada()
+                and ventana.pendiente >= ventana.lote(self.margen, self.lote_minimo)
+            )
+            if self.redis is not None and self._hilo is None:
+                self._hilo = threading.Thread(target=self._sincronizar_periodicamente, name="limites", daemon=True)
+                self._hilo.start()
+            return ventana.estimado(), inmediata
+
+    def confirmar(self, key):
+        """
+        Confirma en Redis los golpes pendientes de `key` (margen agotado)
+
+        Returns:
+            int: Conteo estimado de la ventana tras confirmar
+        """
+        self._contar("inmediata")
+        self._sincronizar([key])
+        return self.get(key)
+
+    def incr(self, key, expiry, elastic_expiry=False, amount=1):
+        """Registra `amount` golpes y devuelve el conteo estimado de la ventana"""
+        estimado, inmediata = self.registrar(key, expiry, amount)
+        if inmediata:
+            # Margen agotado (cerca del límite, en cada golpe): el conteo se confirma en Redis
+            return self.confirmar(key)
+        return estimado
+
+    def get(self, key):
+        with self._lock:
+            ventana = self._ventanas.get(key)
+            if ventana is None or ventana.expira <= time.time():
+                return 0
+            return ventana.estimado()
+
+    def get_expiry(self, key):
+        with self._lock:
+            ventana = self._ventanas.get(key)
+            return ventana.expira if ventana is not None else time.time()
+
+    def check(self):
+        if self.redis is None:
+            return True
+        try:
+            return bool(self.redis.ping())
+        except RedisError:
+            return False
+
+    def reset(self):
+        with self._lock:
+            self._ventanas.clear()
+            self._vencimientos.clear()
+        if self.redis is None:
+            return None
+        eliminadas = 0
+        try:
+            for clave in self.redis.scan_iter(f"{self.prefijo}*"):
+                eliminadas += self.redis.delete(clave)
+        except RedisError as e:
+            print(f"⚠️  No se pudieron limpiar los límites en Redis: {e}")
+        return eliminadas
+
+    def clear(self, key):
+        with self._lock:
+            self._ventanas.pop(key, None)
+        if self.redis is not None:
+            try:
+                self.redis.delete(self.prefijo + key)
+            except RedisError as e:
+                print(f"⚠️  No se pudo limpiar el límite en Redis: {e}")
+
+    def _sincronizar(self, claves):
+        """
+        Envía los golpes pendientes de `claves` en un pipeline y actualiza los conteos globales
+
+        Si Redis falla, los golpes vuelven a quedar pendientes para el próximo intento.
+        """
+        ahora = time.time()
+        lote = []
+        with self._lock:
+            for clave in claves:
+                ventana = self._ventanas.get(clave)
+                if ventana is None or ventana.expira <= ahora:
+                    continue
+                enviados = ventana.pendiente
+                ventana.pendiente = 0
+                ventana.en_vuelo += enviados
+                lote.append((clave, ventana, enviados))
+        if not lote:
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for clave, ventana, enviados in lote:
+                self._script(keys=[self.prefijo + clave], args=[enviados, int(ventana.segundos)], client=pipe)
+            resultados = pipe.execute()
+        except RedisError:
+            with self._lock:
+                for _, ventana, enviados in lote:
+                    ventana.en_vuelo -= enviados
+                    ventana.pendiente += enviados
+            if self.metricas is not None:
+                self.metricas.incrementar("redis_errores_total", ("limites",))
+            return
+        ahora = time.time()
+        with self._lock:
+            for (_, ventana, enviados), (conteo, pttl) in zip(lote, resultados):
+                ventana.en_vuelo -= enviados
+                ventana.global_ = int(conteo)
+                if pttl > 0:
+                    # La ventana de Redis manda: todos los procesos la reinician a la vez
+                    ventana.expira = ahora + pttl / 1000
+
+    def _sincronizar_periodicamente(self):
+        """Hilo de fondo: envía lo pendiente y refresca los conteos de las claves activas"""
+        while True:
+            time.sleep(self.intervalo)
+            with self._lock:
+                self._purgar(time.time())
+                claves = list(self._ventanas)
+            for i in range(0, len(claves), TAM_LOTE_SINCRONIZACION):
+                self._sincronizar(claves[i:i + TAM_LOTE_SINCRONIZACION])
+            if claves:
+                self._contar("lote")
@@ -0,0 +1,229 @@
+"""
+SkillsForge - Métricas
+======================
+
+Instrumentación de la API en formato de texto de Prometheus (expuesto en
+GET /metrics): latencia por ruta y estado HTTP, duración de comandos de
+MongoDB por colección y operación, y contadores de cache y Redis.
+
+Cada hilo escribe en su propio fragmento de contadores, de modo que registrar
+una muestra no toma ningún lock; los fragmentos solo se suman al exportar.
+Los valores son por proceso: con varios workers de gunicorn, cada uno expone
+los suyos.
+"""
+
+import threading
+from bisect import bisect_left
+
+from pymongo import monitoring
+
+# Límites (en segundos) de los buckets de latencia
+BUCKETS_LATENCIA = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metricas:
+    """
+    Registro de contadores e histogramas con fragmentos por hilo
+
+    Las métricas se declaran una vez con `definir` y luego se actualizan con
+    `incrementar` u `observar` pasando los valores de sus etiquetas en orden.
+    """
+
+    def __init__(self):
+        self._definiciones = {}
+        self._fragmentos = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def definir(self, nombre, tipo, ayuda, etiquetas=(), buckets=BUCKETS_LATENCIA):
+        """
+        Declara una métrica
+
+        Args:
+            nombre (str): Nombre Prometheus de la métrica
+            tipo (str): "counter" o "histogram"
+            ayuda (str): Descripción mostrada en la línea HELP
+            etiquetas (tuple): Nombres de las etiquetas
+            buckets (tuple): Límites superiores de los buckets (solo histogramas)
+        """
+        self._definiciones[nombre] = (tipo, ayuda, tuple(etiquetas), tuple(buckets))
+
+    def _fragmento(self):
+        """Devuelve el diccionario de muestras del hilo actual (se crea y registra la primera vez)"""
+        fragmento = getattr(self._local, "fragmento", None)
+        if fragmento is None:
+            fragmento = {}
+            self._local.fragmento = fragmento
+            with self._lock:
+                self._fragmentos.append(fragmento)
+        return fragmento
+
+    def incrementar(self, nombre, etiquetas=(), valor=1):
+        """Suma `valor` a un contador"""
+        fragmento = self._fragmento()
+        clave = (nombre, etiquetas)
+        fragmento[clave] = fragmento.get(clave, 0) + valor
+
+    def observar(self, nombre, etiquetas=(), valor=0.0):
+        """Registra una muestra en un histograma"""
+        fragmento = self._fragmento()
+        clave = (nombre, etiquetas)
+        buckets = self._definiciones[nombre][3]
+        muestra = fragmento.get(clave)
+        if muestra is None:
+            # [conteo por bucket (+Inf al final), suma, total]
+            muestra = fragmento[clave] = [[0] * (len(buckets) + 1), 0.0, 0]
+        muestra[0][bisect_left(buckets, valor)] += 1
+        muestra[1] += valor
+        muestra[2] += 1
+
+    def _agregar(self):
+        """Suma los fragmentos de todos los hilos"""
+        with self._lock:
+            fragmentos = list(self._fragmentos)
+        totales = {}
+        for fragmento in fragmentos:
+            for clave, valor in list(fragmento.items()):
+                if isinstance(valor, list):
+                    actual = totales.get(clave)
+                    if actual is None:
+                        totales[clave] = [list(valor[0]), valor[1], valor[2]]
+                    else:
+                        actual[0] = [a + b for a, b in zip(actual[0], valor[0])]
+                        actual[1] += valor[1]
+                        actual[2] += valor[2]
+                else:
+                    totales[clave] = totales.get(clave, 0) + valor
+        return totales
+
+    def exportar(self):
+        """
+        Genera la exposición en formato de texto de Prometheus
+
+        Returns:
+            str: Cuerpo para servir con Content-Type text/plain; version=0.0.4
+        """
+        totales = self._agregar()
+        lineas = []
+        for nombre, (tipo, ayuda, etiquetas, buckets) in self._definiciones.items():
+            lineas.append(f"# HELP {nombre} {ayuda}")
+            lineas.append(f"# TYPE {nombre} {tipo}")
+            series = sorted((k[1], v) for k, v in totales.items() if k[0] == nombre)
+            for valores, muestra in series:
+                base = list(zip(etiquetas, valores))
+                if tipo == "histogram":
+                    acumulado = 0
+                    for limite, conteo in zip(list(buckets) + ["+Inf"], muestra[0]):
+                        acumulado += conteo
+                        lineas.append(f"{nombre}_bucket{_etiquetas(base + [('le', limite)])} {acumulado}")
+                    lineas.append(f"{nombre}_sum{_etiquetas(base)} {muestra[1]:.6f}")
+                    lineas.append(f"{nombre}_count{_etiquetas(base)} {muestra[2]}")
+                else:
+                    lineas.append(f"{nombre}{_etiquetas(base)} {muestra}")
+        return "\n".join(lineas) + "\n"
+
+
+def _etiquetas(pares):
+    """Formatea las etiquetas como {a="x",b="y"} escapando comillas y barras"""
+    if not pares:
+        return ""
+    partes = []
+    for nombre, valor in pares:
+        texto = str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        partes.append(f'{nombre}="{texto}"')
+    return "{" + ",".join(partes) + "}"
+
+
+class ObservadorMongo(monitoring.CommandListener):
+    """
+    Listener de comandos de pymongo que mide la duración por colección y operación
+
+    Se registra con `MongoClient(..., event_listeners=[ObservadorMongo(metricas)])`.
+    """
+
+    def __init__(self, metricas):
+        self.metricas = metricas
+        self._en_curso = {}
+
+    @staticmethod
+    def _clave(evento):
+        return (evento.connection_id, evento.request_id)
+
+    def started(self, evento):
+        comando = evento.command
+        coleccion = comando.get(evento.command_name)
+        if not isinstance(coleccion, str):
+            # getMore lleva el id del cursor en lugar del nombre de la colección
+            coleccion = comando.get("collection", "")
+        self._en_curso[self._clave(evento)] = coleccion
+
+    def _terminar(self, evento, resultado):
+        coleccion = self._en_curso.pop(self._clave(evento), "")
+        etiquetas = (coleccion, evento.command_name)
+        self.metricas.observar("mongo_comando_duracion_segundos", etiquetas, evento.duration_micros / 1e6)
+        if resultado != "ok":
+            self.metricas.incrementar("mongo_comandos_fallidos_total", etiquetas)
+
+    def succeeded(self, evento):
+        self._terminar(evento, "ok")
+
+    def failed(self, evento):
+        self._terminar(evento, "error")
+
+
+def crear_metricas():
+    """Crea el registro con las métricas estándar de la API"""
+    metricas = Metricas()
+    metricas.definir(
+        "http_peticion_duracion_segundos", "histogram",
+        "Latencia de las peticiones HTTP por ruta, método y estado",
+        ("ruta", "metodo", "estado"),
+    )
+    metricas.definir(
+        "mongo_comando_duracion_segundos", "histogram",
+        "Duración de los comandos de MongoDB por colección y operación",
+        ("coleccion", "operacion"),
+    )
+    metricas.definir(
+        "mongo_comandos_fallidos_total", "counter",
+        "Comandos de MongoDB que terminaron con error",
+        ("coleccion", "operacion"),
+    )
+    metricas.definir(
+        "cache_consultas_total", "counter",
+        "Consultas a las caches por cache y resultado (redis, local o fallo)",
+        ("cache", "resultado"),
+    )
+    metricas.definir(
+        "redis_errores_total", "counter",
+        "Operaciones de Redis fallidas que cayeron al respaldo en memoria",
+        ("cache",),
+    )
+    metricas.definir(
+        "hash_duracion_segundos", "histogram",
+        "Latencia de las operaciones de hashing de contraseñas, incluida la espera en cola",
+        ("operacion",),
+        buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+    )
+    metricas.definir(
+        "hash_cola_profundidad", "histogram",
+        "Operaciones de hashing en curso o en cola al admitir una nueva",
+        ("operacion",),
+        buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+    )
+    metricas.definir(
+        "hash_rechazos_total", "counter",
+        "Operaciones de hashing rechazadas por cola llena (503)",
+        ("operacion",),
+    )
+    metricas.definir(
+        "limites_sincronizaciones_total", "counter",
+        "Sincronizaciones de los contadores de rate limiting con Redis (lote o inmediata)",
+        ("modo",),
+    )
+    metricas.definir(
+        "revocacion_consultas_total", "counter",
+        "Verificaciones exactas de tokens revocados (coincidencias del filtro de Bloom) y errores de Redis",
+        ("resultado",),
+    )
+    return metricas
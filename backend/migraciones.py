@@ -0,0 +1,403 @@
+"""
+SkillsForge - Migraciones de Datos
+==================================
+
+Migraciones puntuales sobre la base de datos de talleres. Se ejecutan una sola
+vez desde la línea de comandos, fuera del ciclo de vida de la API:
+
+    python migraciones.py <nombre> [<nombre> ...]
+    python migraciones.py --listar
+
+`python migraciones.py init` prepara la base (índices, datos de ejemplo y
+estadísticas) una vez por despliegue, en lugar de hacerlo cada worker al
+arrancar.
+"""
+
+import sys
+from datetime import datetime
+
+from pymongo import MongoClient, ASCENDING, TEXT, UpdateOne, errors
+
+from busqueda import PESOS_TALLER, CAMPOS_TERMINOS_TALLER, terminos_taller, terminos_estudiante
+from config import Config
+
+
+# Nivel de esquema que deja `inicializar`: se incrementa cuando agrega un paso sin el cual
+# el código nuevo no funciona (índices únicos, campos desnormalizados, colecciones migradas)
+VERSION_PREPARACION = 1
+
+
+def preparacion_vigente(db):
+    """Indica si `inicializar` ya dejó la base en el nivel de esquema que espera este código"""
+    marca = db["migraciones"].find_one({"_id": "inicializar"}, {"version": 1})
+    return marca is not None and marca.get("version", 0) >= VERSION_PREPARACION
+
+
+def crear_indices(db):
+    """
+    Crea los índices que usa la API (idempotente: los existentes no se reconstruyen)
+
+    Args:
+        db: Base de datos MongoDB
+
+    Returns:
+        list: Advertencias de índices que no pudieron crearse
+    """
+    advertencias = []
+    col_talleres = db["talleres"]
+    col_talleres.create_index([("fecha", ASCENDING), ("hora", ASCENDING)])
+    col_talleres.create_index("categoria")
+    col_talleres.create_index([("cupos_disponibles", ASCENDING), ("fecha", ASCENDING)])
+    col_talleres.create_index("terminos")
+    try:
+        col_talleres.create_index(
+            [(campo, TEXT) for campo in PESOS_TALLER],
+            weights=PESOS_TALLER,
+            default_language="spanish",
+            language_override="idioma",
+            name="busqueda_texto",
+        )
+    except errors.OperationFailure as e:
+        advertencias.append(f"No se pudo crear el índice de texto: {e}")
+    unicos = [
+        (db["estudiantes"], "email"),
+        (db["inscripciones"], [("taller_id", ASCENDING), ("estudiante_id", ASCENDING)]),
+        (db["lista_espera"], [("taller_id", ASCENDING), ("estudiante_id", ASCENDING)]),
+    ]
+    for coleccion, claves in unicos:
+        try:
+            coleccion.create_index(claves, unique=True)
+        except errors.OperationFailure as e:
+            # Suele indicar duplicados previos: la API funciona, pero conviene depurarlos
+            advertencias.append(f"No se pudo crear el índice único de {coleccion.name}: {e}")
+    db["estudiantes"].create_index("terminos")
+    db["inscripciones"].create_index([("estudiante_id", ASCENDING), ("fecha", ASCENDING), ("hora", ASCENDING)])
+    db["lista_espera"].create_index([("taller_id", ASCENDING), ("orden", ASCENDING)])
+    db["lista_espera"].create_index("estudiante_id")
+    return advertencias
+
+
+def sembrar_ejemplos(db):
+    """
+    Inserta talleres de ejemplo si el catálogo está vacío (entornos de desarrollo)
+
+    Args:
+        db: Base de datos MongoDB
+
+    Returns:
+        int: Número de talleres insertados
+    """
+    col_talleres = db["talleres"]
+    if col_talleres.find_one({}, {"_id": 1}):
+        return 0
+    ahora = datetime.utcnow()
+    base = {
+        "fecha": ahora.date().isoformat(),
+        "hora": ahora.strftime("%H:%M"),
+        "inscritos": 0,
+        "creado_en": ahora.isoformat(),
+        "actualizado_en": None,
+    }
+    ejemplos = [
+        {
+            "nombre": "Introducción a Python",
+            "descripcion": "Fundamentos de Python.",
+            "lugar": "Aula 101",
+            "categoria": "tecnologia",
+            "tipo": "curso técnico",
+            "instructor": "Ana Pérez",
+            "rating": 4.8,
+            "cupo": 30,
+            "cupos_disponibles": 30,
+            **base,
+        },
+        {
+            "nombre": "Habilidades Blandas",
+            "descripcion": "Comunicación y equipo.",
+            "lugar": "Sala Taller 2",
+            "categoria": "habilidades-blandas",
+            "tipo": "capacitacion",
+            "instructor": "Luis Gómez",
+            "rating": 4.6,
+            "cupo": 25,
+            "cupos_disponibles": 25,
+            **base,
+        },
+    ]
+    for ejemplo in ejemplos:
+        ejemplo["terminos"] = terminos_taller(ejemplo)
+    col_talleres.insert_many(ejemplos)
+    return len(ejemplos)
+
+
+def inicializar(db, ejemplos=True):
+    """
+    Prepara la base para la API: índices, datos de ejemplo, migraciones de datos
+    pendientes y estadísticas materializadas
+
+    Es idempotente, así que puede ejecutarse en cada despliegue.
+
+    Args:
+        db: Base de datos MongoDB
+        ejemplos (bool): Si se siembran talleres de ejemplo en un catálogo vacío
+
+    Returns:
+        dict: Resumen de lo realizado
+    """
+    resumen = {"advertencias": crear_indices(db)}
+    resumen["ejemplos"] = sembrar_ejemplos(db) if ejemplos else 0
+    # Migraciones de datos: idempotentes y sin escrituras sobre una base al día. Corren con
+    # tráfico en vivo, por eso los contadores solo se completan donde faltan
+    if db["talleres"].find_one({"inscripciones": {"$exists": True}}, {"_id": 1}):
+        resumen["inscripciones"] = migrar_inscripciones(db)
+    resumen["inscritos"] = backfill_inscritos(db, solo_faltantes=True)
+    resumen["terminos"] = backfill_terminos(db)
+    # Los contadores materializados se inicializan una vez; luego se mantienen de forma incremental.
+    # Se mira la marca de reconciliación y no la existencia del documento: un `$inc` previo
+    # a la preparación (worker con preparación delegada o INICIO_PREPARAR=0) crea uno parcial
+    if resumen["ejemplos"] or not estadisticas_reconciliadas(db):
+        resumen["estadisticas"] = reconciliar_estadisticas(db)
+    # Marca de finalización: los workers que delegaron la preparación esperan a verla
+    db["migraciones"].update_one(
+        {"_id": "inicializar"},
+        {"$max": {"version": VERSION_PREPARACION}, "$set": {"completado_en": datetime.utcnow().isoformat()}},
+        upsert=True,
+    )
+    return resumen
+
+
+def migrar_inscripciones(db, lote=1000):
+    """
+    Copia los arreglos embebidos `talleres.inscripciones` a la colección
+    `inscripciones` y elimina el arreglo de los talleres
+
+    La copia es idempotente (upsert por taller y estudiante), por lo que puede
+    repetirse si se interrumpe. Puede correr mientras workers anteriores siguen
+    agregando al arreglo embebido: de cada taller se quitan solo las entradas
+    copiadas (`$pullAll`) y el arreglo se elimina únicamente si quedó vacío;
+    lo agregado después se copia en la siguiente ejecución.
+
+    Args:
+        db: Base de datos MongoDB
+        lote (int): Operaciones por escritura masiva
+
+    Returns:
+        int: Número de inscripciones copiadas
+    """
+    col_talleres = db["talleres"]
+    col_inscripciones = db["inscripciones"]
+    col_inscripciones.create_index([("taller_id", ASCENDING), ("estudiante_id", ASCENDING)], unique=True)
+    col_inscripciones.create_index([("estudiante_id", ASCENDING), ("fecha", ASCENDING), ("hora", ASCENDING)])
+
+    copiadas = 0
+    operaciones = []
+    retiros = []
+
+    def escribir():
+        # Las copias se confirman antes de quitar sus entradas del arreglo embebido
+        nonlocal copiadas, operaciones, retiros
+        if operaciones:
+            copiadas += col_inscripciones.bulk_write(operaciones, ordered=False).upserted_count
+        if retiros:
+            col_talleres.bulk_write(retiros, ordered=False)
+        operaciones, retiros = [], []
+
+    cursor = col_talleres.find(
+        {"inscripciones.0": {"$exists": True}},
+        {"inscripciones": 1, "fecha": 1, "hora": 1},
+    )
+    for taller in cursor:
+        leidas = taller.get("inscripciones", [])
+        for ins in leidas:
+            if not ins.get("estudiante_id"):
+                continue
+            operaciones.append(UpdateOne(
+                {"taller_id": taller["_id"], "estudiante_id": ins["estudiante_id"]},
+                {"$setOnInsert": {
+                    "nombre": ins.get("nombre"),
+                    "email": ins.get("email"),
+                    "registrado_en": ins.get("registrado_en"),
+                    "fecha": taller.get("fecha"),
+                    "hora": taller.get("hora"),
+                }},
+                upsert=True,
+            ))
+        # Las entradas sin estudiante se descartan igual que antes; las demás ya tienen su copia
+        retiros.append(UpdateOne({"_id": taller["_id"]}, {"$pullAll": {"inscripciones": leidas}}))
+        if len(operaciones) >= lote or len(retiros) >= lote:
+            escribir()
+    escribir()
+
+    # Condición evaluada por documento: un `$push` concurrente deja el arreglo no vacío y se conserva
+    col_talleres.update_many({"inscripciones": {"$size": 0}}, {"$unset": {"inscripciones": ""}})
+    backfill_inscritos(db)
+    return copiadas
+
+
+def backfill_inscritos(db, solo_faltantes=False):
+    """
+    Recalcula los campos desnormalizados `inscritos` y `cupos_disponibles`
+    a partir de la colección `inscripciones`, y `en_espera` a partir de `lista_espera`
+
+    Cada escritura está condicionada a los valores leídos: si una inscripción
+    concurrente ya los cambió, el taller se omite en lugar de pisar el contador.
+    Los conteos se toman antes y después de leer los talleres y solo se corrige
+    un taller cuyos dos conteos coinciden: una inscripción a medias (contador ya
+    incrementado, documento aún sin insertar) no se toma como deriva.
+
+    Args:
+        db: Base de datos MongoDB
+        solo_faltantes (bool): Solo completa talleres a los que les falta algún campo
+
+    Returns:
+        int: Número de talleres actualizados
+    """
+    col_talleres = db["talleres"]
+    campos = ("inscritos", "cupos_disponibles", "en_espera")
+    filtro = {"$or": [{c: {"$exists": False}} for c in campos]} if solo_faltantes else {}
+
+    def contar(coleccion):
+        return {
+            x["_id"]: x["n"]
+            for x in db[coleccion].aggregate([{"$group": {"_id": "$taller_id", "n": {"$sum": 1}}}])
+        }
+
+    conteos_antes, en_espera_antes = contar("inscripciones"), contar("lista_espera")
+    # Los talleres se leen antes del segundo conteo: un cambio posterior altera sus contadores y la condición falla
+    talleres = list(col_talleres.find(filtro, {"cupo": 1, **{c: 1 for c in campos}}))
+    if not talleres:
+        return 0
+    conteos, en_espera = contar("inscripciones"), contar("lista_espera")
+    actualizados = 0
+    for taller in talleres:
+        inscritos = conteos.get(taller["_id"], 0)
+        cupos = max(int(taller.get("cupo") or 0) - inscritos, 0)
+        espera = en_espera.get(taller["_id"], 0)
+        if taller.get("en_espera") != espera and en_espera_antes.get(taller["_id"], 0) == espera:
+            col_talleres.update_one(
+                {"_id": taller["_id"], "en_espera": taller.get("en_espera")}, {"$set": {"en_espera": espera}}
+            )
+        if taller.get("inscritos") == inscritos and taller.get("cupos_disponibles") == cupos:
+            continue
+        if conteos_antes.get(taller["_id"], 0) != inscritos:
+            continue
+        resultado = col_talleres.update_one(
+            {"_id": taller["_id"], "inscritos": taller.get("inscritos"), "cupos_disponibles": taller.get("cupos_disponibles")},
+            # Cambia la representación del taller: se avanza su versión (ETag)
+            {"$set": {"inscritos": inscritos, "cupos_disponibles": cupos}, "$inc": {"version": 1}},
+        )
+        actualizados += resultado.modified_count
+    return actualizados
+
+
+def backfill_terminos(db, lote=1000):
+    """
+    Calcula el campo de búsqueda normalizado `terminos` de talleres y estudiantes
+
+    Args:
+        db: Base de datos MongoDB
+        lote (int): Operaciones por escritura masiva
+
+    Returns:
+        int: Número de documentos actualizados
+    """
+    actualizados = 0
+    fuentes = [
+        (db["talleres"], {c: 1 for c in CAMPOS_TERMINOS_TALLER}, terminos_taller),
+        (db["estudiantes"], {"nombre": 1, "email": 1}, terminos_estudiante),
+    ]
+    for coleccion, proyeccion, calcular in fuentes:
+        operaciones = []
+        for doc in coleccion.find({}, {**proyeccion, "terminos": 1}):
+            terminos = calcular(doc)
+            if doc.get("terminos") == terminos:
+                continue
+            # Condicionada a los campos leídos: una edición concurrente ya escribió sus propios términos
+            condicion = {"_id": doc["_id"], **{c: doc.get(c) for c in proyeccion}}
+            operaciones.append(UpdateOne(condicion, {"$set": {"terminos": terminos}}))
+            if len(operaciones) >= lote:
+                actualizados += coleccion.bulk_write(operaciones, ordered=False).modified_count
+                operaciones = []
+        if operaciones:
+            actualizados += coleccion.bulk_write(operaciones, ordered=False).modified_count
+    return actualizados
+
+
+def estadisticas_reconciliadas(db, coleccion=None):
+    """
+    Indica si los contadores materializados ya se calcularon desde cero alguna vez
+
+    Args:
+        db: Base de datos MongoDB
+        coleccion: Colección de estadísticas a consultar (por defecto `db.estadisticas`)
+    """
+    coleccion = coleccion if coleccion is not None else db["estadisticas"]
+    return coleccion.find_one({"_id": "global", "reconciliado_en": {"$exists": True}}, {"_id": 1}) is not None
+
+
+def reconciliar_estadisticas(db):
+    """
+    Recalcula desde cero los contadores materializados de /stats y /categories
+
+    Corrige cualquier deriva de las actualizaciones incrementales; la API lo
+    ejecuta periódicamente y también puede lanzarse a mano.
+
+    Args:
+        db: Base de datos MongoDB
+
+    Returns:
+        dict: Totales recalculados
+    """
+    totales = {
+        "talleres": db["talleres"].count_documents({}),
+        "estudiantes": db["estudiantes"].count_documents({}),
+        "registros": db["inscripciones"].count_documents({}),
+    }
+    db["estadisticas"].update_one(
+        {"_id": "global"}, {"$set": {**totales, "reconciliado_en": datetime.utcnow().isoformat()}}, upsert=True,
+    )
+
+    conteos = {
+        x["_id"]: x["n"]
+        for x in db["talleres"].aggregate([{"$group": {"_id": "$categoria", "n": {"$sum": 1}}}])
+        if x["_id"]
+    }
+    operaciones = [UpdateOne({"_id": cat}, {"$set": {"n": n}}, upsert=True) for cat, n in conteos.items()]
+    if operaciones:
+        db["categorias"].bulk_write(operaciones, ordered=False)
+    db["categorias"].delete_many({"_id": {"$nin": list(conteos)}})
+    return totales
+
+
+MIGRACIONES = {
+    "init": inicializar,
+    "inscripciones": migrar_inscripciones,
+    "inscritos": backfill_inscritos,
+    "terminos": backfill_terminos,
+    "estadisticas": reconciliar_estadisticas,
+}
+
+
+def main(argv):
+    """Punto de entrada de la línea de comandos"""
+    if not argv or argv[0] in ("-h", "--help", "--listar"):
+        print("Migraciones disponibles:")
+        for nombre, funcion in MIGRACIONES.items():
+            print(f"  {nombre:<20} {funcion.__doc__.strip().splitlines()[0]}")
+        return 0
+
+    desconocidas = [n for n in argv if n not in MIGRACIONES]
+    if desconocidas:
+        print(f"❌ Migraciones desconocidas: {', '.join(desconocidas)}")
+        return 1
+
+    cliente = MongoClient(Config.MONGO_URI, serverSelectionTimeoutMS=5000)
+    db = cliente[Config.MONGO_DB_NAME]
+    for nombre in argv:
+        resultado = MIGRACIONES[nombre](db)
+        print(f"✅ Migración '{nombre}' completada: {resultado}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
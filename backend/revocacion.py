@@ -0,0 +1,244 @@
+"""
+SkillsForge - Revocación de Tokens
+==================================
+
+Lista de tokens JWT revocados (logout y revocación administrativa),
+identificados por su claim `jti`.
+
+La lista se comparte entre workers en un sorted set de Redis (miembro: jti,
+puntaje: momento de la revocación según el reloj del servidor Redis). Cada worker mantiene un filtro de Bloom
+local que se sincroniza de forma incremental cada pocos segundos, de modo que
+verificar un token no revocado cuesta unos cuantos hashes en memoria. Solo
+cuando el filtro indica una posible coincidencia se consulta Redis de forma
+exacta. Hasta que termina la primera reconstrucción del filtro (en un hilo
+que `iniciar` lanza al crear la app) cada verificación consulta Redis.
+
+Sin Redis la revocación solo tiene efecto en el proceso que la registró.
+"""
+
+import hashlib
+import math
+import threading
+import time
+
+CLAVE_REVOCADOS = "auth:revocados"
+
+# Segundos que cada sincronización incremental vuelve a leer antes del último puntaje visto
+MARGEN_SINCRONIZACION = 5
+
+# El puntaje se toma con TIME dentro del mismo script que hace ZADD: al ser atómico,
+# ninguna revocación puede quedar registrada con un puntaje anterior a otra ya visible
+_LUA_REVOCAR = """
+local t = redis.call('TIME')
+redis.call('ZADD', KEYS[1], t[1] .. '.' .. string.format('%06d', tonumber(t[2])), ARGV[1])
+return 1
+"""
+
+
+class FiltroBloom:
+    """
+    Filtro de Bloom sobre un bytearray (sin falsos negativos)
+
+    Args:
+        capacidad (int): Elementos esperados
+        tasa_error (float): Tasa de falsos positivos buscada con esa capacidad
+    """
+
+    def __init__(self, capacidad=100000, tasa_error=0.001):
+        capacidad = max(int(capacidad), 1)
+        self.bits = max(8, int(-capacidad * math.log(tasa_error) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.bits / capacidad * math.log(2)))
+        self._datos = bytearray((self.bits + 7) // 8)
+        self.elementos = 0
+
+    def _posiciones(self, elemento):
+        # Doble hashing: k posiciones a partir de dos valores de 64 bits
+        digest = hashlib.blake2b(elemento.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def agregar(self, elemento):
+        for pos in self._posiciones(elemento):
+            self._datos[pos >> 3] |= 1 << (pos & 7)
+        self.elementos += 1
+
+    def contiene(self, elemento):
+        # Recorrido con salida temprana: un token no revocado suele descartarse en el primer bit
+        digest = hashlib.blake2b(elemento.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        datos, bits = self._datos, self.bits
+        for i in range(self.hashes):
+            pos = (h1 + i * h2) % bits
+            if not datos[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+
+class RevocacionTokens:
+    """
+    Registro de tokens revocados con filtro de Bloom local y consulta exacta en Redis
+
+    Args:
+        redis_client: Cliente Redis o None para revocación solo en el proceso
+        intervalo (float): Segundos entre sincronizaciones incrementales del filtro
+        capacidad (int): Revocaciones esperadas dentro de `vida_maxima`
+        tasa_error (float): Tasa de falsos positivos del filtro (consultas exactas extra)
+        vida_maxima (int): Segundos de vida del token más largo; después se purga la revocación
+        reconstruir (int): Segundos entre reconstrucciones completas del filtro
+        metricas: Registro de métricas opcional
+        espacio (str): Prefijo del despliegue para la clave en Redis (ver REDIS_PREFIJO)
+    """
+
+    def __init__(self, redis_client=None, intervalo=1.0, capacidad=100000, tasa_error=0.001,
+                 vida_maxima=7 * 24 * 3600, reconstruir=3600, metricas=None, espacio=""):
+        self.redis = redis_client
+        self.clave = espacio + CLAVE_REVOCADOS
+        self.intervalo = intervalo
+        self.capacidad = capacidad
+        self.tasa_error = tasa_error
+        self.vida_maxima = vida_maxima
+        self.reconstruir = reconstruir
+        self.metricas = metricas
+        self.filtro = FiltroBloom(capacidad, tasa_error)
+        self._locales = {}  # jti -> exp, solo sin Redis
+        self._ultimo = 0  # Puntaje de la última revocación sincronizada
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._listo = threading.Event()  # Primera reconstrucción completa: el filtro es confiable
+        self._script_revocar = redis_client.register_script(_LUA_REVOCAR) if redis_client is not None else None
+
+    def _contar(self, resultado):
+        if self.metricas is not None:
+            self.metricas.incrementar("revocacion_consultas_total", (resultado,))
+
+    def revocar(self, jti, expira=None):
+        """
+        Revoca un token por su `jti`
+
+        Args:
+            jti (str): Identificador del token
+            expira (float): Timestamp `exp` del token (solo para purgar la revocación sin Redis)
+
+        Returns:
+            bool: False si la revocación no pudo compartirse con los demás workers
+        """
+        if not jti:
+            return False
+        self.filtro.agregar(jti)
+        if self.redis is None:
+            with self._lock:
+                self._locales[jti] = expira or (time.time() + self.vida_maxima)
+            return False
+        try:
+            self._script_revocar(keys=[self.clave], args=[jti])
+            return True
+        except Exception:
+            self._contar("error")
+            with self._lock:
+                self._locales[jti] = expira or (time.time() + self.vida_maxima)
+            return False
+
+    def revocado(self, jti):
+        """Indica si un token está revocado (los tokens sin `jti` no son revocables)"""
+        if not jti:
+            return False
+        self.iniciar()
+        # Antes de la primera reconstrucción el filtro solo tiene las revocaciones propias
+        if self._listo.is_set() or self.redis is None:
+            if not self.filtro.contiene(jti):
+                return False
+        with self._lock:
+            if jti in self._locales:
+                self._contar("revocado")
+                return True
+        if self.redis is None:
+            self._contar("falso_positivo")
+            return False
+        try:
+            revocado = self.redis.zscore(self.clave, jti) is not None
+        except Exception:
+            # Ante la duda se rechaza: solo afecta a la pequeña fracción que coincide en el filtro
+            self._contar("error")
+            return True
+        self._contar("revocado" if revocado else "falso_positivo")
+        return revocado
+
+    def quizas_revocado(self, jti):
+        """
+        Consulta solo el filtro local, sin E/S: False garantiza que el token no
+        está revocado; True obliga a verificarlo con `revocado`
+        """
+        if not jti:
+            return False
+        self.iniciar()
+        if self.redis is not None and not self._listo.is_set():
+            return True
+        return self.filtro.contiene(jti)
+
+    def iniciar(self):
+        """Lanza el hilo que construye el filtro desde Redis y lo mantiene sincronizado"""
+        if self.redis is None or self._hilo is not None:
+            return
+        with self._lock:
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._sincronizar_periodicamente, name="revocacion", daemon=True)
+                self._hilo.start()
+
+    def _sincronizar(self):
+        """
+        Agrega al filtro las revocaciones registradas desde la última sincronización
+
+        Se relee una ventana de `MARGEN_SINCRONIZACION` segundos para cubrir
+        ajustes del reloj del servidor Redis; volver a agregar un jti es inocuo.
+        """
+        desde = max(self._ultimo - MARGEN_SINCRONIZACION, 0)
+        nuevos = self.redis.zrangebyscore(self.clave, desde, "+inf", withscores=True)
+        for jti, puntaje in nuevos:
+            self.filtro.agregar(jti.decode() if isinstance(jti, bytes) else jti)
+            self._ultimo = max(self._ultimo, puntaje)
+
+    def _reconstruir(self):
+        """Purga las revocaciones de tokens ya expirados y rehace el filtro desde cero"""
+        if self.clave != CLAVE_REVOCADOS and self.redis.exists(CLAVE_REVOCADOS):
+            # Revocaciones registradas antes de REDIS_PREFIJO: se incorporan para que sigan vigentes
+            # (unión y borrado en una transacción: una revocación concurrente no se pierde entre ambos)
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.zunionstore(self.clave, [self.clave, CLAVE_REVOCADOS], aggregate="MAX")
+            pipe.delete(CLAVE_REVOCADOS)
+            pipe.execute()
+        segundos, _ = self.redis.time()  # Mismo reloj que los puntajes
+        limite = segundos - self.vida_maxima
+        self.redis.zremrangebyscore(self.clave, "-inf", limite)
+        miembros = self.redis.zrange(self.clave, 0, -1, withscores=True)
+        # Si hay más revocaciones que las previstas se agranda el filtro para mantener la tasa de error
+        filtro = FiltroBloom(max(self.capacidad, 2 * len(miembros)), self.tasa_error)
+        ultimo = 0
+        for jti, puntaje in miembros:
+            filtro.agregar(jti.decode() if isinstance(jti, bytes) else jti)
+            ultimo = max(ultimo, puntaje)
+        with self._lock:
+            # Las revocaciones propias en vuelo no se pierden: siguen en Redis y llegan en la próxima sincronización
+            self.filtro = filtro
+            self._ultimo = ultimo
+            ahora = time.time()
+            self._locales = {j: e for j, e in self._locales.items() if e > ahora}
+            for jti in self._locales:
+                filtro.agregar(jti)
+        self._listo.set()
+
+    def _sincronizar_periodicamente(self):
+        """Hilo de fondo: reconstrucción inicial y luego sincronización incremental"""
+        proxima_reconstruccion = 0
+        while True:
+            try:
+                if time.time() >= proxima_reconstruccion:
+                    self._reconstruir()
+                    proxima_reconstruccion = time.time() + self.reconstruir
+                else:
+                    self._sincronizar()
+            except Exception as e:
+                self._contar("error")
+                print(f"⚠️  Falló la sincronización de tokens revocados: {e}")
+            time.sleep(self.intervalo)
@@ -0,0 +1,171 @@
+"""
+SkillsForge - Serialización y Compresión de Respuestas
+======================================================
+
+Proveedor JSON para Flask respaldado por orjson (codifica ObjectId y datetime
+sin conversiones previas) y compresión negociada de respuestas (zstd, br,
+gzip) según Accept-Encoding.
+
+orjson, brotli y zstandard son opcionales: sin orjson se usa el módulo json
+estándar, y solo se ofrecen las codificaciones cuyo paquete está instalado.
+"""
+
+import gzip
+import json
+from datetime import date, datetime
+
+from bson import ObjectId
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Tipos de contenido que vale la pena comprimir
+TIPOS_COMPRIMIBLES = ("application/json", "application/x-ndjson", "text/")
+
+
+def _por_defecto(obj):
+    """Codifica los tipos que ni orjson ni json conocen"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Tipo no serializable a JSON: {type(obj).__name__}")
+
+
+def dumps_bytes(obj):
+    """Serializa a JSON compacto en bytes (UTF-8)"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_por_defecto, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_por_defecto, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class ProveedorJSON(DefaultJSONProvider):
+    """
+    Proveedor JSON de Flask basado en orjson
+
+    Las claves mantienen el orden de inserción (sin sort_keys) y la salida es
+    compacta; ObjectId y datetime se codifican directamente.
+    """
+
+    def dumps(self, obj, **kwargs):
+        return dumps_bytes(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if orjson is not None:
+            return orjson.loads(s)
+        return json.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Se evita el paso intermedio por str: los bytes van directo al cuerpo
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj) + b"\n", mimetype=self.mimetype)
+
+
+def _comprimir_zstd(datos):
+    return zstandard.ZstdCompressor(level=3).compress(datos)
+
+
+def _comprimir_br(datos):
+    # Calidad 4: buena relación tamaño/CPU para contenido dinámico
+    return brotli.compress(datos, quality=4)
+
+
+def _comprimir_gzip(datos):
+    return gzip.compress(datos, compresslevel=5)
+
+
+COMPRESORES = {
+    "zstd": _comprimir_zstd if zstandard is not None else None,
+    "br": _comprimir_br if brotli is not None else None,
+    "gzip": _comprimir_gzip,
+}
+
+
+def codificaciones_disponibles(preferidas):
+    """
+    Filtra la lista configurada de codificaciones a las que tienen paquete instalado
+
+    Args:
+        preferidas (str): Codificaciones separadas por coma en orden de preferencia
+
+    Returns:
+        list: Codificaciones utilizables, en el mismo orden
+    """
+    nombres = [c.strip().lower() for c in (preferidas or "").split(",") if c.strip()]
+    return [c for c in nombres if COMPRESORES.get(c) is not None]
+
+
+def negociar_codificacion(accept_encodings, disponibles):
+    """
+    Elige la codificación según Accept-Encoding del cliente
+
+    Entre las que el cliente acepta con mayor calidad, gana la primera de la
+    lista del servidor.
+
+    Returns:
+        str: Codificación elegida o None
+    """
+    mejor, calidad_mejor = None, 0
+    for codificacion in disponibles:
+        calidad = accept_encodings[codificacion]
+        if calidad > calidad_mejor:
+            mejor, calidad_mejor = codificacion, calidad
+    return mejor
+
+
+def comprimir_respuesta(respuesta, accept_encodings, disponibles, minimo):
+    """
+    Comprime el cuerpo de una respuesta si corresponde
+
+    Se omiten las respuestas transmitidas (streaming), sin cuerpo, ya
+    codificadas, de tipos no comprimibles o menores que `minimo` bytes. El
+    ETag fuerte recibe el sufijo de la codificación, porque el cuerpo
+    comprimido es otra representación.
+
+    Returns:
+        Response: La misma respuesta, modificada en su lugar
+    """
+    if not disponibles or respuesta.direct_passthrough or respuesta.is_streamed:
+        return respuesta
+    if respuesta.status_code < 200 or respuesta.status_code in (204, 206, 304):
+        return respuesta
+    if "Content-Encoding" in respuesta.headers:
+        return respuesta
+    if not respuesta.mimetype or not respuesta.mimetype.startswith(TIPOS_COMPRIMIBLES):
+        return respuesta
+    respuesta.vary.add("Accept-Encoding")
+    datos = respuesta.get_data()
+    if len(datos) < minimo:
+        return respuesta
+    codificacion = negociar_codificacion(accept_encodings, disponibles)
+    if codificacion is None:
+        return respuesta
+    comprimido = COMPRESORES[codificacion](datos)
+    if len(comprimido) >= len(datos):
+        return respuesta
+    respuesta.set_data(comprimido)
+    respuesta.headers["Content-Encoding"] = codificacion
+    etag, debil = respuesta.get_etag()
+    if etag and not debil:
+        respuesta.set_etag(f"{etag}+{codificacion}")
+    return respuesta
+
+
+def variantes_etag(etag):
+    """ETags equivalentes a `etag` en cualquiera de sus codificaciones (para If-None-Match)"""
+    return [etag, *(f"{etag}+{c}" for c, compresor in COMPRESORES.items() if compresor is not None)]
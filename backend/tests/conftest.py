@@ -0,0 +1,107 @@
+"""
+Configuración de las pruebas
+============================
+
+MongoDB en memoria con mongomock, igual que `benchmark.py --mongomock`: la app
+y las pruebas comparten un único cliente, reemplazado antes de importar la app.
+La app corre sin Redis (sus respaldos en memoria); las pruebas de los
+componentes que coordinan workers usan fakeredis.
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("MONGO_DB_NAME", "skillsforge_pruebas")
+os.environ.setdefault("REDIS_URL", "redis://127.0.0.1:1")
+# Hashing en el proceso y con costo bajo: las pruebas no miden el costo de las contraseñas
+os.environ.setdefault("HASH_PROCESOS", "0")
+os.environ.setdefault("PASSWORD_HASH_METODO", "pbkdf2:sha256:1000")
+
+import mongomock  # noqa: E402
+import pymongo  # noqa: E402
+
+compartido = mongomock.MongoClient()
+pymongo.MongoClient = lambda *a, **k: compartido
+
+
+@pytest.fixture(scope="session")
+def app():
+    """App Flask sobre mongomock, con la base ya preparada y sin rate limiting"""
+    from app import app as aplicacion
+
+    aplicacion.extensions["skillsforge"]["limiter"].enabled = False
+    cliente = aplicacion.test_client()
+    # La preparación de la base corre en segundo plano (ver /ready)
+    limite = time.time() + 30
+    while cliente.get("/ready").status_code != 200:
+        assert time.time() < limite, "la app no quedó lista"
+        time.sleep(0.02)
+    return aplicacion
+
+
+@pytest.fixture
+def cliente(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def db(app):
+    """Base de datos de la app"""
+    from config import Config
+    return compartido[Config.MONGO_DB_NAME]
+
+
+@pytest.fixture
+def base():
+    """Base vacía e independiente de la app (migraciones y paginación)"""
+    return mongomock.MongoClient()["pruebas"]
+
+
+@pytest.fixture
+def redis_falso():
+    fakeredis = pytest.importorskip("fakeredis")
+    return fakeredis.FakeRedis()
+
+
+@pytest.fixture
+def admin(cliente):
+    """Headers de autorización del administrador sembrado"""
+    r = cliente.post("/auth/login", json={"usuario": "admin", "contrasena": "admin123"})
+    return {"Authorization": "Bearer " + r.get_json()["token"]}
+
+
+@pytest.fixture
+def crear_estudiante(cliente):
+    """Registra un estudiante nuevo y devuelve sus headers de autorización"""
+    contador = iter(range(1_000_000))
+
+    def crear():
+        n = f"{time.time_ns()}-{next(contador)}"
+        r = cliente.post("/auth/estudiantes/registro", json={
+            "nombre": f"Estudiante {n}", "email": f"e{n}@pruebas.com", "contrasena": "12345678",
+        })
+        assert r.status_code == 201, r.get_json()
+        return {"Authorization": "Bearer " + r.get_json()["token"]}
+
+    return crear
+
+
+@pytest.fixture
+def crear_taller(cliente, admin):
+    """Crea un taller y devuelve su _id"""
+
+    def crear(cupo=10, **campos):
+        datos = {
+            "nombre": "Taller de pruebas", "descripcion": "d", "fecha": "2030-01-01", "hora": "10:00",
+            "lugar": "Sala 1", "categoria": "tecnologia", "tipo": "presencial", "cupo": cupo, **campos,
+        }
+        r = cliente.post("/workshops", headers=admin, json=datos)
+        assert r.status_code == 201, r.get_json()
+        return r.get_json()["_id"]
+
+    return crear
@@ -0,0 +1,56 @@
+"""Pruebas de la invalidación por generación y de la cache de documentos"""
+
+import mongomock
+
+from cache import CacheDocumentos, CacheRespuestas
+
+
+def test_invalidar_avanza_la_generacion():
+    cache = CacheRespuestas(prefijo="talleres")
+    generacion, valor = cache.obtener("k")
+    assert valor is None
+    cache.guardar("k", "cuerpo", generacion)
+    assert cache.obtener("k") == (generacion, "cuerpo")
+    cache.invalidar()
+    assert cache.obtener("k")[1] is None
+
+
+def test_cuerpo_calculado_durante_una_escritura_no_se_sirve():
+    cache = CacheRespuestas(prefijo="talleres")
+    generacion, _ = cache.obtener("k")
+    cache.invalidar()  # Escritura mientras se calculaba el cuerpo
+    cache.guardar("k", "viejo", generacion)
+    assert cache.obtener("k")[1] is None
+
+
+def test_generacion_compartida_entre_workers(redis_falso):
+    uno = CacheRespuestas(redis_falso, prefijo="talleres", espacio="pruebas:")
+    otro = CacheRespuestas(redis_falso, prefijo="talleres", espacio="pruebas:")
+    generacion, _ = uno.obtener("k")
+    uno.guardar("k", "cuerpo", generacion)
+    assert otro.obtener("k")[1] == "cuerpo"
+    otro.invalidar()
+    assert uno.obtener("k")[1] is None
+    assert all(clave.startswith(b"pruebas:") for clave in redis_falso.keys())
+
+
+def test_documento_leido_antes_de_un_desalojo_no_se_guarda():
+    coleccion = mongomock.MongoClient()["pruebas"]["talleres"]
+    cache = CacheDocumentos(coleccion, intervalo_sondeo=3600)
+    marca = cache.marca()
+    cache.desalojar("a")
+    cache.guardar("a", 1, "viejo", marca)
+    assert cache.obtener("a") is None
+    cache.guardar("a", 2, "nuevo", cache.marca())
+    assert cache.obtener("a") == (2, "nuevo")
+
+
+def test_detalle_cacheado_se_renueva_al_cambiar_el_taller(cliente, app, crear_taller, crear_estudiante):
+    id_taller = crear_taller(cupo=5)
+    primero = cliente.get(f"/workshops/{id_taller}")
+    assert cliente.get(f"/workshops/{id_taller}").headers["ETag"] == primero.headers["ETag"]
+    assert cliente.get(f"/workshops/{id_taller}", headers={"If-None-Match": primero.headers["ETag"]}).status_code == 304
+    cliente.post(f"/workshops/{id_taller}/register", headers=crear_estudiante())
+    segundo = cliente.get(f"/workshops/{id_taller}")
+    assert segundo.headers["ETag"] != primero.headers["ETag"]
+    assert segundo.get_json()["inscritos"] == 1
@@ -0,0 +1,73 @@
+"""Pruebas del almacenamiento de rate limiting en dos niveles (memoria local y lotes en Redis)"""
+
+from limits import parse
+from limits.strategies import FixedWindowRateLimiter
+
+import limites
+from limites import AlmacenDosNiveles
+
+
+def almacen(redis_client=None, **opciones):
+    # Intervalo largo: las pruebas controlan cuándo se sincroniza
+    return AlmacenDosNiveles(redis_client=redis_client, intervalo=3600, prefijo="pruebas:limites:", **opciones)
+
+
+def en_redis(redis_falso, limite, clave):
+    return int(redis_falso.get("pruebas:limites:" + limite.key_for(clave, "ruta")) or 0)
+
+
+def test_golpes_se_acumulan_en_memoria_hasta_el_lote(redis_falso):
+    limite = parse("100 per minute")
+    limitador = FixedWindowRateLimiter(almacen(redis_falso, margen=0.1))
+    for _ in range(9):
+        assert limitador.hit(limite, "k", "ruta")
+    assert en_redis(redis_falso, limite, "k") == 0
+    # El décimo agota el margen (10 % de lo que resta): se confirma el lote en Redis
+    assert limitador.hit(limite, "k", "ruta")
+    assert en_redis(redis_falso, limite, "k") == 10
+
+
+def test_limite_chico_confirma_cada_golpe_entre_procesos(redis_falso):
+    limite = parse("10 per minute")
+    uno = FixedWindowRateLimiter(almacen(redis_falso))
+    otro = FixedWindowRateLimiter(almacen(redis_falso))
+    for _ in range(6):
+        assert uno.hit(limite, "k", "ruta")
+    assert en_redis(redis_falso, limite, "k") == 6
+    for _ in range(4):
+        assert otro.hit(limite, "k", "ruta")
+    assert not otro.hit(limite, "k", "ruta")
+    assert not uno.hit(limite, "k", "ruta")
+
+
+def test_lote_minimo(redis_falso):
+    limite = parse("10 per minute")
+    limitador = FixedWindowRateLimiter(almacen(redis_falso, lote_minimo=3))
+    limitador.hit(limite, "k", "ruta")
+    limitador.hit(limite, "k", "ruta")
+    assert en_redis(redis_falso, limite, "k") == 0
+    limitador.hit(limite, "k", "ruta")
+    assert en_redis(redis_falso, limite, "k") == 3
+
+
+def test_sin_redis_limita_por_proceso():
+    limite = parse("3 per minute")
+    limitador = FixedWindowRateLimiter(almacen())
+    assert [limitador.hit(limite, "k", "ruta") for _ in range(4)] == [True, True, True, False]
+    assert limitador.hit(limite, "otra", "ruta")
+
+
+def test_ventanas_vencidas_se_descartan(monkeypatch):
+    ahora = [1000.0]
+    monkeypatch.setattr(limites.time, "time", lambda: ahora[0])
+    alm = almacen()
+    alm.incr("LIMITER/a/ruta/5/1/minute", 60)
+    alm.incr("LIMITER/b/ruta/5/1/second", 1)
+    ahora[0] += 2
+    alm.incr("LIMITER/c/ruta/5/1/minute", 60)
+    assert set(alm._ventanas) == {"LIMITER/a/ruta/5/1/minute", "LIMITER/c/ruta/5/1/minute"}
+    ahora[0] += 60
+    alm.incr("LIMITER/b/ruta/5/1/second", 1)
+    assert set(alm._ventanas) == {"LIMITER/b/ruta/5/1/second"}
+    # Una ventana reemplazada no deja entradas que borren a la nueva
+    assert alm.get("LIMITER/b/ruta/5/1/second") == 1
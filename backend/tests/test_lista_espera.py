@@ -0,0 +1,60 @@
+"""Pruebas de la lista de espera: orden de llegada, promoción y contador `en_espera`"""
+
+from bson import ObjectId
+from pymongo import errors
+
+
+def contadores(db, id_taller):
+    return db["talleres"].find_one({"_id": ObjectId(id_taller)}, {"inscritos": 1, "cupos_disponibles": 1, "en_espera": 1})
+
+
+def test_promocion_en_orden_de_llegada(cliente, db, crear_taller, crear_estudiante):
+    id_taller = crear_taller(cupo=1)
+    primero, segundo, tercero = crear_estudiante(), crear_estudiante(), crear_estudiante()
+    assert cliente.post(f"/workshops/{id_taller}/register", headers=primero).status_code == 201
+    # Sin cupos no se salta la cola
+    assert cliente.post(f"/workshops/{id_taller}/register", headers=segundo).status_code == 409
+    assert cliente.post(f"/workshops/{id_taller}/waitlist", headers=segundo).get_json()["posicion"] == 1
+    assert cliente.post(f"/workshops/{id_taller}/waitlist", headers=tercero).get_json()["posicion"] == 2
+    assert contadores(db, id_taller)["en_espera"] == 2
+
+    assert cliente.delete(f"/workshops/{id_taller}/register", headers=primero).status_code == 200
+    assert cliente.get(f"/workshops/{id_taller}/waitlist/me", headers=segundo).get_json()["inscrito"] is True
+    assert cliente.get(f"/workshops/{id_taller}/waitlist/me", headers=tercero).get_json()["posicion"] == 1
+    t = contadores(db, id_taller)
+    assert (t["inscritos"], t["cupos_disponibles"], t["en_espera"]) == (1, 0, 1)
+
+
+def test_unirse_con_cupo_promueve_de_inmediato(cliente, db, crear_taller, crear_estudiante):
+    id_taller = crear_taller(cupo=2)
+    r = cliente.post(f"/workshops/{id_taller}/waitlist", headers=crear_estudiante())
+    assert r.status_code == 201
+    t = contadores(db, id_taller)
+    assert (t["inscritos"], t["en_espera"]) == (1, 0)
+
+
+def test_salir_de_la_lista(cliente, db, crear_taller, crear_estudiante):
+    id_taller = crear_taller(cupo=1)
+    cliente.post(f"/workshops/{id_taller}/register", headers=crear_estudiante())
+    estudiante = crear_estudiante()
+    cliente.post(f"/workshops/{id_taller}/waitlist", headers=estudiante)
+    assert cliente.delete(f"/workshops/{id_taller}/waitlist", headers=estudiante).status_code == 200
+    assert cliente.delete(f"/workshops/{id_taller}/waitlist", headers=estudiante).status_code == 404
+    assert contadores(db, id_taller)["en_espera"] == 0
+
+
+def test_fallo_al_encolar_devuelve_el_lugar(cliente, db, crear_taller, crear_estudiante, monkeypatch, app):
+    id_taller = crear_taller(cupo=1)
+    cliente.post(f"/workshops/{id_taller}/register", headers=crear_estudiante())
+    coleccion = type(db["lista_espera"])
+    original = coleccion.insert_one
+
+    def insertar(self, documento, *args, **kwargs):
+        if self.name == "lista_espera":
+            raise errors.AutoReconnect("sin conexión")
+        return original(self, documento, *args, **kwargs)
+
+    monkeypatch.setattr(coleccion, "insert_one", insertar)
+    monkeypatch.setitem(app.config, "PROPAGATE_EXCEPTIONS", False)
+    assert cliente.post(f"/workshops/{id_taller}/waitlist", headers=crear_estudiante()).status_code >= 500
+    assert contadores(db, id_taller)["en_espera"] == 0
@@ -0,0 +1,62 @@
+"""Pruebas de las migraciones y de la reconciliación de contadores"""
+
+from migraciones import (
+    backfill_inscritos, inicializar, migrar_inscripciones, preparacion_vigente, reconciliar_estadisticas,
+)
+
+
+def test_migrar_inscripciones_copia_y_elimina_el_arreglo(base):
+    t = base["talleres"].insert_one({"cupo": 5, "inscripciones": [
+        {"estudiante_id": "a", "nombre": "A"}, {"estudiante_id": "b", "nombre": "B"}, {"nombre": "sin id"},
+    ]}).inserted_id
+    vacio = base["talleres"].insert_one({"cupo": 5, "inscripciones": []}).inserted_id
+    assert migrar_inscripciones(base) == 2
+    taller = base["talleres"].find_one({"_id": t})
+    assert "inscripciones" not in taller
+    assert (taller["inscritos"], taller["cupos_disponibles"]) == (2, 3)
+    assert "inscripciones" not in base["talleres"].find_one({"_id": vacio})
+    # Idempotente
+    assert migrar_inscripciones(base) == 0
+    assert base["inscripciones"].count_documents({"taller_id": t}) == 2
+
+
+def test_migrar_inscripciones_conserva_lo_agregado_durante_la_copia(base):
+    t = base["talleres"].insert_one({"cupo": 5, "inscripciones": [{"estudiante_id": "a"}]}).inserted_id
+    coleccion = base["inscripciones"]
+    original = coleccion.bulk_write
+
+    def con_inscripcion_concurrente(operaciones, **kwargs):
+        resultado = original(operaciones, **kwargs)
+        # Un worker anterior agrega al arreglo embebido mientras corre la migración
+        base["talleres"].update_one({"_id": t}, {"$push": {"inscripciones": {"estudiante_id": "b"}}})
+        return resultado
+
+    coleccion.bulk_write = con_inscripcion_concurrente
+    migrar_inscripciones(base)
+    assert base["talleres"].find_one({"_id": t})["inscripciones"] == [{"estudiante_id": "b"}]
+    coleccion.bulk_write = original
+    migrar_inscripciones(base)
+    assert sorted(i["estudiante_id"] for i in base["inscripciones"].find()) == ["a", "b"]
+
+
+def test_backfill_corrige_la_deriva_de_los_contadores(base):
+    t = base["talleres"].insert_one({"cupo": 3, "inscritos": 0, "cupos_disponibles": 3, "en_espera": 4}).inserted_id
+    base["inscripciones"].insert_many([{"taller_id": t, "estudiante_id": e} for e in "ab"])
+    base["lista_espera"].insert_one({"taller_id": t, "estudiante_id": "c", "orden": 1})
+    assert backfill_inscritos(base) == 1
+    taller = base["talleres"].find_one({"_id": t})
+    assert (taller["inscritos"], taller["cupos_disponibles"], taller["en_espera"]) == (2, 1, 1)
+    assert backfill_inscritos(base) == 0
+
+
+def test_inicializar_publica_la_marca_de_preparacion(base):
+    assert not preparacion_vigente(base)
+    inicializar(base, ejemplos=False)
+    assert preparacion_vigente(base)
+
+
+def test_reconciliar_estadisticas(base):
+    base["talleres"].insert_many([{"categoria": "tecnologia"}, {"categoria": "tecnologia"}, {"categoria": "arte"}])
+    base["categorias"].insert_one({"_id": "obsoleta", "n": 7})
+    assert reconciliar_estadisticas(base)["talleres"] == 3
+    assert {c["_id"]: c["n"] for c in base["categorias"].find()} == {"tecnologia": 2, "arte": 1}
@@ -0,0 +1,52 @@
+"""Pruebas de la paginación por cursor keyset"""
+
+from pymongo import ASCENDING, DESCENDING
+
+from app import cortar_pagina, filtro_pagina
+
+
+def recorrer(coleccion, claves, limite):
+    """Sigue los cursores página a página, como un cliente que lee X-Next-Cursor"""
+    vistos, token = [], None
+    while True:
+        filtro = filtro_pagina({}, claves, token)
+        docs = list(coleccion.find(filtro, sort=claves, limit=limite + 1))
+        pagina, token = cortar_pagina(docs, limite, claves)
+        vistos += [d["_id"] for d in pagina]
+        if not token:
+            return vistos
+
+
+def test_keyset_recorre_todo_sin_repetir_con_empates(base):
+    # Muchas fechas repetidas: el _id desempata y ningún documento se salta ni se repite
+    base["talleres"].insert_many([{"fecha": f"2030-01-0{i % 3 + 1}"} for i in range(25)])
+    for direccion in (ASCENDING, DESCENDING):
+        claves = [("fecha", direccion), ("_id", direccion)]
+        esperado = [d["_id"] for d in base["talleres"].find(sort=claves)]
+        assert recorrer(base["talleres"], claves, 7) == esperado
+
+
+def test_cursor_invalido():
+    assert filtro_pagina({}, [("fecha", ASCENDING), ("_id", ASCENDING)], "no-es-un-cursor") is None
+
+
+def test_listado_paginado_igual_al_completo(cliente, crear_taller):
+    for i in range(5):
+        crear_taller(fecha=f"2031-02-0{i + 1}")
+    completo = [t["_id"] for t in cliente.get("/workshops").get_json()]
+    paginado, cursor = [], ""
+    while True:
+        r = cliente.get(f"/workshops?limit=2&cursor={cursor}")
+        assert r.status_code == 200
+        paginado += [t["_id"] for t in r.get_json()]
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert paginado == completo
+
+
+def test_parametros_invalidos(cliente, admin):
+    assert cliente.get("/workshops?limit=2&cursor=xx").status_code == 400
+    r = cliente.get("/workshops?limit=abc")
+    assert r.status_code == 400 and r.get_json() == {"mensaje": "limit debe ser un entero"}
+    assert cliente.get("/students?limit=abc", headers=admin).status_code == 400
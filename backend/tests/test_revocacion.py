@@ -0,0 +1,75 @@
+"""Pruebas del filtro de Bloom y de la sincronización de tokens revocados entre workers"""
+
+import time
+import uuid
+
+from revocacion import CLAVE_REVOCADOS, FiltroBloom, RevocacionTokens
+
+
+def esperar(condicion, segundos=5):
+    limite = time.time() + segundos
+    while not condicion():
+        assert time.time() < limite, "la condición no se cumplió a tiempo"
+        time.sleep(0.01)
+
+
+def test_filtro_bloom_sin_falsos_negativos():
+    filtro = FiltroBloom(capacidad=1000, tasa_error=0.01)
+    agregados = [uuid.uuid4().hex for _ in range(1000)]
+    for jti in agregados:
+        filtro.agregar(jti)
+    assert all(filtro.contiene(jti) for jti in agregados)
+    falsos = sum(filtro.contiene(uuid.uuid4().hex) for _ in range(10000))
+    assert falsos < 300  # ~1 % esperado con la capacidad prevista
+
+
+def test_sin_redis_la_revocacion_es_local():
+    revocacion = RevocacionTokens()
+    assert revocacion.revocar("a") is False
+    assert revocacion.revocado("a")
+    assert not revocacion.revocado("b")
+    assert not revocacion.revocado(None)
+
+
+def test_revocacion_visible_desde_otro_worker_antes_de_sincronizar(redis_falso):
+    origen = RevocacionTokens(redis_falso, espacio="pruebas:")
+    assert origen.revocar("a")
+    # Recién creado, el filtro del otro worker aún está vacío: se consulta Redis
+    otro = RevocacionTokens(redis_falso, intervalo=0.05, espacio="pruebas:")
+    assert otro.revocado("a")
+    assert otro.quizas_revocado("a")
+    otro._listo.wait(5)
+    assert otro.revocado("a")
+    assert not otro.revocado("b")
+
+
+def test_sincronizacion_incremental(redis_falso):
+    otro = RevocacionTokens(redis_falso, intervalo=0.05, espacio="pruebas:")
+    otro.iniciar()
+    otro._listo.wait(5)
+    RevocacionTokens(redis_falso, espacio="pruebas:").revocar("nuevo")
+    # Llega al filtro local sin esperar la reconstrucción completa
+    esperar(lambda: otro.filtro.contiene("nuevo"))
+    assert otro.revocado("nuevo")
+
+
+def test_revocaciones_sin_prefijo_siguen_vigentes(redis_falso):
+    segundos, _ = redis_falso.time()
+    redis_falso.zadd(CLAVE_REVOCADOS, {"antiguo": segundos})
+    revocacion = RevocacionTokens(redis_falso, espacio="pruebas:")
+    revocacion.iniciar()
+    revocacion._listo.wait(5)
+    assert revocacion.revocado("antiguo")
+    assert not redis_falso.exists(CLAVE_REVOCADOS)
+    assert redis_falso.zscore("pruebas:" + CLAVE_REVOCADOS, "antiguo") is not None
+
+
+def test_reconstruccion_purga_tokens_expirados(redis_falso):
+    segundos, _ = redis_falso.time()
+    clave = "pruebas:" + CLAVE_REVOCADOS
+    redis_falso.zadd(clave, {"vencido": segundos - 100, "vigente": segundos})
+    revocacion = RevocacionTokens(redis_falso, vida_maxima=10, espacio="pruebas:")
+    revocacion.iniciar()
+    revocacion._listo.wait(5)
+    assert redis_falso.zscore(clave, "vencido") is None
+    assert revocacion.revocado("vigente")